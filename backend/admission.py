@@ -0,0 +1,187 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+from metrics import Counter, Gauge
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') != '0'
+TRUST_PROXY = os.getenv('TRUST_PROXY', '0') == '1'
+MAX_TRACKED_CLIENTS = int(os.getenv('ADMISSION_MAX_CLIENTS', 10000))
+
+# rate/burst are tokens per second and bucket size; concurrency caps requests in flight per process.
+DEFAULT_POLICIES = {
+    '/api/chat': {'route_rate': 20, 'route_burst': 40, 'client_rate': 0.5, 'client_burst': 5, 'concurrency': 4},
+    '/api/profile-disease': {'route_rate': 20, 'route_burst': 40, 'client_rate': 0.5, 'client_burst': 5, 'concurrency': 4},
+    '/api/predict': {'route_rate': 200, 'route_burst': 400, 'client_rate': 10, 'client_burst': 20, 'concurrency': 16},
+    '/api/predict/batch': {'route_rate': 20, 'route_burst': 40, 'client_rate': 1, 'client_burst': 5, 'concurrency': 4},
+    '/api/predict/recommendations': {'route_rate': 20, 'route_burst': 40, 'client_rate': 1, 'client_burst': 5, 'concurrency': 4},
+    '/api/predict/sensitivity': {'route_rate': 20, 'route_burst': 40, 'client_rate': 1, 'client_burst': 5, 'concurrency': 4}
+}
+
+ADMISSION_REJECTIONS = Counter('admission_rejections', 'Requests rejected by admission control', ('route', 'reason'))
+ADMISSION_IN_FLIGHT = Gauge('admission_in_flight', 'Admitted requests in flight on limited routes', ('route',))
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def refund(self):
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+class RoutePolicy:
+    def __init__(self, route, route_rate, route_burst, client_rate, client_burst, concurrency):
+        self.route = route
+        self.route_bucket = TokenBucket(route_rate, route_burst)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.client_buckets = OrderedDict()
+        self.clients_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+    def client_bucket(self, client):
+        with self.clients_lock:
+            bucket = self.client_buckets.get(client)
+            if bucket is None:
+                bucket = self.client_buckets[client] = TokenBucket(self.client_rate, self.client_burst)
+                if len(self.client_buckets) > MAX_TRACKED_CLIENTS:
+                    self.client_buckets.popitem(last=False)
+            else:
+                self.client_buckets.move_to_end(client)
+            return bucket
+
+    def admit(self, client):
+        # Cheapest and most specific checks first, so one client over its limit or a
+        # full route never drains the shared route bucket; a later rejection refunds
+        # whatever was already taken.
+        client_bucket = self.client_bucket(client)
+        wait = client_bucket.take()
+        if wait:
+            return 'client_rate', wait
+
+        if not self.slots.acquire(blocking=False):
+            client_bucket.refund()
+            return 'concurrency', 1
+
+        wait = self.route_bucket.take()
+        if wait:
+            self.slots.release()
+            client_bucket.refund()
+            return 'route_rate', wait
+        return None
+
+def load_policies():
+    policies = {route: dict(policy) for route, policy in DEFAULT_POLICIES.items()}
+    overrides = os.getenv('ADMISSION_POLICIES')
+    if overrides:
+        for route, policy in json.loads(overrides).items():
+            policies.setdefault(route, {}).update(policy)
+    return {route: RoutePolicy(route, **policy) for route, policy in policies.items()}
+
+def client_identity(jwt_secret, req):
+    auth_header = req.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        import jwt
+        try:
+            return 'user:' + jwt.decode(auth_header[7:], jwt_secret, algorithms=['HS256'])['user_id']
+        except Exception:
+            pass
+    if TRUST_PROXY and req.headers.get('X-Forwarded-For'):
+        return 'ip:' + req.headers['X-Forwarded-For'].split(',')[0].strip()
+    return f'ip:{req.remote_addr}'
+
+def check_admission(policies, req, jwt_secret):
+    # Returns the policy to release once the request finishes, or the
+    # (status, retry_after, message) of a rejection; both are None for unlimited routes.
+    policy = policies.get(req.url_rule.rule) if req.url_rule else None
+    if policy is None or req.method == 'OPTIONS':
+        return None, None
+
+    rejected = policy.admit(client_identity(jwt_secret, req))
+    if rejected:
+        reason, wait = rejected
+        ADMISSION_REJECTIONS.inc(policy.route, reason)
+        if reason == 'client_rate':
+            return None, (429, wait, 'Too many requests, please slow down')
+        return None, (503, wait, 'Service is busy, please retry shortly')
+
+    ADMISSION_IN_FLIGHT.inc(policy.route)
+    return policy, None
+
+def release_admission(policy):
+    policy.slots.release()
+    ADMISSION_IN_FLIGHT.dec(policy.route)
+
+def _reject(jsonify, status, retry_after, message):
+    response = jsonify({'success': False, 'error': message})
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response, status
+
+def init_admission(app, jwt_secret, policies=None):
+    if not ADMISSION_ENABLED:
+        return None
+
+    policies = policies or load_policies()
+
+    @app.before_request
+    def admit_request():
+        policy, rejected = check_admission(policies, request, jwt_secret)
+        if rejected:
+            return _reject(jsonify, *rejected)
+        if policy is not None:
+            g.admission_policy = policy
+        return None
+
+    @app.teardown_request
+    def finish_admission(exc):
+        policy = g.pop('admission_policy', None)
+        if policy is not None:
+            release_admission(policy)
+
+    return policies
+
+def init_async_admission(app, jwt_secret, policies=None):
+    # The same checks as Quart hooks, for routes served natively by async_app.py.
+    # Passing the Flask app's policies makes both draw from one set of buckets.
+    if not ADMISSION_ENABLED:
+        return None
+
+    from quart import g as quart_g, jsonify as quart_jsonify, request as quart_request
+
+    policies = policies or load_policies()
+
+    @app.before_request
+    async def admit_request():
+        policy, rejected = check_admission(policies, quart_request, jwt_secret)
+        if rejected:
+            return _reject(quart_jsonify, *rejected)
+        if policy is not None:
+            quart_g.admission_policy = policy
+        return None
+
+    @app.teardown_request
+    async def finish_admission(exc):
+        policy = quart_g.pop('admission_policy', None)
+        if policy is not None:
+            release_admission(policy)
+
+    return policies
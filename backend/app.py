@@ -1,58 +1,206 @@
-from flask import Flask, request, jsonify
+import time
+APP_IMPORT_STARTED = time.monotonic()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import joblib
 import json
-import pandas as pd
-import numpy as np
 import os
-from groq import Groq
+import threading
 from dotenv import load_dotenv
-from database import get_database, create_user, get_user_by_email, get_user_by_id, save_prediction, get_user_predictions, authenticate_user
-import jwt
+from database import get_database, ensure_indexes, create_user, get_user_by_email, get_user_by_id, save_prediction, get_user_predictions, get_user_prediction, record_actual_cost, encode_prediction_cursor, authenticate_user, register_model_version, get_model_schema, UserExistsError, MAX_PAGE_SIZE, SUMMARY_INPUT_FIELDS
+from password_hashing import HashingBusy
+from http_cache import cached_json, compute_digest, get_entry, clear as clear_http_cache
+from prediction_codec import build_model_schema, compact_prediction, expand_document, is_compact, model_bundle_version
+from prediction_summary import get_prediction_summary
+from explanations import generate_cost_explanation
+from metrics import StageTimer, LatencyTimer, PREDICT_STAGE_SECONDS, LLM_LATENCY, LLM_ERRORS, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, render as render_metrics
+from profiling import init_profiling, profiler
+from admission import init_admission
+from compression import init_compression
+from serialization import FastJSONProvider
+from cohort import CohortIndex, fill_missing_categories, parse_filters, cohort_statistics, cohort_visualizations, AGE_BINS, AGE_LABELS
+from drift import DriftMonitor, build_reference, load_reference, DRIFT_ENABLED
+from percentiles import load_percentile_index, rank_prediction
+from recommendations import recommend
+from segments import FALLBACK, SegmentRegistry, score_segmented
+from shadow import init_shadow
+from scoring import parse_profile, encode_rows, member_predict, score_matrix, prediction_intervals, interval_at, sweep_values, build_sensitivity_matrix, sensitivity_rows, split_sensitivity, MAX_BATCH_ROWS
+from export_data import user_rows, prediction_rows, prediction_columns, stream_ndjson, stream_csv, parse_export_args, USER_COLUMNS, EXPORT_FORMATS
+import hmac
 from datetime import datetime, timedelta
 from functools import wraps
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
+init_compression(app)
 
 ensemble_model = None
+individual_models = {}
 scaler = None
 label_encoders = None
 feature_names = None
 feature_importance = None
 dataset = None
+dataset_hash = None
+model_version = None
+model_schema = None
+percentile_index = None
+cohort_index = None
+drift_monitor = None
+segment_registry = None
+model_registered = False
+
+models_ready = threading.Event()
+shadow = init_shadow()
+startup_timings = {}
+APP_IMPORTED = time.monotonic()
 
-groq_client = None
-try:
-    api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
-        groq_client = Groq(api_key=api_key)
-except Exception as e:
-    pass
+_groq_client = None
+_groq_lock = threading.Lock()
+
+def get_groq_client():
+    global _groq_client
+    if _groq_client is None:
+        api_key = os.getenv('GROQ_API_KEY')
+        if not api_key:
+            return None
+        with _groq_lock:
+            if _groq_client is None:
+                try:
+                    from groq import Groq
+                    _groq_client = Groq(api_key=api_key)
+                except Exception as e:
+                    return None
+    return _groq_client
 
 def load_models():
-    global ensemble_model, scaler, label_encoders, feature_names, feature_importance, dataset
+    global ensemble_model, individual_models, scaler, label_encoders, feature_names, feature_importance, dataset
+    global dataset_hash, model_version, model_schema, model_registered, percentile_index, cohort_index, drift_monitor
+    global segment_registry
     
     models_dir = 'models'
+    dataset_path = '../dataset/costdata.csv'
     
+    # Everything is loaded into locals first; the globals are swapped only once
+    # all of it succeeded, so a failed reload leaves the current bundle intact.
     try:
-        ensemble_model = joblib.load(f'{models_dir}/ensemble_model.pkl')
-        scaler = joblib.load(f'{models_dir}/scaler.pkl')
-        label_encoders = joblib.load(f'{models_dir}/label_encoders.pkl')
+        import joblib
+        import pandas as pd
+        
+        new_ensemble = joblib.load(f'{models_dir}/ensemble_model.pkl')
+        # The fitted voting members are the same models saved individually, so
+        # they are reused instead of loading a second copy of every forest.
+        new_members = dict(new_ensemble.named_estimators_)
+        new_scaler = joblib.load(f'{models_dir}/scaler.pkl')
+        new_encoders = joblib.load(f'{models_dir}/label_encoders.pkl')
         
         with open(f'{models_dir}/feature_names.json', 'r') as f:
-            feature_names = json.load(f)
+            new_feature_names = json.load(f)
         
         with open(f'{models_dir}/feature_importance.json', 'r') as f:
-            feature_importance = json.load(f)
-        
-        dataset = pd.read_csv('../dataset/costdata.csv')
-        
-        return True
+            new_importance = json.load(f)
+        
+        # Unfiltered statistics and the cohort index must agree on the "None" insurance type.
+        new_dataset = fill_missing_categories(pd.read_csv(dataset_path))
+        new_cohort_index = CohortIndex(new_dataset)
+        
+        new_version = model_bundle_version(models_dir)
+        new_dataset_hash = compute_digest([dataset_path])
+        new_schema = build_model_schema(new_feature_names, new_encoders)
+        new_percentile_index = load_percentile_index(models_dir, f'{new_dataset_hash}:{new_version}')
+        new_registry = SegmentRegistry(models_dir, {
+            'models': new_members, 'weights': new_ensemble.weights, 'scaler': new_scaler, 'version': new_version
+        })
+        new_drift_monitor = None
+        if DRIFT_ENABLED:
+            new_drift_monitor = DriftMonitor(load_reference(models_dir, new_dataset_hash) or build_reference(new_dataset, new_dataset_hash))
     except Exception as e:
         return False
+    
+    if drift_monitor:
+        drift_monitor.stop()
+    ensemble_model, individual_models, scaler, label_encoders = new_ensemble, new_members, new_scaler, new_encoders
+    feature_names, feature_importance, dataset, cohort_index = new_feature_names, new_importance, new_dataset, new_cohort_index
+    model_version, dataset_hash, model_schema = new_version, new_dataset_hash, new_schema
+    percentile_index, segment_registry, drift_monitor = new_percentile_index, new_registry, new_drift_monitor
+    model_registered = False
+    clear_http_cache()
+    
+    return True
+
+def warm_up():
+    with app.test_request_context('/api/predict', method='POST', json={}):
+        g.warm_up = True
+        predict.__wrapped__()
+    
+    get_entry('statistics', analytics_version(), build_statistics)
+    get_entry('visualizations', analytics_version(), build_visualizations)
+    get_entry('feature-importance', analytics_version(), build_feature_importance)
+
+def initialize():
+    started = time.monotonic()
+    if not load_models():
+        startup_timings['error'] = 'Failed to load models'
+        return False
+    loaded = time.monotonic()
+    
+    warm_up()
+    ready = time.monotonic()
+    
+    startup_timings.pop('error', None)
+    startup_timings.update({
+        'import_seconds': round(APP_IMPORTED - APP_IMPORT_STARTED, 3),
+        'load_seconds': round(loaded - started, 3),
+        'warmup_seconds': round(ready - loaded, 3),
+        'cold_start_seconds': round(ready - APP_IMPORT_STARTED, 3)
+    })
+    models_ready.set()
+    print(f"Models ready in {startup_timings['cold_start_seconds']}s "
+          f"(import {startup_timings['import_seconds']}s, load {startup_timings['load_seconds']}s, "
+          f"warm-up {startup_timings['warmup_seconds']}s)")
+    return True
+
+def background_startup():
+    try:
+        ensure_indexes()
+    except Exception as e:
+        pass
+    initialize()
+    if shadow:
+        shadow.start()
+
+def start_background_initialization():
+    thread = threading.Thread(target=background_startup, name='model-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def models_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not models_ready.is_set():
+            response = jsonify({'success': False, 'error': 'Models are still loading, please retry shortly'})
+            response.headers['Retry-After'] = '2'
+            return response, 503
+        return f(*args, **kwargs)
+    return decorated
+
+def ensure_model_registered():
+    global model_registered
+    if not model_registered:
+        register_model_version(model_version, model_schema)
+        model_registered = True
+
+def expand_prediction(doc, with_explanation=False):
+    if not is_compact(doc):
+        return doc
+    
+    expanded = expand_document(doc, get_model_schema(doc.get('model_version')))
+    if with_explanation and expanded.get('input_data'):
+        expanded['cost_explanation'] = generate_cost_explanation(expanded['input_data'], expanded['prediction'])
+    return expanded
 
 JWT_SECRET = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production')
 
@@ -70,6 +218,7 @@ def token_required(f):
         if not token:
             return jsonify({'success': False, 'error': 'Token is missing'}), 401
         
+        import jwt
         try:
             data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
             current_user = get_user_by_id(data['user_id'])
@@ -83,6 +232,98 @@ def token_required(f):
         return f(current_user, *args, **kwargs)
     return decorated
 
+ADMIN_API_KEY = os.getenv('ADMIN_API_KEY')
+
+def admin_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        provided = request.headers.get('X-Admin-Key', '')
+        if not ADMIN_API_KEY or not hmac.compare_digest(provided, ADMIN_API_KEY):
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.in_flight = True
+    REQUESTS_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+
+@app.teardown_request
+def finish_request(exc):
+    if g.pop('in_flight', False):
+        REQUESTS_IN_FLIGHT.dec()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    if not models_ready.is_set():
+        return jsonify({'status': 'loading', 'startup': startup_timings}), 503
+    return jsonify({'status': 'ready', 'model_version': model_version, 'startup': startup_timings})
+
+admission_policies = init_admission(app, JWT_SECRET)
+init_profiling(app, ADMIN_API_KEY)
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def get_profiles():
+    route = request.args.get('route')
+    if route:
+        return Response(profiler.folded(route), mimetype='text/plain')
+    return jsonify({'success': True, 'routes': profiler.summary()})
+
+@app.route('/api/admin/profiles', methods=['DELETE'])
+@admin_required
+def reset_profiles():
+    profiler.reset()
+    return jsonify({'success': True})
+
+@app.route('/api/admin/drift', methods=['GET'])
+@admin_required
+def get_drift():
+    if drift_monitor is None:
+        return jsonify({'success': False, 'error': 'Drift monitoring is disabled or models are not loaded'}), 503
+    # Refreshing is read-only: only the evaluator thread decays the live counts.
+    report = drift_monitor.preview() if request.args.get('refresh') == '1' else drift_monitor.report
+    return jsonify({'success': True, 'drift': report})
+
+@app.route('/api/admin/shadow', methods=['GET'])
+@admin_required
+def get_shadow_report():
+    if shadow is None:
+        return jsonify({'success': False, 'error': 'Shadow evaluation is not configured'}), 404
+    return jsonify({'success': True, 'shadow': shadow.report(model_version)})
+
+@app.route('/api/admin/shadow', methods=['DELETE'])
+@admin_required
+def reset_shadow_report():
+    if shadow is None:
+        return jsonify({'success': False, 'error': 'Shadow evaluation is not configured'}), 404
+    shadow.reset()
+    return jsonify({'success': True})
+
+@app.route('/api/admin/segments', methods=['GET'])
+@admin_required
+def get_segments():
+    if segment_registry is None:
+        return jsonify({'success': False, 'error': 'Models are not loaded'}), 503
+    return jsonify({'success': True, 'segments': segment_registry.status()})
+
 @app.route('/')
 def home():
     return jsonify({
@@ -90,6 +331,9 @@ def home():
         'version': '1.0',
         'endpoints': [
             '/api/predict',
+            '/api/predict/batch',
+            '/api/predict/recommendations',
+            '/api/predict/sensitivity',
             '/api/chat',
             '/api/profile-disease',
             '/api/statistics',
@@ -98,7 +342,16 @@ def home():
             '/api/auth/signup',
             '/api/auth/login',
             '/api/auth/me',
-            '/api/users/predictions'
+            '/api/users/predictions',
+            '/api/users/predictions/summary',
+            '/api/users/predictions/<prediction_id>',
+            '/api/users/predictions/<prediction_id>/actual',
+            '/api/admin/export/users',
+            '/api/admin/export/predictions',
+            '/api/admin/profiles',
+            '/api/admin/drift',
+            '/api/admin/shadow',
+            '/api/admin/segments'
         ]
     })
 
@@ -120,8 +373,14 @@ def signup():
         if existing_user:
             return jsonify({'success': False, 'error': 'User already exists'}), 409
         
-        user_id = create_user(data)
+        try:
+            user_id = create_user(data)
+        except UserExistsError:
+            return jsonify({'success': False, 'error': 'User already exists'}), 409
+        except HashingBusy as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
         
+        import jwt
         token = jwt.encode({
             'user_id': user_id,
             'email': email,
@@ -151,10 +410,14 @@ def login():
         if not email or not password:
             return jsonify({'success': False, 'error': 'Email and password are required'}), 400
         
-        user = authenticate_user(email, password)
+        try:
+            user = authenticate_user(email, password)
+        except HashingBusy as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
         if not user:
             return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
         
+        import jwt
         token = jwt.encode({
             'user_id': str(user['_id']),
             'email': user['email'],
@@ -197,13 +460,158 @@ def get_current_user(current_user):
 def get_predictions_history(current_user):
     try:
         email = current_user['email']
-        limit = int(request.args.get('limit', 10))
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_PAGE_SIZE))
+        before = request.args.get('before')
         
-        predictions = get_user_predictions(email, limit)
-        return jsonify({'success': True, 'predictions': predictions, 'count': len(predictions)})
+        predictions = get_user_predictions(email, limit, before=before)
+        next_before = encode_prediction_cursor(predictions[-1]) if len(predictions) == limit else None
+        
+        predictions = [expand_prediction(doc) for doc in predictions]
+        for doc in predictions:
+            if doc.get('input_data'):
+                doc['input_data'] = {name: doc['input_data'].get(name) for name in SUMMARY_INPUT_FIELDS}
+        return jsonify({
+            'success': True,
+            'predictions': predictions,
+            'count': len(predictions),
+            'next_before': next_before
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/users/predictions/summary', methods=['GET'])
+@token_required
+def get_predictions_summary(current_user):
+    try:
+        summary = get_prediction_summary(current_user['email'])
+        return jsonify({'success': True, 'summary': summary})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/users/predictions/<prediction_id>', methods=['GET'])
+@token_required
+def get_prediction_detail(current_user, prediction_id):
+    try:
+        prediction = get_user_prediction(current_user['email'], prediction_id)
+        if not prediction:
+            return jsonify({'success': False, 'error': 'Prediction not found'}), 404
+        return jsonify({'success': True, 'prediction': expand_prediction(prediction, with_explanation=True)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/users/predictions/<prediction_id>/actual', methods=['POST'])
+@token_required
+def report_actual_cost(current_user, prediction_id):
+    try:
+        actual_cost = float(request.json.get('actual_cost'))
+        if not actual_cost >= 0:
+            return jsonify({'success': False, 'error': 'actual_cost must be a non-negative number'}), 400
+        if not record_actual_cost(current_user['email'], prediction_id, actual_cost):
+            return jsonify({'success': False, 'error': 'Prediction not found'}), 404
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def export_response(rows, columns):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+    if export_format == 'csv':
+        return Response(stream_with_context(stream_csv(rows, columns)), mimetype='text/csv')
+    return Response(stream_with_context(stream_ndjson(rows)), mimetype='application/x-ndjson')
+
+@app.route('/api/admin/export/users', methods=['GET'])
+@admin_required
+def export_users():
+    try:
+        rows = user_rows(**parse_export_args(request.args))
+        return export_response(rows, USER_COLUMNS)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/admin/export/predictions', methods=['GET'])
+@admin_required
+@models_required
+def export_predictions():
+    try:
+        rows = prediction_rows(**parse_export_args(request.args))
+        return export_response(rows, prediction_columns(feature_names))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+CHAT_OPTION_RESPONSES = {
+    'quick_estimate': "I can help you get a quick cost estimate! Please fill out the prediction form below with your health information, and I'll calculate your estimated annual medical costs using our advanced ensemble learning models.",
+    'health_tips': "Here are some health tips to help reduce medical costs:\n\n1. **Stay Active**: Regular physical activity (aim for 10,000 steps daily) can reduce healthcare costs by up to 30%\n2. **Maintain Healthy BMI**: Keep your BMI between 18.5-24.9\n3. **Manage Stress**: High stress levels (7+/10) correlate with higher medical costs\n4. **Regular Checkups**: Preventive care can catch issues early\n5. **Quality Sleep**: 7-9 hours per night improves health outcomes",
+    'insurance_info': "Understanding insurance can help reduce costs:\n\n• **Private Insurance**: Typically covers 70-90% of costs but has higher premiums\n• **Government Insurance**: Usually covers 50-70% with lower premiums\n• **No Insurance**: You pay 100% out-of-pocket\n\nOur system considers your insurance type and coverage percentage to give accurate cost predictions.",
+    'cost_factors': "Major factors affecting your medical costs:\n\n1. **Age**: Costs typically increase with age\n2. **Chronic Conditions**: Diabetes, hypertension, heart disease significantly impact costs\n3. **Lifestyle**: Smoking, low activity, poor sleep increase costs\n4. **Previous Year Costs**: Strong predictor of future costs\n5. **Location**: Urban areas often have higher medical costs than rural\n\nUse the form below to see how these factors affect YOUR estimated costs!"
+}
+
+CHAT_OPTION_FALLBACK = "I'm here to help you understand medical cost predictions. Please choose an option or ask me a question!"
+
+CHAT_SYSTEM_PROMPT = """You are a medical cost prediction and insurance assistant. You ONLY answer questions about:
+1. Medical costs and healthcare pricing
+2. Health insurance (types, coverage, benefits)
+3. Medical conditions and their treatment costs
+4. Healthcare factors affecting costs (lifestyle, chronic conditions)
+5. Using the cost prediction system
+
+You MUST REFUSE to answer questions about:
+- General knowledge, trivia, or non-medical topics
+- Programming, technology (except this health system)
+- Entertainment, sports, politics, or current events
+- Any topic not directly related to healthcare costs or insurance
+
+If a user asks an off-topic question, politely respond: "I'm specialized in medical cost prediction and insurance matters only. Please ask about healthcare costs, insurance, or use the cost prediction form."
+
+Keep responses concise (2-3 paragraphs max), friendly, and informative. Remind users that predictions are estimates and not medical advice."""
+
+DISEASE_SYSTEM_PROMPT = """You are a medical knowledge mapper. Your ONLY role is to classify and profile diseases based on treatment characteristics.
+
+You must output ONLY a valid JSON object with these exact fields:
+{
+  "disease_category": "string (Cardiac, Renal, Respiratory, Digestive, Neurological, Musculoskeletal, Dermatological, Endocrine, Other)",
+  "chronic": boolean,
+  "treatment_type": "string (medication_only, procedure_based, surgery_required, lifestyle_management, mixed)",
+  "hospitalization": boolean,
+  "avg_stay_days": number (0-30),
+  "tests_required": "string (minimal, moderate, extensive)",
+  "medication_duration": "string (none, short_term, long_term, lifelong)",
+  "severity": "string (minor, moderate, severe)",
+  "specialist_required": boolean
+}
+
+DO NOT provide cost estimates. DO NOT provide medical advice. ONLY provide structured disease characteristics."""
+
+DISEASE_DISCLAIMER = 'This is an estimated cost range based on similar medical conditions and treatment complexity. Actual costs may vary significantly based on individual circumstances, location, and healthcare provider. This is NOT a medical diagnosis or treatment recommendation.'
+
+def disease_user_prompt(disease_description, existing_conditions):
+    return f"""Disease/Condition: {disease_description}
+        
+Existing Health Conditions: {', '.join(existing_conditions) if existing_conditions else 'None'}
+
+Provide disease profiling JSON:"""
+
+def parse_disease_profile(response_text):
+    try:
+        import re
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group())
+        else:
+            return json.loads(response_text)
+    except:
+        return {
+            "disease_category": "Other",
+            "chronic": False,
+            "treatment_type": "mixed",
+            "hospitalization": False,
+            "avg_stay_days": 2,
+            "tests_required": "moderate",
+            "medication_duration": "short_term",
+            "severity": "moderate",
+            "specialist_required": True
+        }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
@@ -211,6 +619,7 @@ def chat():
         message = data.get('message', '')
         input_type = data.get('type', 'text')
         
+        groq_client = get_groq_client()
         if not groq_client:
             return jsonify({
                 'success': False,
@@ -218,14 +627,7 @@ def chat():
             }), 503
         
         if input_type == 'option':
-            option_responses = {
-                'quick_estimate': "I can help you get a quick cost estimate! Please fill out the prediction form below with your health information, and I'll calculate your estimated annual medical costs using our advanced ensemble learning models.",
-                'health_tips': "Here are some health tips to help reduce medical costs:\n\n1. **Stay Active**: Regular physical activity (aim for 10,000 steps daily) can reduce healthcare costs by up to 30%\n2. **Maintain Healthy BMI**: Keep your BMI between 18.5-24.9\n3. **Manage Stress**: High stress levels (7+/10) correlate with higher medical costs\n4. **Regular Checkups**: Preventive care can catch issues early\n5. **Quality Sleep**: 7-9 hours per night improves health outcomes",
-                'insurance_info': "Understanding insurance can help reduce costs:\n\n• **Private Insurance**: Typically covers 70-90% of costs but has higher premiums\n• **Government Insurance**: Usually covers 50-70% with lower premiums\n• **No Insurance**: You pay 100% out-of-pocket\n\nOur system considers your insurance type and coverage percentage to give accurate cost predictions.",
-                'cost_factors': "Major factors affecting your medical costs:\n\n1. **Age**: Costs typically increase with age\n2. **Chronic Conditions**: Diabetes, hypertension, heart disease significantly impact costs\n3. **Lifestyle**: Smoking, low activity, poor sleep increase costs\n4. **Previous Year Costs**: Strong predictor of future costs\n5. **Location**: Urban areas often have higher medical costs than rural\n\nUse the form below to see how these factors affect YOUR estimated costs!"
-            }
-            
-            response_text = option_responses.get(message, "I'm here to help you understand medical cost predictions. Please choose an option or ask me a question!")
+            response_text = CHAT_OPTION_RESPONSES.get(message, CHAT_OPTION_FALLBACK)
             
             return jsonify({
                 'success': True,
@@ -233,32 +635,16 @@ def chat():
                 'type': 'option'
             })
         
-        system_prompt = """You are a medical cost prediction and insurance assistant. You ONLY answer questions about:
-1. Medical costs and healthcare pricing
-2. Health insurance (types, coverage, benefits)
-3. Medical conditions and their treatment costs
-4. Healthcare factors affecting costs (lifestyle, chronic conditions)
-5. Using the cost prediction system
-
-You MUST REFUSE to answer questions about:
-- General knowledge, trivia, or non-medical topics
-- Programming, technology (except this health system)
-- Entertainment, sports, politics, or current events
-- Any topic not directly related to healthcare costs or insurance
-
-If a user asks an off-topic question, politely respond: "I'm specialized in medical cost prediction and insurance matters only. Please ask about healthcare costs, insurance, or use the cost prediction form."
-
-Keep responses concise (2-3 paragraphs max), friendly, and informative. Remind users that predictions are estimates and not medical advice."""
-        
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": message}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=500
-        )
+        with LatencyTimer(LLM_LATENCY, 'chat', errors=LLM_ERRORS):
+            chat_completion = groq_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": message}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.7,
+                max_tokens=500
+            )
         
         response_text = chat_completion.choices[0].message.content
         
@@ -287,66 +673,29 @@ def profile_disease():
                 'error': 'Disease description is required'
             }), 400
         
+        groq_client = get_groq_client()
         if not groq_client:
             return jsonify({
                 'success': False,
                 'error': 'Disease profiling service not available'
             }), 503
         
-        system_prompt = """You are a medical knowledge mapper. Your ONLY role is to classify and profile diseases based on treatment characteristics.
-
-You must output ONLY a valid JSON object with these exact fields:
-{
-  "disease_category": "string (Cardiac, Renal, Respiratory, Digestive, Neurological, Musculoskeletal, Dermatological, Endocrine, Other)",
-  "chronic": boolean,
-  "treatment_type": "string (medication_only, procedure_based, surgery_required, lifestyle_management, mixed)",
-  "hospitalization": boolean,
-  "avg_stay_days": number (0-30),
-  "tests_required": "string (minimal, moderate, extensive)",
-  "medication_duration": "string (none, short_term, long_term, lifelong)",
-  "severity": "string (minor, moderate, severe)",
-  "specialist_required": boolean
-}
-
-DO NOT provide cost estimates. DO NOT provide medical advice. ONLY provide structured disease characteristics."""
-
-        user_prompt = f"""Disease/Condition: {disease_description}
+        user_prompt = disease_user_prompt(disease_description, existing_conditions)
         
-Existing Health Conditions: {', '.join(existing_conditions) if existing_conditions else 'None'}
-
-Provide disease profiling JSON:"""
-
-        completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=400
-        )
+        with LatencyTimer(LLM_LATENCY, 'profile-disease', errors=LLM_ERRORS):
+            completion = groq_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": DISEASE_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.3,
+                max_tokens=400
+            )
         
         response_text = completion.choices[0].message.content.strip()
         
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                disease_profile = json.loads(json_match.group())
-            else:
-                disease_profile = json.loads(response_text)
-        except:
-            disease_profile = {
-                "disease_category": "Other",
-                "chronic": False,
-                "treatment_type": "mixed",
-                "hospitalization": False,
-                "avg_stay_days": 2,
-                "tests_required": "moderate",
-                "medication_duration": "short_term",
-                "severity": "moderate",
-                "specialist_required": True
-            }
+        disease_profile = parse_disease_profile(response_text)
         
         cost_range = estimate_cost_from_profile(disease_profile, existing_conditions)
         
@@ -357,7 +706,7 @@ Provide disease profiling JSON:"""
             'disease_profile': disease_profile,
             'confidence': cost_range['confidence'],
             'basis': cost_range['basis'],
-            'disclaimer': 'This is an estimated cost range based on similar medical conditions and treatment complexity. Actual costs may vary significantly based on individual circumstances, location, and healthcare provider. This is NOT a medical diagnosis or treatment recommendation.'
+            'disclaimer': DISEASE_DISCLAIMER
         })
         
     except Exception as e:
@@ -366,94 +715,6 @@ Provide disease profiling JSON:"""
             'error': str(e)
         }), 400
 
-def generate_cost_explanation(feature_mapping, predicted_cost):
-    explanations = []
-    impact_factors = []
-    
-    age = feature_mapping['age']
-    if age > 60:
-        explanations.append(f"Age {age} years (Senior citizens typically have 30-40% higher costs)")
-        impact_factors.append(("Age Factor", "High", "+₹" + f"{int(predicted_cost * 0.25):,}"))
-    elif age > 45:
-        explanations.append(f"Age {age} years (Middle-aged adults have moderately higher costs)")
-        impact_factors.append(("Age Factor", "Medium", "+₹" + f"{int(predicted_cost * 0.15):,}"))
-    else:
-        explanations.append(f"Age {age} years (Younger individuals have lower baseline costs)")
-    
-    bmi = feature_mapping['bmi']
-    if bmi > 30:
-        explanations.append(f"BMI {bmi:.1f} (Obesity increases costs by 20-35%)")
-        impact_factors.append(("BMI (Obesity)", "High", "+₹" + f"{int(predicted_cost * 0.2):,}"))
-    elif bmi > 25:
-        explanations.append(f"BMI {bmi:.1f} (Overweight adds 10-15% to costs)")
-        impact_factors.append(("BMI (Overweight)", "Medium", "+₹" + f"{int(predicted_cost * 0.1):,}"))
-    elif bmi < 18.5:
-        explanations.append(f"BMI {bmi:.1f} (Underweight may require additional care)")
-    
-    if feature_mapping['smoker'] == 'Yes':
-        explanations.append("Smoking status (Smokers face 40-50% higher medical costs)")
-        impact_factors.append(("Smoking", "Very High", "+₹" + f"{int(predicted_cost * 0.35):,}"))
-    
-    chronic_count = sum([
-        feature_mapping['diabetes'],
-        feature_mapping['hypertension'],
-        feature_mapping['heart_disease'],
-        feature_mapping['asthma']
-    ])
-    
-    if chronic_count >= 2:
-        explanations.append(f"{chronic_count} chronic conditions (Multiple conditions significantly increase costs)")
-        impact_factors.append((f"{chronic_count} Chronic Conditions", "Very High", "+₹" + f"{int(predicted_cost * 0.4):,}"))
-    elif chronic_count == 1:
-        condition_name = ""
-        if feature_mapping['diabetes']: condition_name = "Diabetes"
-        elif feature_mapping['hypertension']: condition_name = "Hypertension"
-        elif feature_mapping['heart_disease']: condition_name = "Heart Disease"
-        elif feature_mapping['asthma']: condition_name = "Asthma"
-        explanations.append(f"{condition_name} (Adds 15-25% to annual costs)")
-        impact_factors.append((condition_name, "Medium", "+₹" + f"{int(predicted_cost * 0.18):,}"))
-    
-    hospital_admissions = feature_mapping['hospital_admissions']
-    if hospital_admissions > 2:
-        explanations.append(f"{hospital_admissions} hospital admissions (Frequent hospitalizations)")
-        impact_factors.append(("Hospitalizations", "High", "+₹" + f"{int(predicted_cost * 0.25):,}"))
-    elif hospital_admissions > 0:
-        explanations.append(f"{hospital_admissions} hospital admission(s) this year")
-    
-    medications = feature_mapping['medication_count']
-    if medications > 5:
-        explanations.append(f"{medications} daily medications (High medication costs)")
-        impact_factors.append(("Medications", "High", "+₹" + f"{int(predicted_cost * 0.15):,}"))
-    elif medications > 2:
-        explanations.append(f"{medications} daily medications (Moderate medication expenses)")
-    
-    activity = feature_mapping['physical_activity_level']
-    if activity == 'Low':
-        explanations.append("Low physical activity (Sedentary lifestyle increases health risks)")
-        impact_factors.append(("Low Activity", "Medium", "+₹" + f"{int(predicted_cost * 0.12):,}"))
-    elif activity == 'High':
-        explanations.append("High physical activity (Active lifestyle reduces costs by 10-15%)")
-        impact_factors.append(("High Activity", "Positive", "-₹" + f"{int(predicted_cost * 0.12):,}"))
-    
-    insurance_type = feature_mapping['insurance_type']
-    coverage_pct = feature_mapping['insurance_coverage_pct']
-    
-    out_of_pocket = predicted_cost * (100 - coverage_pct) / 100
-    explanations.append(f"{insurance_type} insurance with {coverage_pct}% coverage")
-    explanations.append(f"Out-of-pocket expense: ₹{int(out_of_pocket):,}")
-    
-    return {
-        'total_cost_inr': f"₹{int(predicted_cost):,}",
-        'summary': " | ".join(explanations[:3]) + "...",
-        'detailed_factors': impact_factors,
-        'insurance_coverage': {
-            'type': insurance_type,
-            'coverage_percentage': f"{coverage_pct}%",
-            'covered_amount': f"₹{int(predicted_cost * coverage_pct / 100):,}",
-            'out_of_pocket': f"₹{int(out_of_pocket):,}"
-        }
-    }
-
 def estimate_cost_from_profile(profile, existing_conditions):
     base_costs = {
         'minor': 5000,
@@ -527,33 +788,20 @@ def estimate_cost_from_profile(profile, existing_conditions):
     }
 
 @app.route('/api/predict', methods=['POST'])
+@models_required
 def predict():
     try:
+        stages = StageTimer(PREDICT_STAGE_SECONDS)
         data = request.json
         
         features = {}
         
-        feature_mapping = {
-            'age': float(data.get('age', 30)),
-            'gender': data.get('gender', 'Male'),
-            'bmi': float(data.get('bmi', 25)),
-            'smoker': data.get('smoker', 'No'),
-            'diabetes': int(data.get('diabetes', 0)),
-            'hypertension': int(data.get('hypertension', 0)),
-            'heart_disease': int(data.get('heart_disease', 0)),
-            'asthma': int(data.get('asthma', 0)),
-            'physical_activity_level': data.get('physical_activity_level', 'Medium'),
-            'daily_steps': float(data.get('daily_steps', 5000)),
-            'sleep_hours': float(data.get('sleep_hours', 7)),
-            'stress_level': float(data.get('stress_level', 5)),
-            'doctor_visits_per_year': int(data.get('doctor_visits_per_year', 2)),
-            'hospital_admissions': int(data.get('hospital_admissions', 0)),
-            'medication_count': int(data.get('medication_count', 0)),
-            'insurance_type': data.get('insurance_type', 'Government'),
-            'insurance_coverage_pct': float(data.get('insurance_coverage_pct', 50)),
-            'city_type': data.get('city_type', 'Urban'),
-            'previous_year_cost': float(data.get('previous_year_cost', 5000))
-        }
+        feature_mapping = parse_profile(data)
+        # The warm-up request runs in the pre-fork master and is not live traffic.
+        warming_up = g.get('warm_up', False)
+        if drift_monitor and not warming_up:
+            drift_monitor.update(feature_mapping)
+        scoring_started = time.perf_counter()
         
         for col, value in feature_mapping.items():
             if col in label_encoders:
@@ -564,36 +812,69 @@ def predict():
             else:
                 features[col] = value
         
-        input_df = pd.DataFrame([features], columns=feature_names)
+        stages.mark('encode')
         
-        input_scaled = scaler.transform(input_df)
+        segment, bundle = segment_registry.route(feature_mapping)
+        stages.mark('segment')
         
-        prediction = ensemble_model.predict(input_scaled)[0]
+        import numpy as np
+        import pandas as pd
+        input_df = pd.DataFrame([features], columns=feature_names)
         
-        individual_predictions = {}
-        models_dir = 'models'
-        model_files = {
-            'Random Forest': 'random_forest_model.pkl',
-            'Gradient Boosting': 'gradient_boosting_model.pkl',
-            'XGBoost': 'xgboost_model.pkl',
-            'AdaBoost': 'adaboost_model.pkl',
-            'Extra Trees': 'extra_trees_model.pkl'
-        }
+        input_scaled = bundle['scaler'].transform(input_df)
+        stages.mark('scale')
         
-        for name, filename in model_files.items():
-            try:
-                model = joblib.load(f'{models_dir}/{filename}')
-                individual_predictions[name] = float(model.predict(input_scaled)[0])
-            except:
-                pass
+        # Score each voting member once and average them ourselves, rather than
+        # calling ensemble_model.predict() and then every member again.
+        individual_predictions = {}
+        deviations = []
+        for name, model in bundle['models'].items():
+            point, per_tree = member_predict(model, input_scaled)
+            individual_predictions[name] = float(point[0])
+            if per_tree is not None:
+                deviations.append(per_tree - point)
+            stages.mark(f'member:{name}')
+        
+        prediction = float(np.average(list(individual_predictions.values()), weights=bundle['weights']))
+        scoring_latency = time.perf_counter() - scoring_started
+        stages.mark('voting')
+        
+        prediction_interval = interval_at(prediction_intervals(
+            np.array([prediction]),
+            np.array(list(individual_predictions.values()))[:, None],
+            np.vstack(deviations) if deviations else None
+        ), 0)
+        stages.mark('interval')
         
         cost_explanation = generate_cost_explanation(feature_mapping, prediction)
+        stages.mark('explanation')
+        
+        # The percentile index and the shadow candidate are both built from the
+        # global bundle, so a segment-routed request is also scored by it and
+        # ranked and compared on that score.
+        global_prediction, global_members, global_latency = prediction, individual_predictions, scoring_latency
+        if segment != FALLBACK and (percentile_index or shadow):
+            global_started = time.perf_counter()
+            global_bundle = segment_registry.fallback
+            global_scores, member_scores, _ = score_matrix(
+                input_df.to_numpy(dtype=float), feature_names, global_bundle['scaler'], global_bundle['models'], global_bundle['weights']
+            )
+            global_prediction = float(global_scores[0])
+            global_members = {name: float(member_scores[row, 0]) for row, name in enumerate(global_bundle['models'])}
+            global_latency = time.perf_counter() - global_started
+            stages.mark('global')
+        
+        percentile = rank_prediction(percentile_index, feature_mapping, global_prediction) if percentile_index else None
+        stages.mark('percentile')
         
         result = {
             'success': True,
             'prediction': float(prediction),
             'prediction_inr': float(prediction),
             'individual_predictions': individual_predictions,
+            'prediction_interval': prediction_interval,
+            'percentile': percentile,
+            'segment': segment,
             'cost_explanation': cost_explanation,
             'input_summary': {
                 'age': feature_mapping['age'],
@@ -608,18 +889,21 @@ def predict():
             }
         }
         
+        # Sampling and an unblocking enqueue are all the candidate bundle costs this request.
+        if shadow and not warming_up:
+            shadow.submit(feature_mapping, global_prediction, global_members, global_latency)
+        
         user_email = data.get('user_email')
         if user_email:
             try:
-                save_prediction(user_email, {
-                    'prediction': float(prediction),
-                    'prediction_inr': float(prediction),
-                    'input_data': feature_mapping,
-                    'cost_explanation': cost_explanation,
-                    'individual_predictions': individual_predictions
-                })
+                ensure_model_registered()
+                save_prediction(user_email, compact_prediction(
+                    prediction, feature_mapping, individual_predictions, model_version, model_schema,
+                    segment=segment, segment_version=bundle['version']
+                ))
             except:
                 pass
+            stages.mark('db_write')
         
         return jsonify(result)
         
@@ -629,135 +913,257 @@ def predict():
             'error': str(e)
         }), 400
 
-@app.route('/api/statistics', methods=['GET'])
-def get_statistics():
+@app.route('/api/predict/batch', methods=['POST'])
+@models_required
+def predict_batch():
     try:
-        stats = {
-            'total_records': len(dataset),
-            'cost_statistics': {
-                'mean': float(dataset['annual_medical_cost'].mean()),
-                'median': float(dataset['annual_medical_cost'].median()),
-                'min': float(dataset['annual_medical_cost'].min()),
-                'max': float(dataset['annual_medical_cost'].max()),
-                'std': float(dataset['annual_medical_cost'].std())
-            },
-            'age_statistics': {
-                'mean': float(dataset['age'].mean()),
-                'min': float(dataset['age'].min()),
-                'max': float(dataset['age'].max())
-            },
-            'categorical_distributions': {
-                'gender': dataset['gender'].value_counts().to_dict(),
-                'smoker': dataset['smoker'].value_counts().to_dict(),
-                'insurance_type': dataset['insurance_type'].value_counts().to_dict(),
-                'city_type': dataset['city_type'].value_counts().to_dict()
-            }
-        }
+        data = request.json
+        profiles = data.get('profiles')
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({'success': False, 'error': 'A non-empty list of profiles is required'}), 400
+        if len(profiles) > MAX_BATCH_ROWS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_ROWS} profiles per request'}), 400
         
-        return jsonify(stats)
+        rows = [parse_profile(profile) for profile in profiles]
+        matrix = encode_rows(rows, model_schema)
+        predictions, members, intervals, segments = score_segmented(segment_registry, rows, matrix, feature_names)
+        
+        return jsonify({
+            'success': True,
+            'count': len(profiles),
+            'predictions': [
+                {
+                    'prediction': float(predictions[i]),
+                    'individual_predictions': {name: float(values[i]) for name, values in members.items() if values[i] == values[i]},
+                    'prediction_interval': interval_at(intervals, i),
+                    'segment': segments[i]
+                }
+                for i in range(len(profiles))
+            ]
+        })
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
 
-@app.route('/api/visualizations', methods=['GET'])
-def get_visualizations():
+@app.route('/api/predict/recommendations', methods=['POST'])
+@models_required
+def predict_recommendations():
     try:
-        viz_data = {}
-        
-        age_bins = [0, 20, 30, 40, 50, 60, 70, 80, 100]
-        age_labels = ['<20', '20-30', '30-40', '40-50', '50-60', '60-70', '70-80', '80+']
-        dataset['age_group'] = pd.cut(dataset['age'], bins=age_bins, labels=age_labels)
-        age_cost = dataset.groupby('age_group', observed=True)['annual_medical_cost'].mean()
-        viz_data['line_chart'] = {
-            'labels': age_labels,
-            'data': [float(age_cost.get(label, 0)) if pd.notna(age_cost.get(label, 0)) else 0.0 for label in age_labels]
-        }
+        stages = StageTimer(PREDICT_STAGE_SECONDS)
+        profile = parse_profile(request.json)
+        # Recommended changes never touch the segment columns, so one bundle serves the whole search.
+        segment, bundle = segment_registry.route(profile)
         
-        insurance_cost = dataset.groupby('insurance_type')['annual_medical_cost'].mean()
-        viz_data['bar_chart'] = {
-            'labels': [str(x) for x in insurance_cost.index.tolist()],
-            'data': [float(x) for x in insurance_cost.values.tolist()]
-        }
+        result = recommend(profile, model_schema, feature_names, bundle['scaler'], bundle['models'], bundle['weights'])
+        result['segment'] = segment
+        stages.mark('recommendations')
         
-        conditions_count = {
-            'Diabetes': int(dataset['diabetes'].sum()),
-            'Hypertension': int(dataset['hypertension'].sum()),
-            'Heart Disease': int(dataset['heart_disease'].sum()),
-            'Asthma': int(dataset['asthma'].sum()),
-            'No Conditions': int(len(dataset) - (dataset['diabetes'] + dataset['hypertension'] + 
-                                            dataset['heart_disease'] + dataset['asthma']).sum())
-        }
-        viz_data['pie_chart'] = {
-            'labels': list(conditions_count.keys()),
-            'data': list(conditions_count.values())
-        }
+        result['success'] = True
+        return jsonify(result)
         
-        city_cost = dataset.groupby('city_type')['annual_medical_cost'].mean().sort_values()
-        viz_data['area_chart'] = {
-            'labels': [str(x) for x in city_cost.index.tolist()],
-            'data': [float(x) for x in city_cost.values.tolist()]
-        }
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/predict/sensitivity', methods=['POST'])
+@models_required
+def predict_sensitivity():
+    try:
+        stages = StageTimer(PREDICT_STAGE_SECONDS)
+        data = request.json
         
-        doctor_visits_groups = dataset.groupby('doctor_visits_per_year').agg({
-            'annual_medical_cost': 'mean',
-            'age': 'count'
-        }).reset_index()
-        viz_data['scatter_chart'] = {
-            'labels': [f"{int(row['doctor_visits_per_year'])} visits" for _, row in doctor_visits_groups.iterrows()],
-            'x_data': [float(row['doctor_visits_per_year']) for _, row in doctor_visits_groups.iterrows()],
-            'y_data': [float(row['annual_medical_cost']) for _, row in doctor_visits_groups.iterrows()],
-            'sizes': [float(row['age']) * 2 for _, row in doctor_visits_groups.iterrows()]
+        profile = parse_profile(data.get('profile', {}))
+        features = {
+            feature: sweep_values(feature, spec, model_schema)
+            for feature, spec in data.get('features', {}).items()
         }
+        pairs = [tuple(pair) for pair in data.get('pairs', [])]
+        for pair in pairs:
+            if len(pair) != 2 or pair[0] == pair[1] or any(feature not in features for feature in pair):
+                return jsonify({'success': False, 'error': 'Each pair must name two different swept features'}), 400
+        if not features:
+            return jsonify({'success': False, 'error': 'At least one feature to sweep is required'}), 400
         
-        polar_labels = []
-        polar_data = []
+        matrix, curves, grids = build_sensitivity_matrix(profile, features, pairs, model_schema)
+        stages.mark('sensitivity:encode')
         
-        combinations = [
-            ('Male', 'Yes', 'Male Smokers'),
-            ('Male', 'No', 'Male Non-Smokers'),
-            ('Female', 'Yes', 'Female Smokers'),
-            ('Female', 'No', 'Female Non-Smokers')
-        ]
-        
-        for gender, smoker, label in combinations:
-            avg_cost = dataset[(dataset['gender'] == gender) & (dataset['smoker'] == smoker)]['annual_medical_cost'].mean()
-            polar_labels.append(label)
-            polar_data.append(float(avg_cost) if pd.notna(avg_cost) else 0.0)
+        # Every variant is routed like /api/predict would route it, so sweeping
+        # a segment column crosses bundles; each segment is scored in one pass.
+        rows = sensitivity_rows(profile, curves, grids, segment_registry.columns)
+        predictions, _, _, segments = score_segmented(segment_registry, rows, matrix, feature_names)
+        stages.mark('sensitivity:score')
         
-        viz_data['polar_chart'] = {
-            'labels': polar_labels,
-            'data': polar_data
-        }
+        base_prediction, curve_results, grid_results = split_sensitivity(predictions, curves, grids)
         
-        return jsonify(viz_data)
+        return jsonify({
+            'success': True,
+            'base_prediction': base_prediction,
+            'curves': curve_results,
+            'grids': grid_results,
+            'segment': segments[0],
+            'segments': sorted(set(segments)),
+            'rows_scored': int(matrix.shape[0])
+        })
         
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+def analytics_version():
+    return f'{dataset_hash}:{model_version}'
+
+def build_statistics():
+    return {
+        'total_records': len(dataset),
+        'cost_statistics': {
+            'mean': float(dataset['annual_medical_cost'].mean()),
+            'median': float(dataset['annual_medical_cost'].median()),
+            'min': float(dataset['annual_medical_cost'].min()),
+            'max': float(dataset['annual_medical_cost'].max()),
+            'std': float(dataset['annual_medical_cost'].std())
+        },
+        'age_statistics': {
+            'mean': float(dataset['age'].mean()),
+            'min': float(dataset['age'].min()),
+            'max': float(dataset['age'].max())
+        },
+        'categorical_distributions': {
+            'gender': dataset['gender'].value_counts().to_dict(),
+            'smoker': dataset['smoker'].value_counts().to_dict(),
+            'insurance_type': dataset['insurance_type'].value_counts().to_dict(),
+            'city_type': dataset['city_type'].value_counts().to_dict()
+        }
+    }
+
+@app.route('/api/statistics', methods=['GET'])
+@models_required
+def get_statistics():
+    try:
+        filters = parse_filters(request.args)
+        if filters:
+            return jsonify(cohort_statistics(cohort_index, filters))
+        return cached_json('statistics', analytics_version(), build_statistics)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+def build_visualizations():
+    import pandas as pd
+    viz_data = {}
+    
+    dataset['age_group'] = pd.cut(dataset['age'], bins=AGE_BINS, labels=AGE_LABELS)
+    age_cost = dataset.groupby('age_group', observed=True)['annual_medical_cost'].mean()
+    viz_data['line_chart'] = {
+        'labels': AGE_LABELS,
+        'data': age_cost.reindex(AGE_LABELS).fillna(0.0).to_numpy(dtype=float)
+    }
+    
+    insurance_cost = dataset.groupby('insurance_type')['annual_medical_cost'].mean()
+    viz_data['bar_chart'] = {
+        'labels': insurance_cost.index.astype(str).tolist(),
+        'data': insurance_cost.to_numpy(dtype=float)
+    }
+    
+    conditions_count = {
+        'Diabetes': int(dataset['diabetes'].sum()),
+        'Hypertension': int(dataset['hypertension'].sum()),
+        'Heart Disease': int(dataset['heart_disease'].sum()),
+        'Asthma': int(dataset['asthma'].sum()),
+        'No Conditions': int(len(dataset) - (dataset['diabetes'] + dataset['hypertension'] + 
+                                        dataset['heart_disease'] + dataset['asthma']).sum())
+    }
+    viz_data['pie_chart'] = {
+        'labels': list(conditions_count.keys()),
+        'data': list(conditions_count.values())
+    }
+    
+    city_cost = dataset.groupby('city_type')['annual_medical_cost'].mean().sort_values()
+    viz_data['area_chart'] = {
+        'labels': city_cost.index.astype(str).tolist(),
+        'data': city_cost.to_numpy(dtype=float)
+    }
+    
+    doctor_visits_groups = dataset.groupby('doctor_visits_per_year').agg({
+        'annual_medical_cost': 'mean',
+        'age': 'count'
+    }).reset_index()
+    viz_data['scatter_chart'] = {
+        'labels': (doctor_visits_groups['doctor_visits_per_year'].astype(int).astype(str) + ' visits').tolist(),
+        'x_data': doctor_visits_groups['doctor_visits_per_year'].to_numpy(dtype=float),
+        'y_data': doctor_visits_groups['annual_medical_cost'].to_numpy(dtype=float),
+        'sizes': doctor_visits_groups['age'].to_numpy(dtype=float) * 2
+    }
+    
+    polar_labels = []
+    polar_data = []
+    
+    combinations = [
+        ('Male', 'Yes', 'Male Smokers'),
+        ('Male', 'No', 'Male Non-Smokers'),
+        ('Female', 'Yes', 'Female Smokers'),
+        ('Female', 'No', 'Female Non-Smokers')
+    ]
+    
+    for gender, smoker, label in combinations:
+        avg_cost = dataset[(dataset['gender'] == gender) & (dataset['smoker'] == smoker)]['annual_medical_cost'].mean()
+        polar_labels.append(label)
+        polar_data.append(float(avg_cost) if pd.notna(avg_cost) else 0.0)
+    
+    viz_data['polar_chart'] = {
+        'labels': polar_labels,
+        'data': polar_data
+    }
+    
+    return viz_data
+
+@app.route('/api/visualizations', methods=['GET'])
+@models_required
+def get_visualizations():
+    try:
+        filters = parse_filters(request.args)
+        if filters:
+            return jsonify(cohort_visualizations(cohort_index, filters))
+        return cached_json('visualizations', analytics_version(), build_visualizations)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+def build_feature_importance():
+    import numpy as np
+    avg_importance = {}
+    
+    for feature in feature_names:
+        importances = []
+        for model_name, importance_dict in feature_importance.items():
+            if feature in importance_dict:
+                importances.append(importance_dict[feature])
+        
+        if importances:
+            avg_importance[feature] = float(np.mean(importances))
+    
+    sorted_importance = dict(sorted(avg_importance.items(), key=lambda x: x[1], reverse=True))
+    
+    return {
+        'feature_importance': sorted_importance,
+        'top_5_features': list(sorted_importance.keys())[:5]
+    }
+
 @app.route('/api/feature-importance', methods=['GET'])
+@models_required
 def get_feature_importance():
     try:
-        avg_importance = {}
-        
-        for feature in feature_names:
-            importances = []
-            for model_name, importance_dict in feature_importance.items():
-                if feature in importance_dict:
-                    importances.append(importance_dict[feature])
-            
-            if importances:
-                avg_importance[feature] = float(np.mean(importances))
-        
-        sorted_importance = dict(sorted(avg_importance.items(), key=lambda x: x[1], reverse=True))
-        
-        return jsonify({
-            'feature_importance': sorted_importance,
-            'top_5_features': list(sorted_importance.keys())[:5]
-        })
-        
+        return cached_json('feature-importance', analytics_version(), build_feature_importance)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 if __name__ == '__main__':
-    if load_models():
-        app.run(debug=True, port=5000)
+    # The debug reloader re-executes this module in a child; only the child serves,
+    # so only it loads models and starts the drift and shadow workers.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_initialization()
+    app.run(debug=True, port=5000)
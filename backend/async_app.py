@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import wraps
+
+from quart import Quart, g, jsonify, request
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+import app as application
+from admission import init_async_admission
+from async_database import (
+    authenticate_user, create_user, get_model_schema, get_user_by_email, get_user_by_id, get_user_prediction,
+    get_user_predictions
+)
+from database import MAX_PAGE_SIZE, SUMMARY_INPUT_FIELDS, UserExistsError, encode_prediction_cursor
+from metrics import LatencyTimer, LLM_ERRORS, LLM_LATENCY, REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+from password_hashing import HashingBusy
+from prediction_codec import expand_document, is_compact
+from serialization import FastJSONProvider
+
+ASYNC_HOST = os.getenv('ASYNC_HOST', '0.0.0.0')
+ASYNC_PORT = int(os.getenv('ASYNC_PORT', 5000))
+# Threads that run the synchronous Flask routes (prediction, analytics, admin).
+ASYNC_WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', 16))
+ASYNC_LLM_CONNECTIONS = int(os.getenv('ASYNC_LLM_CONNECTIONS', 4096))
+ASYNC_LLM_TIMEOUT = float(os.getenv('ASYNC_LLM_TIMEOUT', 60))
+ASYNC_BACKLOG = int(os.getenv('ASYNC_BACKLOG', 4096))
+
+quart_app = cors(Quart(__name__, static_folder=None))
+quart_app.json = FastJSONProvider(quart_app)
+
+_groq_client = None
+
+def get_groq_client():
+    # Created on the serving loop; the connection pool is sized for many slow completions in flight.
+    global _groq_client
+    if _groq_client is None:
+        api_key = os.getenv('GROQ_API_KEY')
+        if not api_key:
+            return None
+        try:
+            import httpx
+            from groq import AsyncGroq
+            _groq_client = AsyncGroq(api_key=api_key, http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=ASYNC_LLM_CONNECTIONS, max_keepalive_connections=min(ASYNC_LLM_CONNECTIONS, 512)),
+                timeout=ASYNC_LLM_TIMEOUT
+            ))
+        except Exception as e:
+            return None
+    return _groq_client
+
+def issue_token(user_id, email):
+    import jwt
+    return jwt.encode({
+        'user_id': user_id,
+        'email': email,
+        'exp': datetime.utcnow() + timedelta(days=7)
+    }, application.JWT_SECRET, algorithm='HS256')
+
+def user_payload(user):
+    return {
+        'id': str(user['_id']),
+        'email': user['email'],
+        'name': user.get('name'),
+        'age': user.get('age'),
+        'gender': user.get('gender')
+    }
+
+async def expand_prediction(doc, with_explanation=False):
+    if not is_compact(doc):
+        return doc
+
+    expanded = expand_document(doc, await get_model_schema(doc.get('model_version')))
+    if with_explanation and expanded.get('input_data'):
+        expanded['cost_explanation'] = application.generate_cost_explanation(expanded['input_data'], expanded['prediction'])
+    return expanded
+
+def token_required(f):
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        token = None
+        if 'Authorization' in request.headers:
+            try:
+                token = request.headers['Authorization'].split(' ')[1]
+            except IndexError:
+                return jsonify({'success': False, 'error': 'Invalid token format'}), 401
+
+        if not token:
+            return jsonify({'success': False, 'error': 'Token is missing'}), 401
+
+        import jwt
+        try:
+            data = jwt.decode(token, application.JWT_SECRET, algorithms=['HS256'])
+            current_user = await get_user_by_id(data['user_id'])
+            if not current_user:
+                return jsonify({'success': False, 'error': 'User not found'}), 401
+        except jwt.ExpiredSignatureError:
+            return jsonify({'success': False, 'error': 'Token has expired'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'success': False, 'error': 'Invalid token'}), 401
+
+        return await f(current_user, *args, **kwargs)
+    return decorated
+
+@quart_app.before_serving
+async def start_executor():
+    # The Flask fallback runs on the loop's default executor; size it explicitly.
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=ASYNC_WSGI_THREADS, thread_name_prefix='wsgi')
+    )
+
+@quart_app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.in_flight = True
+    REQUESTS_IN_FLIGHT.inc()
+
+@quart_app.after_request
+async def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+
+@quart_app.teardown_request
+async def finish_request(exc):
+    if g.pop('in_flight', False):
+        REQUESTS_IN_FLIGHT.dec()
+
+# The chat and disease routes never reach the Flask hooks, so they are admitted here against the same buckets.
+init_async_admission(quart_app, application.JWT_SECRET, application.admission_policies)
+
+@quart_app.route('/api/auth/signup', methods=['POST'])
+async def signup():
+    try:
+        data = await request.get_json()
+        email = data.get('email')
+        password = data.get('password')
+        name = data.get('name')
+
+        if not email or not password or not name:
+            return jsonify({'success': False, 'error': 'Email, password, and name are required'}), 400
+
+        if len(password) < 6:
+            return jsonify({'success': False, 'error': 'Password must be at least 6 characters'}), 400
+
+        if await get_user_by_email(email):
+            return jsonify({'success': False, 'error': 'User already exists'}), 409
+
+        try:
+            user_id = await create_user(data)
+        except UserExistsError:
+            return jsonify({'success': False, 'error': 'User already exists'}), 409
+        except HashingBusy as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+
+        return jsonify({
+            'success': True,
+            'token': issue_token(user_id, email),
+            'user': {
+                'id': user_id,
+                'email': email,
+                'name': name
+            },
+            'message': 'User registered successfully'
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/auth/login', methods=['POST'])
+async def login():
+    try:
+        data = await request.get_json()
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return jsonify({'success': False, 'error': 'Email and password are required'}), 400
+
+        try:
+            user = await authenticate_user(email, password)
+        except HashingBusy as e:
+            return jsonify({'success': False, 'error': str(e)}), 503
+        if not user:
+            return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
+
+        return jsonify({
+            'success': True,
+            'token': issue_token(str(user['_id']), user['email']),
+            'user': user_payload(user)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/auth/me', methods=['GET'])
+@token_required
+async def get_current_user(current_user):
+    try:
+        return jsonify({'success': True, 'user': user_payload(current_user)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/users/predictions', methods=['GET'])
+@token_required
+async def get_predictions_history(current_user):
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_PAGE_SIZE))
+
+        predictions = await get_user_predictions(current_user['email'], limit, before=request.args.get('before'))
+        next_before = encode_prediction_cursor(predictions[-1]) if len(predictions) == limit else None
+
+        predictions = [await expand_prediction(doc) for doc in predictions]
+        for doc in predictions:
+            if doc.get('input_data'):
+                doc['input_data'] = {name: doc['input_data'].get(name) for name in SUMMARY_INPUT_FIELDS}
+        return jsonify({
+            'success': True,
+            'predictions': predictions,
+            'count': len(predictions),
+            'next_before': next_before
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/users/predictions/<prediction_id>', methods=['GET'])
+@token_required
+async def get_prediction_detail(current_user, prediction_id):
+    try:
+        prediction = await get_user_prediction(current_user['email'], prediction_id)
+        if not prediction:
+            return jsonify({'success': False, 'error': 'Prediction not found'}), 404
+        return jsonify({'success': True, 'prediction': await expand_prediction(prediction, with_explanation=True)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/chat', methods=['POST'])
+async def chat():
+    try:
+        data = await request.get_json()
+        message = data.get('message', '')
+
+        groq_client = get_groq_client()
+        if not groq_client:
+            return jsonify({
+                'success': False,
+                'error': 'Chat service not available. Please set GROQ_API_KEY environment variable.'
+            }), 503
+
+        if data.get('type', 'text') == 'option':
+            return jsonify({
+                'success': True,
+                'response': application.CHAT_OPTION_RESPONSES.get(message, application.CHAT_OPTION_FALLBACK),
+                'type': 'option'
+            })
+
+        with LatencyTimer(LLM_LATENCY, 'chat', errors=LLM_ERRORS):
+            chat_completion = await groq_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": application.CHAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": message}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.7,
+                max_tokens=500
+            )
+
+        return jsonify({
+            'success': True,
+            'response': chat_completion.choices[0].message.content,
+            'type': 'text'
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@quart_app.route('/api/profile-disease', methods=['POST'])
+async def profile_disease():
+    try:
+        data = await request.get_json()
+        disease_description = data.get('disease_description', '').strip()
+        existing_conditions = data.get('existing_conditions', [])
+
+        if not disease_description:
+            return jsonify({'success': False, 'error': 'Disease description is required'}), 400
+
+        groq_client = get_groq_client()
+        if not groq_client:
+            return jsonify({'success': False, 'error': 'Disease profiling service not available'}), 503
+
+        with LatencyTimer(LLM_LATENCY, 'profile-disease', errors=LLM_ERRORS):
+            completion = await groq_client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": application.DISEASE_SYSTEM_PROMPT},
+                    {"role": "user", "content": application.disease_user_prompt(disease_description, existing_conditions)}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.3,
+                max_tokens=400
+            )
+
+        disease_profile = application.parse_disease_profile(completion.choices[0].message.content.strip())
+        cost_range = application.estimate_cost_from_profile(disease_profile, existing_conditions)
+
+        return jsonify({
+            'success': True,
+            'prediction_type': 'estimated_range',
+            'cost_range': cost_range,
+            'disease_profile': disease_profile,
+            'confidence': cost_range['confidence'],
+            'basis': cost_range['basis'],
+            'disclaimer': application.DISEASE_DISCLAIMER
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+def create_application():
+    from hypercorn.middleware import AsyncioWSGIMiddleware
+
+    # Every route not defined above (prediction, analytics, admin, metrics, health)
+    # is the unchanged Flask view, run on an executor thread.
+    wsgi_fallback = AsyncioWSGIMiddleware(application.app)
+    # Matching against the full Flask route table keeps its precedence, e.g.
+    # /api/users/predictions/summary is not mistaken for a prediction id.
+    routes = application.app.url_map.bind('localhost')
+    async_endpoints = set(quart_app.view_functions)
+
+    def handled_here(scope):
+        try:
+            endpoint, _ = routes.match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return False
+        return endpoint in async_endpoints
+
+    async def dispatch(scope, receive, send):
+        if scope['type'] == 'lifespan' or (scope['type'] == 'http' and handled_here(scope)):
+            await quart_app(scope, receive, send)
+        else:
+            await wsgi_fallback(scope, receive, send)
+    return dispatch
+
+def raise_file_limit():
+    import resource
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+def main():
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from database import ensure_indexes, close_database
+
+    parser = argparse.ArgumentParser(description='Single-process asyncio server for the I/O-bound API routes')
+    parser.add_argument('--host', default=ASYNC_HOST)
+    parser.add_argument('--port', type=int, default=ASYNC_PORT)
+    args = parser.parse_args()
+
+    if not application.initialize():
+        raise RuntimeError('Failed to load models')
+    try:
+        ensure_indexes()
+    except Exception as e:
+        pass
+    close_database()
+    if application.shadow:
+        application.shadow.start()
+    raise_file_limit()
+
+    config = Config()
+    config.bind = [f'{args.host}:{args.port}']
+    config.backlog = ASYNC_BACKLOG
+    config.accesslog = None
+    asyncio.run(serve(create_application(), config))
+
+if __name__ == "__main__":
+    main()
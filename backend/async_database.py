@@ -0,0 +1,121 @@
+from datetime import datetime
+
+from database import (
+    MONGODB_URI, DESCENDING, MAX_PAGE_SIZE, PREDICTION_SUMMARY_FIELDS, UserExistsError, _command_metrics_listener,
+    _model_schemas, decode_prediction_cursor
+)
+from metrics import CACHE_REQUESTS
+from password_hashing import hash_password_async, verify_password_async, needs_rehash
+
+_client = None
+_db = None
+
+def get_database():
+    # Motor clients bind to the running event loop, so this is only called from coroutines.
+    global _client, _db
+    if _db is None:
+        if MONGODB_URI.startswith('mongomock://'):
+            from mongomock_motor import AsyncMongoMockClient
+            _client = AsyncMongoMockClient()
+        else:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            _client = AsyncIOMotorClient(MONGODB_URI, event_listeners=[_command_metrics_listener()])
+        db_name = MONGODB_URI.split('/')[-1] or 'costtreatment'
+        _db = _client[db_name]
+    return _db
+
+def close_database():
+    global _client, _db
+    if _client:
+        _client.close()
+        _client = None
+        _db = None
+
+async def create_user(user_data):
+    db = get_database()
+
+    password = user_data.get('password')
+    password_hash = await hash_password_async(password) if password else None
+
+    user_doc = {
+        'email': user_data.get('email'),
+        'name': user_data.get('name'),
+        'age': user_data.get('age'),
+        'gender': user_data.get('gender'),
+        'password_hash': password_hash,
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }
+
+    from pymongo.errors import DuplicateKeyError
+    try:
+        result = await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise UserExistsError(user_doc['email'])
+    return str(result.inserted_id)
+
+async def get_user_by_email(email):
+    return await get_database().users.find_one({'email': email})
+
+async def get_user_by_id(user_id):
+    from bson import ObjectId
+    return await get_database().users.find_one({'_id': ObjectId(user_id)})
+
+async def authenticate_user(email, password):
+    user = await get_user_by_email(email)
+    if not user or not user.get('password_hash'):
+        return None
+
+    if not await verify_password_async(password, user['password_hash']):
+        return None
+
+    if needs_rehash(user['password_hash']):
+        password_hash = await hash_password_async(password)
+        await get_database().users.update_one(
+            {'_id': user['_id'], 'password_hash': user['password_hash']},
+            {'$set': {'password_hash': password_hash, 'updated_at': datetime.utcnow()}}
+        )
+        user['password_hash'] = password_hash
+    return user
+
+async def get_model_schema(model_version):
+    # Shares the process-wide schema cache with the synchronous driver.
+    schema = _model_schemas.get(model_version)
+    if schema is not None:
+        CACHE_REQUESTS.inc('model_schema', 'hit')
+        return schema
+
+    CACHE_REQUESTS.inc('model_schema', 'miss')
+    doc = await get_database().model_versions.find_one({'_id': model_version})
+    if doc is None:
+        return None
+    doc.pop('_id')
+    doc.pop('created_at', None)
+    _model_schemas[model_version] = doc
+    return doc
+
+async def get_user_predictions(user_email, limit=10, before=None, summary=True):
+    query = {'user_email': user_email}
+    if before:
+        timestamp, object_id = decode_prediction_cursor(before)
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': object_id}}
+        ]
+
+    projection = PREDICTION_SUMMARY_FIELDS if summary else None
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    cursor = get_database().predictions.find(query, projection).sort([('timestamp', DESCENDING), ('_id', DESCENDING)]).limit(limit)
+    results = []
+    async for doc in cursor:
+        doc['_id'] = str(doc['_id'])
+        results.append(doc)
+    return results
+
+async def get_user_prediction(user_email, prediction_id):
+    from bson import ObjectId
+    doc = await get_database().predictions.find_one({'_id': ObjectId(prediction_id), 'user_email': user_email})
+    if doc:
+        doc['_id'] = str(doc['_id'])
+    return doc
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from groq_stub import StubConfig, start_stub
+from loadtest import call, free_port, percentile, start_mongod, wait_ready
+
+ROUTES = {
+    'chat': ('POST', '/api/chat', {'message': 'How does smoking affect my costs?', 'type': 'text'}),
+    'profile_disease': ('POST', '/api/profile-disease', {'disease_description': 'type 2 diabetes', 'existing_conditions': []}),
+    'history': ('GET', '/api/users/predictions?limit=20', None)
+}
+
+def process_tree(root):
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    pids, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+def sample_usage(root):
+    threads = rss_kb = 0
+    for pid in process_tree(root):
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('Threads:'):
+                        threads += int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return threads, rss_kb
+
+def watch_usage(root, stop, peak):
+    while not stop.is_set():
+        threads, rss_kb = sample_usage(root)
+        peak['threads'] = max(peak['threads'], threads)
+        peak['rss_mb'] = max(peak['rss_mb'], rss_kb / 1024)
+        stop.wait(0.25)
+
+async def fire(base_url, route, token, requests, concurrency, timeout):
+    import httpx
+
+    method, path, payload = ROUTES[route]
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    slots = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(client):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, f'{base_url}{path}', json=payload, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            results.append((status, time.perf_counter() - started))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client) for _ in range(requests)))
+        return results, time.perf_counter() - started
+
+def start_variant(variant, port, env, threads):
+    if variant == 'threaded':
+        command = [sys.executable, 'serve.py', '--workers', '1', '--threads', str(threads), '--port', str(port)]
+    else:
+        command = [sys.executable, 'async_app.py', '--port', str(port)]
+        env = dict(env, ASYNC_WSGI_THREADS=str(threads))
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+def run_variant(variant, args, env):
+    port = free_port()
+    server = start_variant(variant, port, env, args.threads)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        if not wait_ready(base_url, args.startup_timeout):
+            raise RuntimeError(f'{variant} server did not become ready')
+
+        token = None
+        if args.route == 'history':
+            status, body = call(base_url, 'POST', '/api/auth/signup', {
+                'email': f'bench-{variant}-{port}@example.com', 'password': 'bench-password', 'name': 'Benchmark User'
+            })
+            token = json.loads(body).get('token')
+
+        idle_threads, _ = sample_usage(server.pid)
+        stop, peak = threading.Event(), {'threads': 0, 'rss_mb': 0.0}
+        watcher = threading.Thread(target=watch_usage, args=(server.pid, stop, peak), daemon=True)
+        watcher.start()
+        results, elapsed = asyncio.run(fire(base_url, args.route, token, args.requests, args.concurrency, args.timeout))
+        stop.set()
+        watcher.join()
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    latencies = [latency for status, latency in results if status == 200]
+    return {
+        'requests': len(results),
+        'ok': len(latencies),
+        'failed': len(results) - len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'idle_threads': idle_threads,
+        'peak_threads': peak['threads'],
+        'peak_rss_mb': peak['rss_mb']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the threaded and asyncio servers on slow, I/O-bound routes')
+    parser.add_argument('--route', choices=sorted(ROUTES), default='chat')
+    parser.add_argument('--variants', default='threaded,async')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--concurrency', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16, help='Request threads (threaded) or WSGI fallback threads (async)')
+    parser.add_argument('--groq-latency-ms', type=float, default=2000)
+    parser.add_argument('--mongo', choices=['mongomock', 'mongod'], default='mongomock')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--startup-timeout', type=float, default=180)
+    parser.add_argument('--output', help='Write the results as JSON')
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    mongod = None
+    if args.mongo == 'mongod':
+        mongod, data_dir, mongo_uri = start_mongod()
+    else:
+        mongo_uri = 'mongomock://localhost/bench'
+    stub = start_stub(config=StubConfig(args.groq_latency_ms, 0.2))
+    env = dict(
+        os.environ, MONGODB_URI=mongo_uri, GROQ_API_KEY='stub', ADMISSION_ENABLED='0',
+        GROQ_BASE_URL=f'http://127.0.0.1:{stub.server_address[1]}'
+    )
+
+    print(f'{args.route}: {args.requests} requests at concurrency {args.concurrency}, '
+          f'upstream latency {args.groq_latency_ms:.0f} ms, {args.threads} threads')
+    print(f"{'variant':>9} {'ok':>6} {'failed':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'threads':>13} {'peak RSS MB':>12}")
+    report = {}
+    try:
+        for variant in args.variants.split(','):
+            stats = report[variant] = run_variant(variant, args, env)
+            print(f"{variant:>9} {stats['ok']:>6} {stats['failed']:>7} {stats['throughput']:>8.1f} {stats['p50_ms']:>9.0f} "
+                  f"{stats['p99_ms']:>9.0f} {stats['idle_threads']:>5} -> {stats['peak_threads']:<5} {stats['peak_rss_mb']:>12.0f}")
+    finally:
+        stub.shutdown()
+        if mongod:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': report}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import statistics
+import time
+
+from cohort import CohortIndex, cohort_statistics, parse_filters
+
+QUERIES = [
+    {'smoker': 'Yes'},
+    {'city_type': 'Urban', 'smoker': 'Yes', 'age_min': '50', 'age_max': '60', 'diabetes': '1', 'insurance_type': 'Private'},
+    {'insurance_type': 'Private,Government', 'bmi_min': '30', 'daily_steps_max': '4000'}
+]
+
+def median_us(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+def pandas_scan(frame):
+    mask = (
+        (frame['city_type'] == 'Urban') & (frame['smoker'] == 'Yes') & frame['age'].between(50, 60)
+        & (frame['diabetes'] == 1) & (frame['insurance_type'] == 'Private')
+    )
+    return frame.loc[mask, 'annual_medical_cost'].mean()
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='Time filtered cohort statistics from the bitmap index')
+    parser.add_argument('--dataset', default='../dataset/costdata.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.dataset)
+    for scale in args.scales:
+        frame = pd.concat([base] * scale, ignore_index=True)
+        started = time.perf_counter()
+        index = CohortIndex(frame)
+        build_ms = (time.perf_counter() - started) * 1000
+        print(f'{len(frame):>9} rows: index built in {build_ms:.0f} ms, '
+              f'pandas mask scan {median_us(lambda: pandas_scan(frame), args.repeats):8.1f} us')
+        for query in QUERIES:
+            filters = parse_filters(query)
+            select = median_us(lambda: index.select(filters), args.repeats)
+            full = median_us(lambda: cohort_statistics(index, filters), args.repeats)
+            print(f'    select {select:8.1f} us  statistics {full:8.1f} us  {query}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+def poll(url, started, timeout):
+    while time.monotonic() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return time.monotonic() - started, json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.02)
+    return None, None
+
+def measure(command, base_url, timeout):
+    started = time.monotonic()
+    # A new session lets us stop the debug reloader's child process as well.
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        alive_after, _ = poll(f'{base_url}/healthz', started, timeout)
+        ready_after, readiness = poll(f'{base_url}/readyz', started, timeout)
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+    return alive_after, ready_after, readiness
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time from process start to first served and first ready request')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('command', nargs='*', help='Server command (default: python app.py)')
+    args = parser.parse_args()
+
+    command = args.command or [sys.executable, 'app.py']
+    for run in range(1, args.runs + 1):
+        alive_after, ready_after, readiness = measure(command, args.url, args.timeout)
+        startup = (readiness or {}).get('startup', {})
+        alive = f'{alive_after:.2f}s' if alive_after is not None else 'timeout'
+        ready = f'{ready_after:.2f}s' if ready_after is not None else 'timeout'
+        print(f'run {run}: first response {alive}, ready {ready}, server-reported {startup}')
+
+if __name__ == "__main__":
+    main()
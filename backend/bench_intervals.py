@@ -0,0 +1,49 @@
+import argparse
+import statistics
+import time
+
+import app
+from scoring import encode_rows, parse_profile, prediction_intervals, score_matrix
+
+def median_ms(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+def point_only(matrix):
+    import numpy as np
+    import pandas as pd
+    scaled = app.scaler.transform(pd.DataFrame(matrix, columns=app.feature_names))
+    members = np.vstack([model.predict(scaled) for model in app.individual_models.values()])
+    return np.average(members, axis=0, weights=app.ensemble_model.weights)
+
+def with_intervals(matrix):
+    predictions, members, deviations = score_matrix(
+        matrix, app.feature_names, app.scaler, app.individual_models, app.ensemble_model.weights
+    )
+    return prediction_intervals(predictions, members, deviations)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare point-only scoring with per-tree prediction intervals')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 32, 256])
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    if not app.initialize():
+        print('models not available; train them with train_ensemble.py first')
+        return
+
+    rows = app.dataset.sample(n=max(args.batch_sizes), replace=True, random_state=7).to_dict('records')
+    for size in args.batch_sizes:
+        matrix = encode_rows([parse_profile(row) for row in rows[:size]], app.model_schema)
+        point = median_ms(lambda: point_only(matrix), args.repeats)
+        interval = median_ms(lambda: with_intervals(matrix), args.repeats)
+        print(f'batch {size:>5}: point-only {point:8.2f} ms  with intervals {interval:8.2f} ms '
+              f'({(interval - point) / point * 100:+.1f}%)')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            status = response.status
+            response.read()
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - started
+
+def get(url):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - started
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def ensure_user(base_url, email, password):
+    post_json(f'{base_url}/api/auth/signup', {'email': email, 'password': password, 'name': 'Benchmark User'})
+
+def probe_cheap_route(base_url, stop, latencies):
+    while not stop.is_set():
+        latencies.append(get(f'{base_url}/'))
+        time.sleep(0.05)
+
+def run(base_url, email, password, requests, concurrency):
+    ensure_user(base_url, email, password)
+
+    stop = threading.Event()
+    probe_latencies = []
+    probe = threading.Thread(target=probe_cheap_route, args=(base_url, stop, probe_latencies), daemon=True)
+    probe.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda _: post_json(f'{base_url}/api/auth/login', {'email': email, 'password': password}),
+            range(requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    probe.join()
+
+    latencies = [latency for _, latency in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    print(f'logins: {requests} at concurrency {concurrency} in {elapsed:.2f}s -> {requests / elapsed:.1f} req/s')
+    print(f'status codes: {statuses}')
+    print(f'login latency ms: p50={percentile(latencies, 50) * 1000:.1f} '
+          f'p95={percentile(latencies, 95) * 1000:.1f} p99={percentile(latencies, 99) * 1000:.1f} '
+          f'mean={statistics.mean(latencies) * 1000:.1f}')
+    print(f'cheap route latency during burst ms: p50={percentile(probe_latencies, 50) * 1000:.1f} '
+          f'p99={percentile(probe_latencies, 99) * 1000:.1f} (n={len(probe_latencies)})')
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure login throughput and its effect on other routes')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', default='bench-login@example.com')
+    parser.add_argument('--password', default='benchmark-password')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    run(args.url, args.email, args.password, args.requests, args.concurrency)
+
+if __name__ == "__main__":
+    main()
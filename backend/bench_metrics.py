@@ -0,0 +1,68 @@
+import argparse
+import statistics
+import time
+
+import metrics
+
+def per_call_ns(fn, iterations):
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - started) / iterations
+
+def micro(iterations):
+    histogram = metrics.Histogram('bench_histogram_seconds', 'benchmark', ('stage',))
+    counter = metrics.Counter('bench_counter', 'benchmark', ('cache', 'result'))
+    stages = metrics.StageTimer(histogram)
+
+    results = {
+        'Histogram.observe': per_call_ns(lambda: histogram.observe(0.0042, 'encode'), iterations),
+        'StageTimer.mark': per_call_ns(lambda: stages.mark('encode'), iterations),
+        'Counter.inc': per_call_ns(lambda: counter.inc('http_body', 'hit'), iterations)
+    }
+    for name, ns in results.items():
+        print(f'{name:>20}: {ns:8.0f} ns/call')
+
+    # One /api/predict does ~10 stage marks, one latency observation and a gauge inc/dec.
+    per_predict_us = (10 * results['StageTimer.mark'] + results['Histogram.observe'] + 2 * results['Counter.inc']) / 1000
+    print(f'estimated instrumentation cost per predict: {per_predict_us:.1f} us')
+
+def end_to_end(requests):
+    import app
+
+    if not app.initialize():
+        print('models not available; skipping end-to-end comparison')
+        return
+
+    client = app.app.test_client()
+    payload = {'age': 45, 'bmi': 31.2, 'smoker': 'Yes', 'diabetes': 1}
+
+    def run():
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            client.post('/api/predict', json=payload)
+            latencies.append(time.perf_counter() - started)
+        return statistics.median(latencies) * 1000
+
+    run()
+    metrics.METRICS_ENABLED = False
+    disabled = run()
+    metrics.METRICS_ENABLED = True
+    enabled = run()
+    print(f'/api/predict median: metrics off {disabled:.3f} ms, on {enabled:.3f} ms '
+          f'({(enabled - disabled) / disabled * 100:+.2f}%)')
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure metrics instrumentation overhead')
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--micro-only', action='store_true')
+    args = parser.parse_args()
+
+    micro(args.iterations)
+    if not args.micro_only:
+        end_to_end(args.requests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import gzip
+import random
+import time
+from datetime import datetime, timedelta
+
+import serialization
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def synthetic_payloads(history_size):
+    rng = random.Random(7)
+    features = {
+        'age': 45, 'gender': 'Male', 'bmi': 31.2, 'smoker': 'Yes', 'diabetes': 1, 'hypertension': 0,
+        'heart_disease': 0, 'asthma': 0, 'physical_activity_level': 'Low', 'daily_steps': 4000,
+        'sleep_hours': 6.5, 'stress_level': 7, 'doctor_visits_per_year': 4, 'hospital_admissions': 1,
+        'medication_count': 3, 'insurance_type': 'Private', 'insurance_coverage_pct': 70, 'city_type': 'Urban',
+        'previous_year_cost': 42000.0
+    }
+    explanation = {
+        'key_factors': [{'factor': f'Factor {i}', 'impact': 'High', 'description': 'x' * 80} for i in range(6)],
+        'summary': 'Your estimated cost is driven mainly by lifestyle and chronic conditions. ' * 3
+    }
+    history = [
+        {
+            '_id': f'{i:024x}',
+            'user_email': 'bench@example.com',
+            'timestamp': (datetime(2026, 1, 1) + timedelta(hours=i)).isoformat(),
+            'prediction': rng.uniform(5000, 90000),
+            'prediction_inr': rng.uniform(400000, 7000000),
+            'input_data': features,
+            'individual_predictions': {name: rng.uniform(5000, 90000) for name in ('random_forest', 'gradient_boosting', 'xgboost')},
+            'cost_explanation': explanation
+        }
+        for i in range(history_size)
+    ]
+    return {
+        'predict': {
+            'success': True, 'prediction': 41234.5, 'prediction_inr': 3422463.5,
+            'individual_predictions': {'random_forest': 40000.1, 'gradient_boosting': 41500.2, 'xgboost': 42200.3},
+            'cost_explanation': explanation, 'input_data': features
+        },
+        'history': {'success': True, 'predictions': history, 'count': len(history)}
+    }
+
+def app_payloads():
+    import app
+
+    if not app.initialize():
+        return {}
+    with app.app.test_request_context('/api/predict', method='POST', json={'age': 45, 'bmi': 31.2, 'smoker': 'Yes'}):
+        predict_payload = app.predict.__wrapped__().get_json()
+    return {
+        'statistics': app.build_statistics(),
+        'visualizations': app.build_visualizations(),
+        'feature-importance': app.build_feature_importance(),
+        'predict': predict_payload
+    }
+
+def per_call_us(fn, payload, iterations):
+    fn(payload)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(payload)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def report(name, payload, iterations):
+    stdlib_us = per_call_us(serialization.SERIALIZERS['json'], payload, iterations)
+    line = f'{name:>20}: json {stdlib_us:9.1f} us'
+    if 'orjson' in serialization.SERIALIZERS:
+        orjson_us = per_call_us(serialization.SERIALIZERS['orjson'], payload, iterations)
+        line += f'  orjson {orjson_us:9.1f} us ({stdlib_us / orjson_us:4.1f}x)'
+
+    body = serialization.dumps_bytes(payload)
+    line += f'  raw {len(body):8d} B  gzip {len(gzip.compress(body, compresslevel=6)):7d} B'
+    if brotli is not None:
+        line += f'  br {len(brotli.compress(body, quality=4)):7d} B'
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON serializers and compressed sizes of API payloads')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--history-size', type=int, default=100)
+    parser.add_argument('--synthetic', action='store_true', help='skip loading models and use synthetic payloads only')
+    args = parser.parse_args()
+
+    payloads = synthetic_payloads(args.history_size)
+    if not args.synthetic:
+        loaded = app_payloads()
+        if not loaded:
+            print('models not available; using synthetic payloads only')
+        payloads.update(loaded)
+
+    for name, payload in payloads.items():
+        report(name, payload, args.iterations)
+
+if __name__ == "__main__":
+    main()
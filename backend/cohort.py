@@ -0,0 +1,219 @@
+import os
+
+CATEGORICAL_COLUMNS = ['gender', 'smoker', 'insurance_type', 'city_type', 'physical_activity_level']
+BINARY_COLUMNS = ['diabetes', 'hypertension', 'heart_disease', 'asthma']
+NUMERIC_COLUMNS = [
+    'age', 'bmi', 'daily_steps', 'sleep_hours', 'stress_level', 'doctor_visits_per_year',
+    'hospital_admissions', 'medication_count', 'insurance_coverage_pct', 'previous_year_cost',
+    'annual_medical_cost'
+]
+TARGET = 'annual_medical_cost'
+# The dataset spells a missing insurance as "None", which read_csv parses as NaN.
+MISSING_CATEGORY = 'None'
+RANGE_BINS = int(os.getenv('COHORT_RANGE_BINS', 64))
+
+# Right-closed bands, as pd.cut draws them on the unfiltered dashboard: 20 is '<20', 80 is '70-80'.
+AGE_BINS = [0, 20, 30, 40, 50, 60, 70, 80, 100]
+AGE_LABELS = ['<20', '20-30', '30-40', '40-50', '50-60', '60-70', '70-80', '80+']
+CONDITION_LABELS = {'diabetes': 'Diabetes', 'hypertension': 'Hypertension', 'heart_disease': 'Heart Disease', 'asthma': 'Asthma'}
+POLAR_COMBINATIONS = [
+    ('Male', 'Yes', 'Male Smokers'),
+    ('Male', 'No', 'Male Non-Smokers'),
+    ('Female', 'Yes', 'Female Smokers'),
+    ('Female', 'No', 'Female Non-Smokers')
+]
+
+def age_group_codes(ages):
+    import numpy as np
+    return np.clip(np.searchsorted(AGE_BINS, np.asarray(ages, dtype=float), side='left') - 1, 0, len(AGE_LABELS) - 1)
+
+def fill_missing_categories(frame):
+    return frame.fillna({col: MISSING_CATEGORY for col in CATEGORICAL_COLUMNS if col in frame})
+
+class CohortIndex:
+    def __init__(self, frame):
+        import numpy as np
+        frame = fill_missing_categories(frame)
+        self.size = len(frame)
+        self.all = np.packbits(np.ones(self.size, dtype=bool))
+        self.empty = np.zeros_like(self.all)
+        self.popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+        self.bit_masks = np.array([128 >> bit for bit in range(8)], dtype=np.uint8)
+
+        # One packed bitmap per distinct value of every categorical and binary column.
+        self.bitmaps = {}
+        for col in CATEGORICAL_COLUMNS + BINARY_COLUMNS:
+            column = frame[col].to_numpy().astype(str)
+            self.bitmaps[col] = {value: np.packbits(column == value) for value in np.unique(column)}
+
+        # Numeric ranges use prefix bitmaps over the sorted order every `step` rows;
+        # a query ORs in at most `step` edge rows on top of the nearest prefix.
+        self.step = max(1, -(-self.size // RANGE_BINS))
+        self.ranges = {}
+        for col in NUMERIC_COLUMNS:
+            column = frame[col].to_numpy(dtype=float)
+            order = np.argsort(column, kind='stable')
+            running = np.zeros(self.size, dtype=bool)
+            prefixes = [np.packbits(running)]
+            for start in range(0, self.size, self.step):
+                running[order[start:start + self.step]] = True
+                prefixes.append(np.packbits(running))
+            self.ranges[col] = (column[order], order, np.vstack(prefixes))
+
+        self.cost = frame[TARGET].to_numpy(dtype=float)
+        self.age = frame['age'].to_numpy(dtype=float)
+        self.conditions = {col: frame[col].to_numpy(dtype=int) for col in BINARY_COLUMNS}
+        self.groups = {
+            col: np.unique(frame[col].to_numpy().astype(str), return_inverse=True)
+            for col in ('gender', 'smoker', 'insurance_type', 'city_type')
+        }
+        self.groups['age_group'] = (np.array(AGE_LABELS), age_group_codes(self.age))
+        self.groups['doctor_visits_per_year'] = np.unique(frame['doctor_visits_per_year'].to_numpy(dtype=int), return_inverse=True)
+
+    def _prefix(self, col, position):
+        import numpy as np
+        _, order, prefixes = self.ranges[col]
+        block = position // self.step
+        packed = prefixes[block].copy()
+        rows = order[block * self.step:position]
+        if len(rows):
+            np.bitwise_or.at(packed, rows >> 3, self.bit_masks[rows & 7])
+        return packed
+
+    def range_bitmap(self, col, low=None, high=None):
+        import numpy as np
+        sorted_values = self.ranges[col][0]
+        start = 0 if low is None else int(np.searchsorted(sorted_values, low, side='left'))
+        stop = self.size if high is None else int(np.searchsorted(sorted_values, high, side='right'))
+        if stop <= start:
+            return self.empty.copy()
+        return self._prefix(col, stop) & ~self._prefix(col, start)
+
+    def value_bitmap(self, col, values):
+        bitmap = self.empty.copy()
+        for value in values:
+            bitmap |= self.bitmaps[col].get(value, self.empty)
+        return bitmap
+
+    def select(self, filters):
+        bitmap = self.all.copy()
+        for col, values in filters.get('equals', {}).items():
+            bitmap &= self.value_bitmap(col, values)
+        for col, (low, high) in filters.get('ranges', {}).items():
+            bitmap &= self.range_bitmap(col, low, high)
+        return bitmap
+
+    def count(self, bitmap):
+        return int(self.popcount[bitmap].sum())
+
+    def rows(self, bitmap):
+        import numpy as np
+        # Only bytes with a bit set are unpacked, so a query costs a scan of N/8
+        # bytes plus the cohort size rather than an N-length mask per column.
+        blocks = np.flatnonzero(bitmap)
+        bits = np.unpackbits(bitmap[blocks]).reshape(-1, 8).astype(bool)
+        return (blocks[:, None] * 8 + np.arange(8))[bits]
+
+    def group_stats(self, rows, group, cost=None):
+        import numpy as np
+        labels, codes = self.groups[group]
+        selected = codes[rows]
+        counts = np.bincount(selected, minlength=len(labels))
+        sums = np.bincount(selected, weights=self.cost[rows] if cost is None else cost, minlength=len(labels))
+        means = np.divide(sums, counts, out=np.zeros(len(labels)), where=counts > 0)
+        return labels, counts, means
+
+def parse_filters(args):
+    filters = {'equals': {}, 'ranges': {}}
+    for key, raw in args.items():
+        if key in CATEGORICAL_COLUMNS or key in BINARY_COLUMNS:
+            filters['equals'][key] = [value.strip() for value in raw.split(',') if value.strip()]
+        elif key.endswith(('_min', '_max')) and key[:-4] in NUMERIC_COLUMNS:
+            low, high = filters['ranges'].get(key[:-4], (None, None))
+            if key.endswith('_min'):
+                low = float(raw)
+            else:
+                high = float(raw)
+            filters['ranges'][key[:-4]] = (low, high)
+        # Anything else (cache-busters, tracking parameters) is not a filter.
+    return filters if filters['equals'] or filters['ranges'] else None
+
+def describe_filters(filters):
+    described = dict(filters['equals'])
+    described.update({col: {'min': low, 'max': high} for col, (low, high) in filters['ranges'].items()})
+    return described
+
+def cohort_statistics(index, filters):
+    import numpy as np
+    rows = index.rows(index.select(filters))
+    cost = index.cost[rows]
+    age = index.age[rows]
+    distributions = {}
+    for col in ('gender', 'smoker', 'insurance_type', 'city_type'):
+        labels, counts, _ = index.group_stats(rows, col, cost)
+        distributions[col] = {str(label): int(count) for label, count in zip(labels, counts) if count}
+
+    return {
+        'filters': describe_filters(filters),
+        'total_records': len(rows),
+        'cost_statistics': {
+            'mean': float(cost.mean()),
+            'median': float(np.median(cost)),
+            'min': float(cost.min()),
+            'max': float(cost.max()),
+            'std': float(cost.std(ddof=1)) if len(cost) > 1 else 0.0
+        } if len(cost) else None,
+        'age_statistics': {
+            'mean': float(age.mean()),
+            'min': float(age.min()),
+            'max': float(age.max())
+        } if len(age) else None,
+        'categorical_distributions': distributions
+    }
+
+def cohort_visualizations(index, filters):
+    import numpy as np
+    rows = index.rows(index.select(filters))
+    cost = index.cost[rows]
+    viz_data = {'filters': describe_filters(filters), 'total_records': len(rows)}
+
+    _, _, age_means = index.group_stats(rows, 'age_group', cost)
+    viz_data['line_chart'] = {'labels': AGE_LABELS, 'data': age_means}
+
+    labels, counts, means = index.group_stats(rows, 'insurance_type', cost)
+    present = counts > 0
+    viz_data['bar_chart'] = {'labels': labels[present].tolist(), 'data': means[present]}
+
+    condition_counts = {label: int(index.conditions[col][rows].sum()) for col, label in CONDITION_LABELS.items()}
+    condition_counts['No Conditions'] = len(rows) - sum(condition_counts.values())
+    viz_data['pie_chart'] = {'labels': list(condition_counts.keys()), 'data': list(condition_counts.values())}
+
+    labels, counts, means = index.group_stats(rows, 'city_type', cost)
+    present = np.flatnonzero(counts > 0)
+    present = present[np.argsort(means[present], kind='stable')]
+    viz_data['area_chart'] = {'labels': labels[present].tolist(), 'data': means[present]}
+
+    visits, counts, means = index.group_stats(rows, 'doctor_visits_per_year', cost)
+    present = counts > 0
+    viz_data['scatter_chart'] = {
+        'labels': [f'{visit} visits' for visit in visits[present]],
+        'x_data': visits[present].astype(float),
+        'y_data': means[present],
+        'sizes': counts[present].astype(float) * 2
+    }
+
+    # Gender and smoker codes combine into one key, so all four means come from one bincount.
+    genders, gender_codes = index.groups['gender']
+    smokers, smoker_codes = index.groups['smoker']
+    gender_index = {str(label): i for i, label in enumerate(genders)}
+    smoker_index = {str(label): i for i, label in enumerate(smokers)}
+    combined = gender_codes[rows] * len(smokers) + smoker_codes[rows]
+    counts = np.bincount(combined, minlength=len(genders) * len(smokers))
+    sums = np.bincount(combined, weights=cost, minlength=len(genders) * len(smokers))
+    polar_data = []
+    for gender, smoker, _ in POLAR_COMBINATIONS:
+        key = gender_index[gender] * len(smokers) + smoker_index[smoker] if gender in gender_index and smoker in smoker_index else None
+        polar_data.append(float(sums[key] / counts[key]) if key is not None and counts[key] else 0.0)
+    viz_data['polar_chart'] = {'labels': [label for _, _, label in POLAR_COMBINATIONS], 'data': polar_data}
+
+    return viz_data
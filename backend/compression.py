@@ -0,0 +1,68 @@
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', '1') != '0'
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/csv', 'text/html'}
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_encoding(available):
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted[encoding] > 0:
+            return encoding
+    return 'identity'
+
+def compress(body, encoding, static=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if static else BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9 if static else GZIP_LEVEL, mtime=0)
+    return body
+
+def add_vary(response, header='Accept-Encoding'):
+    vary = response.headers.get('Vary')
+    if not vary:
+        response.headers['Vary'] = header
+    elif header.lower() not in vary.lower():
+        response.headers['Vary'] = f'{vary}, {header}'
+
+def compress_response(response):
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    encoding = negotiate_encoding(available_encodings())
+    add_vary(response)
+    if encoding == 'identity':
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_compression(app):
+    if COMPRESSION_ENABLED:
+        app.after_request(compress_response)
@@ -1,20 +1,75 @@
-from pymongo import MongoClient
+from collections import OrderedDict
 from datetime import datetime
+import threading
 import os
 from dotenv import load_dotenv
-import bcrypt
+from password_hashing import hash_password, verify_password, needs_rehash
+from metrics import MONGO_LATENCY, MONGO_ERRORS, CACHE_REQUESTS
 
 load_dotenv()
 
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/costtreatment')
 
+# Same values as pymongo.ASCENDING/DESCENDING; pymongo itself is imported on
+# first use so importing this module stays cheap.
+ASCENDING = 1
+DESCENDING = -1
+
+MAX_PAGE_SIZE = 100
+EXPORT_BATCH_SIZE = 1000
+DELETE_BATCH_SIZE = 1000
+SUMMARY_RECENT_WINDOW = 50
+SUMMARY_MONTHS = 24
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 1024))
+
+SUMMARY_INPUT_FIELDS = ['age', 'bmi', 'insurance_type', 'insurance_coverage_pct']
+
+PREDICTION_SUMMARY_FIELDS = {
+    'timestamp': 1,
+    'schema': 1,
+    'model_version': 1,
+    'segment': 1,
+    'features': 1,
+    'prediction': 1,
+    'prediction_inr': 1,
+    **{f'input_data.{name}': 1 for name in SUMMARY_INPUT_FIELDS}
+}
+
 _client = None
 _db = None
+_model_schemas = {}
+_summary_cache = OrderedDict()
+_summary_lock = threading.Lock()
+
+class UserExistsError(Exception):
+    pass
+
+def _command_metrics_listener():
+    from pymongo import monitoring
+    
+    class CommandMetricsListener(monitoring.CommandListener):
+        def started(self, event):
+            pass
+        
+        def succeeded(self, event):
+            MONGO_LATENCY.observe(event.duration_micros / 1e6, event.command_name)
+        
+        def failed(self, event):
+            MONGO_LATENCY.observe(event.duration_micros / 1e6, event.command_name)
+            MONGO_ERRORS.inc(event.command_name)
+    
+    return CommandMetricsListener()
 
 def get_database():
     global _client, _db
     if _db is None:
-        _client = MongoClient(MONGODB_URI)
+        if MONGODB_URI.startswith('mongomock://'):
+            # In-process stand-in for load tests; data lives only as long as the process.
+            import mongomock
+            _client = mongomock.MongoClient()
+        else:
+            from pymongo import MongoClient
+            _client = MongoClient(MONGODB_URI, event_listeners=[_command_metrics_listener()])
         db_name = MONGODB_URI.split('/')[-1] or 'costtreatment'
         _db = _client[db_name]
     return _db
@@ -26,12 +81,18 @@ def close_database():
         _client = None
         _db = None
 
-def hash_password(password):
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt)
-
-def verify_password(password, hashed):
-    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+def ensure_indexes():
+    db = get_database()
+    db.users.create_index([('email', ASCENDING)], unique=True, name='email_unique')
+    db.predictions.create_index(
+        [('user_email', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+        name='user_email_timestamp'
+    )
+    db.predictions.create_index(
+        [('actual_reported_at', ASCENDING), ('_id', ASCENDING)],
+        name='actual_reported_at',
+        partialFilterExpression={'actual_cost': {'$exists': True}}
+    )
 
 def create_user(user_data):
     db = get_database()
@@ -50,7 +111,11 @@ def create_user(user_data):
         'updated_at': datetime.utcnow()
     }
     
-    result = users.insert_one(user_doc)
+    from pymongo.errors import DuplicateKeyError
+    try:
+        result = users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise UserExistsError(user_doc['email'])
     return str(result.inserted_id)
 
 def get_user_by_email(email):
@@ -72,9 +137,17 @@ def authenticate_user(email, password):
     if not user.get('password_hash'):
         return None
     
-    if verify_password(password, user['password_hash']):
-        return user
-    return None
+    if not verify_password(password, user['password_hash']):
+        return None
+    
+    if needs_rehash(user['password_hash']):
+        password_hash = hash_password(password)
+        get_database().users.update_one(
+            {'_id': user['_id'], 'password_hash': user['password_hash']},
+            {'$set': {'password_hash': password_hash, 'updated_at': datetime.utcnow()}}
+        )
+        user['password_hash'] = password_hash
+    return user
 
 def update_user(email, user_data):
     db = get_database()
@@ -84,50 +157,258 @@ def update_user(email, user_data):
     result = users.update_one({'email': email}, {'$set': user_data})
     return result.modified_count > 0
 
+def register_model_version(model_version, schema):
+    _model_schemas[model_version] = schema
+    db = get_database()
+    db.model_versions.update_one(
+        {'_id': model_version},
+        {'$setOnInsert': {**schema, 'created_at': datetime.utcnow()}},
+        upsert=True
+    )
+
+def get_model_schema(model_version):
+    schema = _model_schemas.get(model_version)
+    if schema is not None:
+        CACHE_REQUESTS.inc('model_schema', 'hit')
+        return schema
+    
+    CACHE_REQUESTS.inc('model_schema', 'miss')
+    doc = get_database().model_versions.find_one({'_id': model_version})
+    if doc is None:
+        return None
+    doc.pop('_id')
+    doc.pop('created_at', None)
+    _model_schemas[model_version] = doc
+    return doc
+
 def save_prediction(user_email, prediction_data):
     db = get_database()
     predictions = db.predictions
     
     prediction_doc = {
         'user_email': user_email,
+        'schema': prediction_data.get('schema'),
+        'model_version': prediction_data.get('model_version'),
         'prediction': prediction_data.get('prediction'),
-        'prediction_inr': prediction_data.get('prediction_inr'),
-        'input_data': prediction_data.get('input_data'),
-        'cost_explanation': prediction_data.get('cost_explanation'),
-        'individual_predictions': prediction_data.get('individual_predictions'),
+        'features': prediction_data.get('features'),
+        'members': prediction_data.get('members'),
         'timestamp': datetime.utcnow()
     }
+    if 'segment' in prediction_data:
+        prediction_doc['segment'] = prediction_data['segment']
+        prediction_doc['segment_version'] = prediction_data.get('segment_version')
     
     result = predictions.insert_one(prediction_doc)
+    invalidate_prediction_summary(user_email)
     return str(result.inserted_id)
 
-def get_user_predictions(user_email, limit=10):
+def get_latest_prediction_id(user_email):
+    db = get_database()
+    doc = db.predictions.find_one(
+        {'user_email': user_email},
+        {'_id': 1},
+        sort=[('timestamp', DESCENDING), ('_id', DESCENDING)]
+    )
+    return doc['_id'] if doc else None
+
+def get_cached_prediction_summary(user_email, latest_id):
+    with _summary_lock:
+        entry = _summary_cache.get(user_email)
+        if entry is None or entry[0] != latest_id:
+            CACHE_REQUESTS.inc('prediction_summary', 'miss')
+            return None
+        _summary_cache.move_to_end(user_email)
+    CACHE_REQUESTS.inc('prediction_summary', 'hit')
+    return entry[1]
+
+def cache_prediction_summary(user_email, latest_id, summary):
+    with _summary_lock:
+        _summary_cache[user_email] = (latest_id, summary)
+        _summary_cache.move_to_end(user_email)
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
+
+def invalidate_prediction_summary(user_email):
+    with _summary_lock:
+        _summary_cache.pop(user_email, None)
+
+def aggregate_user_predictions(user_email):
+    db = get_database()
+    predictions = db.predictions
+    
+    pipeline = [
+        {'$match': {'user_email': user_email}},
+        {'$sort': {'timestamp': -1, '_id': -1}},
+        {'$facet': {
+            'totals': [
+                {'$group': {
+                    '_id': None,
+                    'count': {'$sum': 1},
+                    'first': {'$last': '$timestamp'},
+                    'last': {'$first': '$timestamp'},
+                    'min': {'$min': '$prediction'},
+                    'mean': {'$avg': '$prediction'},
+                    'max': {'$max': '$prediction'}
+                }}
+            ],
+            'monthly': [
+                {'$group': {
+                    '_id': {'$dateToString': {'format': '%Y-%m', 'date': '$timestamp'}},
+                    'count': {'$sum': 1},
+                    'min': {'$min': '$prediction'},
+                    'mean': {'$avg': '$prediction'},
+                    'max': {'$max': '$prediction'}
+                }},
+                {'$sort': {'_id': -1}},
+                {'$limit': SUMMARY_MONTHS}
+            ],
+            'recent': [
+                {'$limit': SUMMARY_RECENT_WINDOW},
+                {'$project': {
+                    'timestamp': 1,
+                    'prediction': 1,
+                    'schema': 1,
+                    'model_version': 1,
+                    'features': 1,
+                    'members': 1,
+                    'input_data': 1,
+                    'individual_predictions': 1
+                }}
+            ]
+        }}
+    ]
+    
+    result = next(predictions.aggregate(pipeline), None) or {}
+    return {
+        'totals': (result.get('totals') or [None])[0],
+        'monthly': list(reversed(result.get('monthly', []))),
+        'recent': list(reversed(result.get('recent', [])))
+    }
+
+def encode_prediction_cursor(doc):
+    return f"{doc['timestamp'].isoformat()},{doc['_id']}"
+
+def decode_prediction_cursor(value):
+    from bson import ObjectId
+    timestamp, _, object_id = value.rpartition(',')
+    return datetime.fromisoformat(timestamp), ObjectId(object_id)
+
+def get_user_predictions(user_email, limit=10, before=None, summary=True):
     db = get_database()
     predictions = db.predictions
     
-    cursor = predictions.find({'user_email': user_email}).sort('timestamp', -1).limit(limit)
+    query = {'user_email': user_email}
+    if before:
+        timestamp, object_id = decode_prediction_cursor(before)
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': object_id}}
+        ]
+    
+    projection = PREDICTION_SUMMARY_FIELDS if summary else None
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    
+    cursor = predictions.find(query, projection).sort([('timestamp', DESCENDING), ('_id', DESCENDING)]).limit(limit)
     results = []
     for doc in cursor:
         doc['_id'] = str(doc['_id'])
         results.append(doc)
     return results
 
-def get_all_users(limit=100):
+def get_user_prediction(user_email, prediction_id):
+    from bson import ObjectId
+    db = get_database()
+    predictions = db.predictions
+    
+    doc = predictions.find_one({'_id': ObjectId(prediction_id), 'user_email': user_email})
+    if doc:
+        doc['_id'] = str(doc['_id'])
+    return doc
+
+def record_actual_cost(user_email, prediction_id, actual_cost):
+    from bson import ObjectId
+    result = get_database().predictions.update_one(
+        {'_id': ObjectId(prediction_id), 'user_email': user_email},
+        {'$set': {'actual_cost': actual_cost, 'actual_reported_at': datetime.utcnow()}}
+    )
+    if result.matched_count:
+        invalidate_prediction_summary(user_email)
+    return result.matched_count > 0
+
+def iter_reconciled_predictions(after=None, batch_size=EXPORT_BATCH_SIZE):
+    from bson import ObjectId
+    predictions = get_database().predictions
+    
+    query = {'actual_cost': {'$exists': True}}
+    if after:
+        reported_at, object_id = datetime.fromisoformat(after[0]), ObjectId(after[1])
+        query['$or'] = [
+            {'actual_reported_at': {'$gt': reported_at}},
+            {'actual_reported_at': reported_at, '_id': {'$gt': object_id}}
+        ]
+    projection = {'schema': 1, 'model_version': 1, 'features': 1, 'input_data': 1, 'actual_cost': 1, 'actual_reported_at': 1}
+    cursor = predictions.find(query, projection).sort([('actual_reported_at', ASCENDING), ('_id', ASCENDING)]).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+def _export_query(date_field, since=None, until=None, after_id=None):
+    from bson import ObjectId
+    query = {}
+    if since or until:
+        query[date_field] = {}
+        if since:
+            query[date_field]['$gte'] = since
+        if until:
+            query[date_field]['$lt'] = until
+    if after_id:
+        query['_id'] = {'$gt': ObjectId(after_id)}
+    return query
+
+def iter_users(since=None, until=None, after_id=None, batch_size=EXPORT_BATCH_SIZE):
     db = get_database()
     users = db.users
     
-    cursor = users.find().limit(limit)
+    query = _export_query('created_at', since, until, after_id)
+    cursor = users.find(query, {'password_hash': 0}).sort('_id', ASCENDING).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+def iter_predictions(since=None, until=None, after_id=None, batch_size=EXPORT_BATCH_SIZE):
+    db = get_database()
+    predictions = db.predictions
+    
+    query = _export_query('timestamp', since, until, after_id)
+    cursor = predictions.find(query, {'cost_explanation': 0}).sort('_id', ASCENDING).batch_size(batch_size)
+    try:
+        for doc in cursor:
+            yield doc
+    finally:
+        cursor.close()
+
+def get_all_users(limit=100):
     results = []
-    for doc in cursor:
+    for doc in iter_users(batch_size=limit):
         doc['_id'] = str(doc['_id'])
         results.append(doc)
+        if len(results) >= limit:
+            break
     return results
 
-def delete_user(email):
+def delete_user(email, batch_size=DELETE_BATCH_SIZE):
     db = get_database()
     users = db.users
     predictions = db.predictions
     
     users.delete_one({'email': email})
-    predictions.delete_many({'user_email': email})
+    while True:
+        ids = [doc['_id'] for doc in predictions.find({'user_email': email}, {'_id': 1}).limit(batch_size)]
+        if not ids:
+            break
+        predictions.delete_many({'_id': {'$in': ids}})
     return True
@@ -0,0 +1,196 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from metrics import Gauge
+
+DRIFT_REFERENCE_FILE = 'drift_reference.json'
+DRIFT_ENABLED = os.getenv('DRIFT_ENABLED', '1') != '0'
+DRIFT_INTERVAL = float(os.getenv('DRIFT_INTERVAL_SECONDS', 60))
+# Live counts are multiplied by this after every evaluation, so they stay
+# bounded and recent traffic outweighs old traffic.
+DRIFT_DECAY = float(os.getenv('DRIFT_DECAY', 0.5))
+DRIFT_MIN_SAMPLES = int(os.getenv('DRIFT_MIN_SAMPLES', 100))
+REFERENCE_BINS = 10
+PSI_EPSILON = 1e-4
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+NUMERIC_COLUMNS = [
+    'age', 'bmi', 'daily_steps', 'sleep_hours', 'stress_level', 'doctor_visits_per_year',
+    'hospital_admissions', 'medication_count', 'insurance_coverage_pct', 'previous_year_cost'
+]
+CATEGORICAL_COLUMNS = [
+    'gender', 'smoker', 'physical_activity_level', 'insurance_type', 'city_type',
+    'diabetes', 'hypertension', 'heart_disease', 'asthma'
+]
+OTHER = '__other__'
+
+DRIFT_PSI = Gauge('input_drift_psi', 'Population stability index of live inputs against the training data', ('feature',), mode='max')
+DRIFT_KS = Gauge('input_drift_ks', 'Binned Kolmogorov-Smirnov distance of live numeric inputs', ('feature',), mode='max')
+DRIFT_SAMPLES = Gauge('input_drift_samples', 'Decayed number of live inputs in the drift summaries')
+
+def build_reference(frame, source=None):
+    import numpy as np
+    from cohort import fill_missing_categories
+    # Live inputs carry "None" for a missing insurance, never NaN.
+    frame = fill_missing_categories(frame)
+    numeric = {}
+    for col in NUMERIC_COLUMNS:
+        values = frame[col].to_numpy(dtype=float)
+        # Inner edges at reference quantiles give roughly equal-mass bins.
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, REFERENCE_BINS + 1)[1:-1])).tolist()
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        numeric[col] = {'edges': edges, 'proportions': (counts / counts.sum()).tolist()}
+
+    categorical = {}
+    for col in CATEGORICAL_COLUMNS:
+        shares = frame[col].astype(str).value_counts(normalize=True)
+        categorical[col] = {str(value): float(share) for value, share in shares.items()}
+    return {'source': source, 'rows': len(frame), 'numeric': numeric, 'categorical': categorical}
+
+def save_reference(models_dir, reference):
+    path = f'{models_dir}/{DRIFT_REFERENCE_FILE}'
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(reference, f)
+    os.replace(f'{path}.tmp', path)
+
+def load_reference(models_dir, source):
+    path = f'{models_dir}/{DRIFT_REFERENCE_FILE}'
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        reference = json.load(f)
+    return reference if reference.get('source') == source else None
+
+def psi(expected, actual):
+    total = 0.0
+    for e, a in zip(expected, actual):
+        e, a = max(e, PSI_EPSILON), max(a, PSI_EPSILON)
+        total += (a - e) * math.log(a / e)
+    return total
+
+def binned_ks(expected, actual):
+    distance = cumulative_expected = cumulative_actual = 0.0
+    for e, a in zip(expected, actual):
+        cumulative_expected += e
+        cumulative_actual += a
+        distance = max(distance, abs(cumulative_actual - cumulative_expected))
+    return distance
+
+class DriftMonitor:
+    def __init__(self, reference):
+        self.reference = reference
+        self.lock = threading.Lock()
+        self.report = None
+        self.thread_pid = None
+        self.stopped = threading.Event()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = 0.0
+            self.numeric = {col: [0.0] * (len(spec['edges']) + 1) for col, spec in self.reference['numeric'].items()}
+            self.categorical = {col: dict.fromkeys(list(spec) + [OTHER], 0.0) for col, spec in self.reference['categorical'].items()}
+
+    def update(self, profile):
+        if self.thread_pid != os.getpid():
+            self._start()
+        # Fixed-size counters only: one bisect over ~10 edges per numeric column.
+        with self.lock:
+            self.samples += 1
+            for col, counts in self.numeric.items():
+                counts[bisect_right(self.reference['numeric'][col]['edges'], float(profile[col]))] += 1
+            for col, counts in self.categorical.items():
+                value = str(profile[col])
+                counts[value if value in counts else OTHER] += 1
+
+    def _snapshot(self, decay):
+        with self.lock:
+            samples = self.samples
+            numeric = {col: list(counts) for col, counts in self.numeric.items()}
+            categorical = {col: dict(counts) for col, counts in self.categorical.items()}
+            if decay:
+                for counts in self.numeric.values():
+                    counts[:] = [count * DRIFT_DECAY for count in counts]
+                for counts in self.categorical.values():
+                    for value in counts:
+                        counts[value] *= DRIFT_DECAY
+                self.samples *= DRIFT_DECAY
+        return samples, numeric, categorical
+
+    def _compare(self, samples, numeric, categorical):
+        features = {}
+        if samples >= DRIFT_MIN_SAMPLES:
+            for col, counts in numeric.items():
+                expected = self.reference['numeric'][col]['proportions']
+                actual = [count / samples for count in counts]
+                features[col] = {'psi': psi(expected, actual), 'ks': binned_ks(expected, actual)}
+            for col, counts in categorical.items():
+                values = list(self.reference['categorical'][col]) + [OTHER]
+                expected = [self.reference['categorical'][col].get(value, 0.0) for value in values]
+                actual = [counts[value] / samples for value in values]
+                features[col] = {'psi': psi(expected, actual), 'unseen_share': counts[OTHER] / samples}
+
+        for stats in features.values():
+            stats['status'] = 'alert' if stats['psi'] >= PSI_ALERT else 'warning' if stats['psi'] >= PSI_WARNING else 'ok'
+        return {
+            'evaluated_at': time.time(),
+            'samples': samples,
+            'enough_samples': samples >= DRIFT_MIN_SAMPLES,
+            'features': features,
+            'drifted': sorted(col for col, stats in features.items() if stats['status'] == 'alert')
+        }
+
+    def evaluate(self):
+        report = self._compare(*self._snapshot(decay=True))
+        for col, stats in report['features'].items():
+            DRIFT_PSI.set(stats['psi'], col)
+            if 'ks' in stats:
+                DRIFT_KS.set(stats['ks'], col)
+        DRIFT_SAMPLES.set(report['samples'])
+        # A window without enough traffic keeps the last meaningful report.
+        if report['features'] or self.report is None:
+            self.report = report
+        return self.report
+
+    def preview(self):
+        # The live counts as of now, compared without decaying or publishing them.
+        report = self._compare(*self._snapshot(decay=False))
+        return report if report['features'] or self.report is None else self.report
+
+    def _start(self):
+        # Started by the first live input, so it runs only in processes that serve
+        # traffic; the pre-fork master never holds a running evaluator.
+        with self.lock:
+            if self.thread_pid == os.getpid() or self.stopped.is_set():
+                return
+            self.thread_pid = os.getpid()
+
+        def run():
+            while not self.stopped.wait(DRIFT_INTERVAL):
+                self.evaluate()
+        threading.Thread(target=run, name='drift-monitor', daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+
+def main():
+    import pandas as pd
+    from http_cache import compute_digest
+
+    parser = argparse.ArgumentParser(description='Save reference input distributions for the drift monitor')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--dataset', default='../dataset/costdata.csv')
+    args = parser.parse_args()
+
+    reference = build_reference(pd.read_csv(args.dataset), compute_digest([args.dataset]))
+    save_reference(args.models_dir, reference)
+    print(f"saved reference summaries of {reference['rows']} rows to {args.models_dir}/{DRIFT_REFERENCE_FILE}")
+
+if __name__ == "__main__":
+    main()
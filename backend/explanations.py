@@ -0,0 +1,87 @@
+def generate_cost_explanation(feature_mapping, predicted_cost):
+    explanations = []
+    impact_factors = []
+    
+    age = feature_mapping['age']
+    if age > 60:
+        explanations.append(f"Age {age} years (Senior citizens typically have 30-40% higher costs)")
+        impact_factors.append(("Age Factor", "High", "+₹" + f"{int(predicted_cost * 0.25):,}"))
+    elif age > 45:
+        explanations.append(f"Age {age} years (Middle-aged adults have moderately higher costs)")
+        impact_factors.append(("Age Factor", "Medium", "+₹" + f"{int(predicted_cost * 0.15):,}"))
+    else:
+        explanations.append(f"Age {age} years (Younger individuals have lower baseline costs)")
+    
+    bmi = feature_mapping['bmi']
+    if bmi > 30:
+        explanations.append(f"BMI {bmi:.1f} (Obesity increases costs by 20-35%)")
+        impact_factors.append(("BMI (Obesity)", "High", "+₹" + f"{int(predicted_cost * 0.2):,}"))
+    elif bmi > 25:
+        explanations.append(f"BMI {bmi:.1f} (Overweight adds 10-15% to costs)")
+        impact_factors.append(("BMI (Overweight)", "Medium", "+₹" + f"{int(predicted_cost * 0.1):,}"))
+    elif bmi < 18.5:
+        explanations.append(f"BMI {bmi:.1f} (Underweight may require additional care)")
+    
+    if feature_mapping['smoker'] == 'Yes':
+        explanations.append("Smoking status (Smokers face 40-50% higher medical costs)")
+        impact_factors.append(("Smoking", "Very High", "+₹" + f"{int(predicted_cost * 0.35):,}"))
+    
+    chronic_count = sum([
+        feature_mapping['diabetes'],
+        feature_mapping['hypertension'],
+        feature_mapping['heart_disease'],
+        feature_mapping['asthma']
+    ])
+    
+    if chronic_count >= 2:
+        explanations.append(f"{chronic_count} chronic conditions (Multiple conditions significantly increase costs)")
+        impact_factors.append((f"{chronic_count} Chronic Conditions", "Very High", "+₹" + f"{int(predicted_cost * 0.4):,}"))
+    elif chronic_count == 1:
+        condition_name = ""
+        if feature_mapping['diabetes']: condition_name = "Diabetes"
+        elif feature_mapping['hypertension']: condition_name = "Hypertension"
+        elif feature_mapping['heart_disease']: condition_name = "Heart Disease"
+        elif feature_mapping['asthma']: condition_name = "Asthma"
+        explanations.append(f"{condition_name} (Adds 15-25% to annual costs)")
+        impact_factors.append((condition_name, "Medium", "+₹" + f"{int(predicted_cost * 0.18):,}"))
+    
+    hospital_admissions = feature_mapping['hospital_admissions']
+    if hospital_admissions > 2:
+        explanations.append(f"{hospital_admissions} hospital admissions (Frequent hospitalizations)")
+        impact_factors.append(("Hospitalizations", "High", "+₹" + f"{int(predicted_cost * 0.25):,}"))
+    elif hospital_admissions > 0:
+        explanations.append(f"{hospital_admissions} hospital admission(s) this year")
+    
+    medications = feature_mapping['medication_count']
+    if medications > 5:
+        explanations.append(f"{medications} daily medications (High medication costs)")
+        impact_factors.append(("Medications", "High", "+₹" + f"{int(predicted_cost * 0.15):,}"))
+    elif medications > 2:
+        explanations.append(f"{medications} daily medications (Moderate medication expenses)")
+    
+    activity = feature_mapping['physical_activity_level']
+    if activity == 'Low':
+        explanations.append("Low physical activity (Sedentary lifestyle increases health risks)")
+        impact_factors.append(("Low Activity", "Medium", "+₹" + f"{int(predicted_cost * 0.12):,}"))
+    elif activity == 'High':
+        explanations.append("High physical activity (Active lifestyle reduces costs by 10-15%)")
+        impact_factors.append(("High Activity", "Positive", "-₹" + f"{int(predicted_cost * 0.12):,}"))
+    
+    insurance_type = feature_mapping['insurance_type']
+    coverage_pct = feature_mapping['insurance_coverage_pct']
+    
+    out_of_pocket = predicted_cost * (100 - coverage_pct) / 100
+    explanations.append(f"{insurance_type} insurance with {coverage_pct}% coverage")
+    explanations.append(f"Out-of-pocket expense: ₹{int(out_of_pocket):,}")
+    
+    return {
+        'total_cost_inr': f"₹{int(predicted_cost):,}",
+        'summary': " | ".join(explanations[:3]) + "...",
+        'detailed_factors': impact_factors,
+        'insurance_coverage': {
+            'type': insurance_type,
+            'coverage_percentage': f"{coverage_pct}%",
+            'covered_amount': f"₹{int(predicted_cost * coverage_pct / 100):,}",
+            'out_of_pocket': f"₹{int(out_of_pocket):,}"
+        }
+    }
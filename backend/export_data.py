@@ -0,0 +1,160 @@
+import argparse
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from database import iter_users, iter_predictions, get_model_schema, EXPORT_BATCH_SIZE
+from prediction_codec import MODEL_NAMES, expand_document
+from serialization import dumps
+
+USER_COLUMNS = ['id', 'email', 'name', 'age', 'gender', 'created_at', 'updated_at']
+PREDICTION_COLUMNS = ['id', 'user_email', 'timestamp', 'model_version', 'prediction']
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+FLUSH_ROWS = 500
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def user_rows(since=None, until=None, after_id=None, batch_size=EXPORT_BATCH_SIZE):
+    for doc in iter_users(since, until, after_id, batch_size):
+        row = {'id': str(doc['_id'])}
+        for column in USER_COLUMNS[1:]:
+            row[column] = _format_value(doc.get(column))
+        yield row
+
+def prediction_rows(since=None, until=None, after_id=None, batch_size=EXPORT_BATCH_SIZE):
+    for doc in iter_predictions(since, until, after_id, batch_size):
+        doc = expand_document(doc, get_model_schema(doc.get('model_version')))
+        row = {
+            'id': str(doc['_id']),
+            'user_email': doc.get('user_email'),
+            'timestamp': _format_value(doc.get('timestamp')),
+            'model_version': doc.get('model_version'),
+            'prediction': doc.get('prediction')
+        }
+        row.update(doc.get('input_data') or {})
+        for name, value in (doc.get('individual_predictions') or {}).items():
+            row[f'model:{name}'] = value
+        yield row
+
+def prediction_columns(feature_names):
+    return PREDICTION_COLUMNS + list(feature_names) + [f'model:{name}' for name in MODEL_NAMES]
+
+def stream_ndjson(rows, on_flush=None):
+    buffer = []
+    last_id = None
+    for row in rows:
+        buffer.append(dumps(row))
+        last_id = row['id']
+        if len(buffer) >= FLUSH_ROWS:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+            if on_flush:
+                on_flush(last_id)
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+        if on_flush:
+            on_flush(last_id)
+
+def stream_csv(rows, columns, header=True, on_flush=None):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    if header:
+        writer.writeheader()
+
+    pending = 0
+    last_id = None
+    for row in rows:
+        writer.writerow(row)
+        last_id = row['id']
+        pending += 1
+        if pending >= FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            if on_flush:
+                on_flush(last_id)
+    if pending or buffer.tell():
+        yield buffer.getvalue()
+        if on_flush and last_id:
+            on_flush(last_id)
+
+def read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f).get('after_id')
+    return None
+
+def write_checkpoint(path, after_id):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'after_id': after_id, 'updated_at': datetime.utcnow().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+def parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+def parse_after_id(value):
+    from bson import ObjectId
+    if not value:
+        return None
+    if not ObjectId.is_valid(value):
+        raise ValueError(f'Invalid after_id: {value}')
+    return value
+
+def parse_export_args(args):
+    # Validated before the response starts: once streaming, a bad value could only
+    # surface as a truncated 200.
+    try:
+        since, until = parse_date(args.get('since')), parse_date(args.get('until'))
+    except ValueError:
+        raise ValueError('since and until must be ISO dates')
+    if since and until and since >= until:
+        raise ValueError('since must be earlier than until')
+    return {'since': since, 'until': until, 'after_id': parse_after_id(args.get('after_id'))}
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream users or predictions to NDJSON or CSV')
+    parser.add_argument('collection', choices=['users', 'predictions'])
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--since', help='ISO date, inclusive')
+    parser.add_argument('--until', help='ISO date, exclusive')
+    parser.add_argument('--checkpoint', help='File recording the last exported _id; resumes from it if present')
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument('--models-dir', default='models')
+    args = parser.parse_args()
+
+    after_id = parse_after_id(read_checkpoint(args.checkpoint))
+    since, until = parse_date(args.since), parse_date(args.until)
+
+    if args.collection == 'users':
+        rows = user_rows(since, until, after_id, args.batch_size)
+        columns = USER_COLUMNS
+    else:
+        rows = prediction_rows(since, until, after_id, args.batch_size)
+        with open(f'{args.models_dir}/feature_names.json', 'r') as f:
+            columns = prediction_columns(json.load(f))
+
+    on_flush = (lambda last_id: write_checkpoint(args.checkpoint, last_id)) if args.checkpoint else None
+    resuming = after_id is not None
+
+    with open(args.output, 'a' if resuming else 'w', newline='') as f:
+        if args.format == 'ndjson':
+            chunks = stream_ndjson(rows, on_flush)
+        else:
+            chunks = stream_csv(rows, columns, header=not resuming, on_flush=on_flush)
+
+        # Generators resume (and checkpoint) only after the chunk is flushed.
+        for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+from hashlib import blake2b
+
+FEEDBACK_DIR = os.getenv('FEEDBACK_DIR', '../dataset/feedback')
+FEEDBACK_BATCH_SIZE = int(os.getenv('FEEDBACK_BATCH_SIZE', 5000))
+MANIFEST_FILE = '_manifest.json'
+HASHES_DIR = '_hashes'
+CACHE_DIR = '_training_cache'
+CACHE_INDEX = 'index.json'
+CACHE_MAX_CHUNKS = 16
+HASH_COLUMN = 'feature_hash'
+TARGET = 'annual_medical_cost'
+
+BINARY_COLUMNS = ['diabetes', 'hypertension', 'heart_disease', 'asthma']
+INTEGER_COLUMNS = ['doctor_visits_per_year', 'hospital_admissions', 'medication_count']
+# Plausible ranges for the training data; rows outside them are rejected, not clipped.
+BOUNDS = {
+    'age': (0, 120),
+    'bmi': (10, 80),
+    'daily_steps': (0, 100000),
+    'sleep_hours': (0, 24),
+    'stress_level': (0, 10),
+    'doctor_visits_per_year': (0, 365),
+    'hospital_admissions': (0, 365),
+    'medication_count': (0, 100),
+    'insurance_coverage_pct': (0, 100),
+    'previous_year_cost': (0, math.inf),
+    TARGET: (0, math.inf)
+}
+
+def load_training_schema(models_dir):
+    import joblib
+    label_encoders = joblib.load(f'{models_dir}/label_encoders.pkl')
+    with open(f'{models_dir}/feature_names.json', 'r') as f:
+        feature_names = json.load(f)
+    return {
+        'feature_names': feature_names,
+        'categories': {col: set(str(c) for c in encoder.classes_) for col, encoder in label_encoders.items()}
+    }
+
+def validate_row(row, schema):
+    clean = {}
+    for col in schema['feature_names'] + [TARGET]:
+        value = row.get(col)
+        if value is None:
+            return None, f'missing:{col}'
+        if col in schema['categories']:
+            value = str(value)
+            if value not in schema['categories'][col]:
+                return None, f'category:{col}'
+        else:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None, f'type:{col}'
+            low, high = BOUNDS.get(col, (-math.inf, math.inf))
+            if not math.isfinite(value) or not low <= value <= high:
+                return None, f'range:{col}'
+            if col in BINARY_COLUMNS and value not in (0, 1):
+                return None, f'range:{col}'
+            if col in BINARY_COLUMNS or col in INTEGER_COLUMNS:
+                value = int(value)
+        clean[col] = value
+    return clean, None
+
+def feature_hash(row, feature_names):
+    # Numbers are canonicalised as rounded floats so a CSV integer, a decoded
+    # compact float and a validated int all hash the same.
+    canonical = '|'.join(row[col] if isinstance(row[col], str) else repr(round(float(row[col]), 6)) for col in feature_names)
+    return int.from_bytes(blake2b(canonical.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def read_manifest(store_dir):
+    path = f'{store_dir}/{MANIFEST_FILE}'
+    if not os.path.exists(path):
+        return {'parts': [], 'watermark': None, 'next_part': 0, 'rejected': {}, 'duplicates': 0}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_manifest(store_dir, manifest):
+    path = f'{store_dir}/{MANIFEST_FILE}'
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def load_hash_index(store_dir, manifest):
+    import numpy as np
+    # Only the base dataset is a duplicate: feedback parts may be superseded by a later report.
+    files = [f'{store_dir}/{part["hashes"]}' for part in manifest['parts'] if part['path'] is None]
+    arrays = [np.load(path) for path in files if os.path.exists(path)]
+    return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.uint64)
+
+def seed_store(store_dir, dataset_path, schema):
+    import numpy as np
+    import pandas as pd
+
+    manifest = read_manifest(store_dir)
+    if manifest['parts']:
+        return manifest
+    os.makedirs(f'{store_dir}/{HASHES_DIR}', exist_ok=True)
+    # Rows already in the base dataset count as seen, so feedback never duplicates them.
+    rows = pd.read_csv(dataset_path).to_dict('records')
+    hashes = np.array([feature_hash(row, schema['feature_names']) for row in rows], dtype=np.uint64)
+    np.save(f'{store_dir}/{HASHES_DIR}/seed.npy', hashes)
+    manifest['parts'].append({'path': None, 'hashes': f'{HASHES_DIR}/seed.npy', 'rows': 0, 'seeded': len(rows)})
+    write_manifest(store_dir, manifest)
+    return manifest
+
+def write_part(store_dir, manifest, rows, hashes, watermark):
+    import numpy as np
+    import pandas as pd
+
+    number = manifest['next_part']
+    partition = f'ingest_date={datetime.utcnow().date().isoformat()}'
+    os.makedirs(f'{store_dir}/{partition}', exist_ok=True)
+    path = f'{partition}/part-{number:06d}.parquet'
+
+    frame = pd.DataFrame(rows)
+    frame[HASH_COLUMN] = np.array(hashes, dtype=np.uint64)
+    frame.to_parquet(f'{store_dir}/{path}.tmp', index=False)
+    os.replace(f'{store_dir}/{path}.tmp', f'{store_dir}/{path}')
+
+    # The manifest is the commit point: files from a batch it never lists are overwritten on retry.
+    manifest['parts'].append({'path': path, 'rows': len(rows), 'written_at': datetime.utcnow().isoformat()})
+    manifest['next_part'] = number + 1
+    manifest['watermark'] = watermark
+    write_manifest(store_dir, manifest)
+
+def ingest(store_dir=FEEDBACK_DIR, models_dir='models', dataset_path='../dataset/costdata.csv', batch_size=FEEDBACK_BATCH_SIZE, max_batches=None):
+    import numpy as np
+    from database import get_model_schema, iter_reconciled_predictions
+    from prediction_codec import expand_document, is_compact
+
+    schema = load_training_schema(models_dir)
+    manifest = seed_store(store_dir, dataset_path, schema)
+    seen = load_hash_index(store_dir, manifest)
+    stats = {'read': 0, 'written': 0, 'duplicates': 0, 'replaced': 0, 'rejected': {}, 'parts': 0}
+
+    pending = {}
+    watermark = manifest['watermark']
+
+    def flush():
+        nonlocal pending
+        hashes = list(pending)
+        fresh = ~np.isin(np.array(hashes, dtype=np.uint64), seen) if hashes else np.empty(0, dtype=bool)
+        kept_rows = [pending[value] for value, keep in zip(hashes, fresh) if keep]
+        kept_hashes = [value for value, keep in zip(hashes, fresh) if keep]
+        stats['duplicates'] += len(hashes) - len(kept_rows)
+        manifest['duplicates'] = manifest.get('duplicates', 0) + len(hashes) - len(kept_rows)
+        if kept_rows:
+            write_part(store_dir, manifest, kept_rows, kept_hashes, watermark)
+            stats['written'] += len(kept_rows)
+            stats['parts'] += 1
+        else:
+            manifest['watermark'] = watermark
+            write_manifest(store_dir, manifest)
+        pending = {}
+
+    batches = 0
+    for doc in iter_reconciled_predictions(manifest['watermark'], batch_size):
+        stats['read'] += 1
+        watermark = [doc['actual_reported_at'].isoformat(), str(doc['_id'])]
+        input_data = expand_document(doc, get_model_schema(doc.get('model_version'))).get('input_data') if is_compact(doc) else doc.get('input_data')
+        row, reason = validate_row(dict(input_data or {}, **{TARGET: doc.get('actual_cost')}), schema)
+        if row is None:
+            stats['rejected'][reason] = stats['rejected'].get(reason, 0) + 1
+            manifest['rejected'][reason] = manifest['rejected'].get(reason, 0) + 1
+        else:
+            value = feature_hash(row, schema['feature_names'])
+            # Reports arrive in reporting order, so a later actual for the same
+            # features replaces the earlier one here and across parts in load_feedback().
+            if pending.pop(value, None) is not None:
+                stats['replaced'] += 1
+            pending[value] = row
+
+        if stats['read'] % batch_size == 0:
+            flush()
+            batches += 1
+            if max_batches and batches >= max_batches:
+                return stats
+    if stats['read'] % batch_size:
+        flush()
+    return stats
+
+def read_new_parts(store_dir, consumed):
+    import pandas as pd
+    manifest = read_manifest(store_dir)
+    parts = [part['path'] for part in manifest['parts'] if part['path'] and part['path'] not in consumed]
+    frame = pd.concat([pd.read_parquet(f'{store_dir}/{path}') for path in parts], ignore_index=True) if parts else None
+    return frame, parts
+
+def read_cache_index(cache_dir):
+    path = f'{cache_dir}/{CACHE_INDEX}'
+    if not os.path.exists(path):
+        return {'parts': [], 'chunks': [], 'next_chunk': 0, 'rows': 0}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_cache_chunk(cache_dir, index, frame):
+    # Chunks are never overwritten, so the index written last stays the commit point.
+    path = f'chunk-{index["next_chunk"]:06d}.parquet'
+    index['next_chunk'] += 1
+    frame.to_parquet(f'{cache_dir}/{path}.tmp', index=False)
+    os.replace(f'{cache_dir}/{path}.tmp', f'{cache_dir}/{path}')
+    return path
+
+def load_feedback(store_dir):
+    import pandas as pd
+
+    cache_dir = f'{store_dir}/{CACHE_DIR}'
+    index = read_cache_index(cache_dir)
+    chunks = {path: pd.read_parquet(f'{cache_dir}/{path}') for path in index['chunks']}
+
+    # Only parts written since the last read are opened; earlier ones come from the cached chunks.
+    frame, parts = read_new_parts(store_dir, set(index['parts']))
+    if frame is None:
+        return pd.concat(list(chunks.values()), ignore_index=True) if chunks else None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    frame = frame.drop_duplicates(HASH_COLUMN, keep='last', ignore_index=True)
+    kept = {}
+    for path, chunk in chunks.items():
+        # New rows are appended as a chunk of their own; a cached chunk is only
+        # rewritten when a later report replaces one of its rows.
+        superseded = chunk[HASH_COLUMN].isin(frame[HASH_COLUMN])
+        if not superseded.any():
+            kept[path] = chunk
+        elif not superseded.all():
+            chunk = chunk[~superseded]
+            kept[write_cache_chunk(cache_dir, index, chunk)] = chunk
+    if len(kept) >= CACHE_MAX_CHUNKS:
+        merged = pd.concat(list(kept.values()), ignore_index=True)
+        kept = {write_cache_chunk(cache_dir, index, merged): merged}
+    kept[write_cache_chunk(cache_dir, index, frame)] = frame
+    cache = pd.concat(list(kept.values()), ignore_index=True)
+
+    stale = set(index['chunks']) - set(kept)
+    index.update({'parts': index['parts'] + parts, 'chunks': list(kept), 'rows': len(cache)})
+    with open(f'{cache_dir}/{CACHE_INDEX}.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(f'{cache_dir}/{CACHE_INDEX}.tmp', f'{cache_dir}/{CACHE_INDEX}')
+    for path in stale:
+        os.remove(f'{cache_dir}/{path}')
+    return cache
+
+def main():
+    parser = argparse.ArgumentParser(description='Append reconciled predictions to the partitioned feedback training store')
+    parser.add_argument('--store', default=FEEDBACK_DIR)
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--dataset', default='../dataset/costdata.csv', help='Base training data whose rows seed the duplicate index')
+    parser.add_argument('--batch-size', type=int, default=FEEDBACK_BATCH_SIZE)
+    parser.add_argument('--max-batches', type=int)
+    args = parser.parse_args()
+
+    stats = ingest(args.store, args.models_dir, args.dataset, args.batch_size, args.max_batches)
+    print(f"read {stats['read']} reconciled predictions: wrote {stats['written']} rows in {stats['parts']} parts, "
+          f"{stats['duplicates']} duplicates, {stats['replaced']} replaced in batch, rejected {sum(stats['rejected'].values())} {stats['rejected'] or ''}")
+
+if __name__ == "__main__":
+    main()
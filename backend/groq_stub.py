@@ -0,0 +1,104 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISEASE_PROFILE = {
+    'disease_category': 'Endocrine',
+    'chronic': True,
+    'treatment_type': 'medication_only',
+    'hospitalization': False,
+    'avg_stay_days': 0,
+    'tests_required': 'moderate',
+    'medication_duration': 'long_term',
+    'severity': 'moderate',
+    'specialist_required': True
+}
+CHAT_REPLY = 'Medical costs depend mostly on age, chronic conditions, lifestyle and insurance coverage.'
+
+class StubConfig:
+    def __init__(self, latency_ms=400, jitter=0.5, failure_rate=0.0, rate_limit_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+
+    def delay(self):
+        # Lognormal around the median latency, like real completion times.
+        return self.latency_ms / 1000 * random.lognormvariate(0, self.jitter) if self.latency_ms else 0
+
+def completion(content, model):
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': {'prompt_tokens': 200, 'completion_tokens': 80, 'total_tokens': 280}
+    }
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not self.path.endswith('/chat/completions'):
+                self.send_json(404, {'error': {'message': 'not found'}})
+                return
+
+            time.sleep(config.delay())
+            roll = random.random()
+            if roll < config.rate_limit_rate:
+                self.send_json(429, {'error': {'message': 'rate limited', 'type': 'rate_limit'}}, {'retry-after': '1'})
+                return
+            if roll < config.rate_limit_rate + config.failure_rate:
+                self.send_json(500, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+                return
+
+            system = next((m['content'] for m in request.get('messages', []) if m.get('role') == 'system'), '')
+            content = json.dumps(DISEASE_PROFILE) if 'knowledge mapper' in system else CHAT_REPLY
+            self.send_json(200, completion(content, request.get('model', 'stub')))
+
+    return StubHandler
+
+def start_stub(host='127.0.0.1', port=0, config=None):
+    server = ThreadingHTTPServer((host, port), make_handler(config or StubConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='groq-stub', daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve Groq-compatible chat completions with injected latency and failures')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=400)
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.jitter, args.failure_rate, args.rate_limit_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f'Groq stub on http://{args.host}:{args.port} (set GROQ_BASE_URL to this address)')
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+
+from flask import Response, request
+
+from compression import available_encodings, compress, negotiate_encoding
+from metrics import CACHE_REQUESTS
+from serialization import dumps_bytes
+
+CACHE_MAX_AGE = int(os.getenv('ANALYTICS_CACHE_MAX_AGE', 300))
+CACHE_CONTROL = f'public, max-age={CACHE_MAX_AGE}, must-revalidate'
+
+_entries = {}
+_lock = threading.Lock()
+
+def compute_digest(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def make_etag(name, version):
+    return hashlib.sha256(f'{name}:{version}'.encode('utf-8')).hexdigest()[:32]
+
+class CachedBody:
+    def __init__(self, name, version, payload):
+        self.version = version
+        self.etag = make_etag(name, version)
+        self.bodies = {'identity': dumps_bytes(payload)}
+        for encoding in available_encodings():
+            self.bodies[encoding] = compress(self.bodies['identity'], encoding, static=True)
+
+    def variant_etag(self, encoding):
+        return self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+
+def _client_has(etag):
+    # Returns the variant tag the client holds, so the 304 repeats that tag.
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    if if_none_match.star_tag:
+        return etag
+    for tag in (etag, f'{etag}-gzip', f'{etag}-br'):
+        if if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def get_entry(name, version, build):
+    entry = _entries.get(name)
+    if entry is not None and entry.version == version:
+        CACHE_REQUESTS.inc('http_body', 'hit')
+        return entry
+    with _lock:
+        entry = _entries.get(name)
+        if entry is None or entry.version != version:
+            CACHE_REQUESTS.inc('http_body', 'miss')
+            entry = CachedBody(name, version, build())
+            _entries[name] = entry
+    return entry
+
+def cached_json(name, version, build):
+    held = _client_has(make_etag(name, version))
+    if held:
+        CACHE_REQUESTS.inc('http_etag', 'not_modified')
+        return _not_modified(held)
+
+    entry = get_entry(name, version, build)
+    encoding = negotiate_encoding(entry.bodies)
+
+    response = Response(entry.bodies[encoding], status=200, mimetype='application/json')
+    response.headers['ETag'] = f'"{entry.variant_etag(encoding)}"'
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def clear():
+    with _lock:
+        _entries.clear()
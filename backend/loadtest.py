@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from groq_stub import StubConfig, start_stub
+
+DEFAULT_MIX = {
+    'signup': 1,
+    'login': 4,
+    'history': 10,
+    'predict': 40,
+    'predict_batch': 5,
+    'statistics': 15,
+    'visualizations': 10,
+    'chat': 8,
+    'profile_disease': 7
+}
+PROFILE = {
+    'age': 45, 'gender': 'Male', 'bmi': 29.5, 'smoker': 'No', 'diabetes': 1, 'hypertension': 0,
+    'physical_activity_level': 'Medium', 'daily_steps': 6000, 'sleep_hours': 6.5, 'stress_level': 6,
+    'insurance_type': 'Private', 'city_type': 'Urban', 'previous_year_cost': 12000
+}
+REJECTED = (429, 503)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def call(base_url, method, path, payload=None, token=None, timeout=60):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(f'{base_url}{path}', data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, OSError):
+        return 0, b''
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if call(base_url, 'GET', '/readyz', timeout=2)[0] == 200:
+            return True
+        time.sleep(0.25)
+    return False
+
+class Users:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.accounts = []
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    def new_email(self):
+        with self.lock:
+            self.counter += 1
+            return f'load-{os.getpid()}-{self.counter}@example.com'
+
+    def signup(self):
+        email, password = self.new_email(), 'loadtest-password'
+        status, body = call(self.base_url, 'POST', '/api/auth/signup', {'email': email, 'password': password, 'name': 'Load Test'})
+        if status in (200, 201):
+            token = json.loads(body).get('token')
+            with self.lock:
+                self.accounts.append((email, password, token))
+        return status
+
+    def pick(self):
+        with self.lock:
+            return random.choice(self.accounts) if self.accounts else (None, None, None)
+
+def build_operations(base_url, users):
+    def login():
+        email, password, _ = users.pick()
+        return call(base_url, 'POST', '/api/auth/login', {'email': email, 'password': password})[0]
+
+    def history():
+        return call(base_url, 'GET', '/api/users/predictions?limit=20', token=users.pick()[2])[0]
+
+    def predict():
+        email = users.pick()[0]
+        profile = dict(PROFILE, age=random.randint(18, 80), bmi=round(random.uniform(18, 38), 1), user_email=email)
+        return call(base_url, 'POST', '/api/predict', profile)[0]
+
+    def predict_batch():
+        profiles = [dict(PROFILE, age=random.randint(18, 80)) for _ in range(32)]
+        return call(base_url, 'POST', '/api/predict/batch', {'profiles': profiles})[0]
+
+    def chat():
+        return call(base_url, 'POST', '/api/chat', {'message': 'How does smoking affect my costs?', 'type': 'text'})[0]
+
+    def profile_disease():
+        return call(base_url, 'POST', '/api/profile-disease', {'disease_description': 'type 2 diabetes', 'existing_conditions': []})[0]
+
+    return {
+        'signup': users.signup,
+        'login': login,
+        'history': history,
+        'predict': predict,
+        'predict_batch': predict_batch,
+        'statistics': lambda: call(base_url, 'GET', '/api/statistics')[0],
+        'visualizations': lambda: call(base_url, 'GET', '/api/visualizations')[0],
+        'chat': chat,
+        'profile_disease': profile_disease
+    }
+
+def run_open_loop(operations, mix, rate, duration, max_in_flight):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = []
+    lock = threading.Lock()
+
+    def execute(name, scheduled):
+        status = operations[name]()
+        # Latency counts from the scheduled arrival, so queueing behind a
+        # saturated server is measured instead of silently omitted.
+        latency = time.monotonic() - scheduled
+        with lock:
+            results.append((name, status, latency))
+
+    started = time.monotonic()
+    scheduled = started
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            scheduled += random.expovariate(rate)
+            if scheduled - started > duration:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(execute, random.choices(names, weights)[0], scheduled)
+    return results, time.monotonic() - started
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(results, elapsed):
+    routes = {}
+    for name, status, latency in results:
+        routes.setdefault(name, []).append((status, latency))
+    routes['all'] = [(status, latency) for _, status, latency in results]
+
+    summary = {}
+    for name, samples in routes.items():
+        latencies = [latency for _, latency in samples]
+        rejected = sum(1 for status, _ in samples if status in REJECTED)
+        errors = sum(1 for status, _ in samples if status == 0 or (status >= 400 and status not in REJECTED))
+        summary[name] = {
+            'count': len(samples),
+            'throughput': len(samples) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'error_rate': errors / len(samples),
+            'rejected_rate': rejected / len(samples)
+        }
+    return summary
+
+def print_summary(summary):
+    print(f"{'route':>16} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rejected':>9}")
+    for name, stats in sorted(summary.items(), key=lambda item: item[0] == 'all'):
+        print(f"{name:>16} {stats['count']:>7} {stats['throughput']:>8.1f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['error_rate']:>7.1%} {stats['rejected_rate']:>9.1%}")
+
+def compare(summary, baseline, tolerance):
+    regressions = []
+    for name, stats in summary.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms")
+        if stats['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append(f"{name}: error rate {previous['error_rate']:.1%} -> {stats['error_rate']:.1%}")
+    return regressions
+
+def start_mongod():
+    data_dir = tempfile.mkdtemp(prefix='loadtest-mongo-')
+    port = free_port()
+    process = subprocess.Popen(
+        ['mongod', '--dbpath', data_dir, '--port', str(port), '--bind_ip', '127.0.0.1'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return process, data_dir, f'mongodb://127.0.0.1:{port}/loadtest'
+
+def start_server(args, mongo_uri, groq_url, port):
+    env = dict(os.environ, MONGODB_URI=mongo_uri, GROQ_API_KEY='stub', GROQ_BASE_URL=groq_url, SERVE_PORT=str(port))
+    if args.no_admission:
+        env['ADMISSION_ENABLED'] = '0'
+    command = [sys.executable, 'serve.py', '--workers', str(args.workers), '--threads', str(args.threads), '--port', str(port)]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a mixed traffic profile against the API and report latency by route')
+    parser.add_argument('--url', help='Existing server to test; by default serve.py is started with local stand-ins')
+    parser.add_argument('--rate', type=float, default=20, help='Open-loop arrivals per second')
+    parser.add_argument('--duration', type=float, default=60)
+    parser.add_argument('--max-in-flight', type=int, default=256)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--mix', type=json.loads, help='JSON object of route weights, e.g. {"predict": 10, "chat": 1}')
+    parser.add_argument('--mongo', choices=['mongomock', 'mongod'], default='mongomock',
+                        help='mongomock runs in-process (forces one worker); mongod starts a throwaway server from PATH')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--no-admission', action='store_true', help='Disable admission control on the started server')
+    parser.add_argument('--groq-latency-ms', type=float, default=400)
+    parser.add_argument('--groq-failure-rate', type=float, default=0.02)
+    parser.add_argument('--groq-rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--startup-timeout', type=float, default=180)
+    parser.add_argument('--output', help='Write the per-route summary as JSON')
+    parser.add_argument('--baseline', help='Summary JSON from a previous run; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative p95 increase against the baseline')
+    args = parser.parse_args()
+
+    mix = args.mix or DEFAULT_MIX
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f'unknown routes in --mix: {sorted(unknown)}')
+
+    server = mongod = data_dir = None
+    base_url = args.url
+    try:
+        if not base_url:
+            if args.mongo == 'mongomock':
+                args.workers = 1
+                mongo_uri = 'mongomock://localhost/loadtest'
+            else:
+                mongod, data_dir, mongo_uri = start_mongod()
+            stub = start_stub(config=StubConfig(args.groq_latency_ms, 0.5, args.groq_failure_rate, args.groq_rate_limit_rate))
+            port = free_port()
+            server = start_server(args, mongo_uri, f'http://127.0.0.1:{stub.server_address[1]}', port)
+            base_url = f'http://127.0.0.1:{port}'
+
+        if not wait_ready(base_url, args.startup_timeout):
+            print('server did not become ready', file=sys.stderr)
+            sys.exit(2)
+
+        users = Users(base_url)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: users.signup(), range(args.users)))
+        if not users.accounts:
+            print('could not create any users', file=sys.stderr)
+            sys.exit(2)
+
+        print(f'{args.rate:.0f} req/s open loop for {args.duration:.0f}s against {base_url}')
+        results, elapsed = run_open_loop(build_operations(base_url, users), mix, args.rate, args.duration, args.max_in_flight)
+        summary = summarize(results, elapsed)
+        print_summary(summary)
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'rate': args.rate, 'duration': args.duration, 'mix': mix, 'routes': summary}, f, indent=2)
+
+        if args.baseline:
+            with open(args.baseline, 'r') as f:
+                regressions = compare(summary, json.load(f)['routes'], args.tolerance)
+            for regression in regressions:
+                print(f'REGRESSION {regression}')
+            if regressions:
+                sys.exit(1)
+    finally:
+        if server:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        if mongod:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') != '0'
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 1))
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REGISTRY = []
+# Set in pre-forked workers: each writes its values here and /metrics sums every worker's file.
+_worker_dir = None
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def combine(self, first, second):
+        return first + second
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def header(self):
+        return [f'# HELP {self.name}_total {self.documentation}', f'# TYPE {self.name}_total {self.kind}']
+
+    def inc(self, *labelvalues, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self, values):
+        lines = self.header()
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f'{self.name}_total{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    # mode decides how workers' values combine: 'sum' for shared totals, 'max' for per-worker estimates.
+    def __init__(self, name, documentation, labelnames=(), mode='sum'):
+        super().__init__(name, documentation, labelnames)
+        self.mode = mode
+
+    def combine(self, first, second):
+        return max(first, second) if self.mode == 'max' else first + second
+
+    def inc(self, *labelvalues, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def render(self, values):
+        lines = self.header()
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}')
+        return lines
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, *labelvalues):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * len(self.upper_bounds), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labelvalues: [list(counts), total] for labelvalues, (counts, total) in self._values.items()}
+
+    def combine(self, first, second):
+        return [[a + b for a, b in zip(first[0], second[0])], first[1] + second[1]]
+
+    def render(self, values):
+        lines = self.header()
+        for labelvalues, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class StageTimer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, stage)
+        self.last = now
+
+class LatencyTimer:
+    def __init__(self, histogram, *labelvalues, errors=None):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+        self.errors = errors
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc(*self.labelvalues, exc_type.__name__)
+        return False
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_json(path, data):
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(f'{path}.tmp', path)
+
+@contextmanager
+def _directory_lock(directory, exclusive):
+    import fcntl
+    with open(f'{directory}/{LOCK_FILE}', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _merge(snapshots, gauges=True):
+    by_name = {metric.name: metric for metric in REGISTRY}
+    merged = {}
+    for snapshot in snapshots:
+        for name, items in snapshot.items():
+            metric = by_name.get(name)
+            if metric is None or (metric.kind == 'gauge' and not gauges):
+                continue
+            values = merged.setdefault(name, {})
+            for labelvalues, value in items:
+                key = tuple(labelvalues)
+                values[key] = metric.combine(values[key], value) if key in values else value
+    return merged
+
+def _serialize(merged):
+    return {name: [[list(labelvalues), value] for labelvalues, value in values.items()] for name, values in merged.items()}
+
+def flush():
+    if _worker_dir is None:
+        return
+    snapshot = {metric.name: metric.snapshot() for metric in REGISTRY}
+    _write_json(f'{_worker_dir}/{os.getpid()}.json', _serialize(snapshot))
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        flush()
+
+def start_worker(directory):
+    global _worker_dir
+    # Anything recorded before the fork (warm-up, the master's own work) belongs to no worker.
+    for metric in REGISTRY:
+        with metric._lock:
+            metric._values.clear()
+    _worker_dir = directory
+    threading.Thread(target=_flush_loop, daemon=True, name='metrics-flush').start()
+
+def mark_process_dead(directory, pid):
+    path = f'{directory}/{pid}.json'
+    if not os.path.exists(path):
+        return
+    # Counters and histograms of exited workers live on in the archive so totals never
+    # go backwards; their gauges described live state and are dropped.
+    with _directory_lock(directory, exclusive=True):
+        archive = _merge([_read_json(f'{directory}/{ARCHIVE_FILE}'), _read_json(path)], gauges=False)
+        _write_json(f'{directory}/{ARCHIVE_FILE}', _serialize(archive))
+        os.remove(path)
+
+def reset_directory(directory):
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(f'{directory}/*.json'):
+        os.remove(path)
+
+def render():
+    if _worker_dir is None:
+        values = {metric.name: metric.snapshot() for metric in REGISTRY}
+    else:
+        flush()
+        with _directory_lock(_worker_dir, exclusive=False):
+            values = _merge(_read_json(path) for path in sorted(glob.glob(f'{_worker_dir}/*.json')))
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(values.get(metric.name, {})))
+    return '\n'.join(lines) + '\n'
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency by route, method and status', ('route', 'method', 'status'))
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being handled')
+PREDICT_STAGE_SECONDS = Histogram('predict_stage_duration_seconds', 'Time spent in each /api/predict stage', ('stage',), FAST_BUCKETS)
+LLM_LATENCY = Histogram('llm_request_duration_seconds', 'Groq completion latency by endpoint', ('endpoint',))
+LLM_ERRORS = Counter('llm_request_errors', 'Failed Groq completions by endpoint and error type', ('endpoint', 'error'))
+MONGO_LATENCY = Histogram('mongo_command_duration_seconds', 'MongoDB command latency by command', ('command',), FAST_BUCKETS)
+MONGO_ERRORS = Counter('mongo_command_errors', 'Failed MongoDB commands by command', ('command',))
+CACHE_REQUESTS = Counter('cache_requests', 'Cache lookups by cache and result', ('cache', 'result'))
@@ -0,0 +1,73 @@
+import argparse
+import json
+
+import joblib
+from pymongo import UpdateOne
+
+from database import get_database, register_model_version
+from prediction_codec import build_model_schema, compact_prediction, legacy_model_version
+
+LEGACY_FIELDS = ['input_data', 'prediction_inr', 'cost_explanation', 'individual_predictions']
+
+def load_schema(models_dir):
+    label_encoders = joblib.load(f'{models_dir}/label_encoders.pkl')
+    with open(f'{models_dir}/feature_names.json', 'r') as f:
+        feature_names = json.load(f)
+
+    schema = build_model_schema(feature_names, label_encoders)
+    return legacy_model_version(schema), schema
+
+def migrate(models_dir='models', batch_size=500, dry_run=False):
+    model_version, schema = load_schema(models_dir)
+    if not dry_run:
+        register_model_version(model_version, schema)
+
+    predictions = get_database().predictions
+    query = {'schema': {'$exists': False}}
+    projection = {'prediction': 1, 'input_data': 1, 'individual_predictions': 1}
+
+    last_id = None
+    migrated = 0
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query['_id'] = {'$gt': last_id}
+
+        docs = list(predictions.find(batch_query, projection).sort('_id', 1).limit(batch_size))
+        if not docs:
+            break
+
+        operations = []
+        for doc in docs:
+            compact = compact_prediction(
+                doc.get('prediction') or 0.0,
+                doc.get('input_data') or {},
+                doc.get('individual_predictions'),
+                model_version,
+                schema
+            )
+            operations.append(UpdateOne(
+                {'_id': doc['_id'], 'schema': {'$exists': False}},
+                {'$set': compact, '$unset': {field: '' for field in LEGACY_FIELDS}}
+            ))
+
+        if not dry_run:
+            predictions.bulk_write(operations, ordered=False)
+
+        migrated += len(docs)
+        last_id = docs[-1]['_id']
+        print(f'{"Checked" if dry_run else "Migrated"} {migrated} predictions')
+
+    return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert saved predictions to the compact storage schema')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    migrate(args.models_dir, args.batch_size, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 32))
+HASH_WAIT_SECONDS = float(os.getenv('PASSWORD_HASH_WAIT_SECONDS', 5))
+TARGET_HASH_MS = float(os.getenv('PASSWORD_HASH_TARGET_MS', 250))
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+# The cost is pinned, never measured at startup: workers timed on different or
+# busy hosts would disagree and rehash each other's passwords back and forth.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+
+class HashingBusy(Exception):
+    pass
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+_async_slots = weakref.WeakKeyDictionary()
+
+def calibrate_rounds(target_ms=TARGET_HASH_MS):
+    import bcrypt
+    sample = b'calibration-password'
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS:
+        started = time.perf_counter()
+        bcrypt.hashpw(sample, bcrypt.gensalt(rounds))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # Each extra round doubles the cost.
+        if elapsed_ms * 2 > target_ms * 1.5:
+            break
+        rounds += 1
+    return rounds
+
+def get_rounds():
+    return BCRYPT_ROUNDS
+
+def _run(fn, *args):
+    # The request thread still blocks on the result; the pool only caps how
+    # many hashes run at once so a login burst cannot take every core.
+    if not _slots.acquire(timeout=HASH_WAIT_SECONDS):
+        raise HashingBusy('Password hashing is overloaded, please retry')
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+async def _run_async(fn, *args):
+    import asyncio
+    # Coroutines queue on their own loop's semaphore instead of the threading
+    # one, so waiting for a slot never polls; both feed the same worker pool.
+    loop = asyncio.get_running_loop()
+    slots = _async_slots.get(loop)
+    if slots is None:
+        slots = _async_slots[loop] = asyncio.Semaphore(HASH_QUEUE_LIMIT)
+    try:
+        await asyncio.wait_for(slots.acquire(), HASH_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HashingBusy('Password hashing is overloaded, please retry')
+    try:
+        return await loop.run_in_executor(_executor, fn, *args)
+    finally:
+        slots.release()
+
+def _hash(password, rounds):
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds))
+
+def _verify(password, hashed):
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+
+def hash_password(password):
+    return _run(_hash, password, get_rounds())
+
+def verify_password(password, hashed):
+    return _run(_verify, password, hashed)
+
+async def hash_password_async(password):
+    return await _run_async(_hash, password, get_rounds())
+
+async def verify_password_async(password, hashed):
+    return await _run_async(_verify, password, hashed)
+
+def hash_rounds(hashed):
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed):
+    # Only ever upgrade: lowering BCRYPT_ROUNDS leaves stronger hashes alone.
+    rounds = hash_rounds(hashed)
+    return rounds is not None and rounds < get_rounds()
+
+def main():
+    parser = argparse.ArgumentParser(description='Time bcrypt on this host and suggest a BCRYPT_ROUNDS value')
+    parser.add_argument('--target-ms', type=float, default=TARGET_HASH_MS)
+    args = parser.parse_args()
+    print(f'BCRYPT_ROUNDS={calibrate_rounds(args.target_ms)}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+
+from cohort import AGE_LABELS, age_group_codes
+from http_cache import compute_digest
+from scoring import encode_frame, load_bundle, score_matrix
+
+PERCENTILE_INDEX_FILE = 'percentile_index.npz'
+# Bumped whenever segment keys change meaning, so older index files are rebuilt.
+INDEX_FORMAT = 2
+MIN_SEGMENT_SIZE = int(os.getenv('PERCENTILE_MIN_SEGMENT_SIZE', 30))
+SCORE_CHUNK_ROWS = 10000
+OVERALL = 'overall'
+
+def age_band(age):
+    return AGE_LABELS[int(age_group_codes([age])[0])]
+
+def segment_key(age, smoker, city_type):
+    return f'{age_band(age)}|{smoker}|{city_type}'
+
+def build_percentile_index(predictions, ages, smokers, city_types):
+    import numpy as np
+    keys = np.array([segment_key(*segment) for segment in zip(ages, smokers, city_types)])
+    index = {OVERALL: np.sort(predictions)}
+    for key in np.unique(keys):
+        index[key] = np.sort(predictions[keys == key])
+    return index
+
+def save_percentile_index(models_dir, index, version):
+    import numpy as np
+    path = f'{models_dir}/{PERCENTILE_INDEX_FILE}'
+    arrays = {f'segment:{key}': values for key, values in index.items()}
+    with open(f'{path}.tmp', 'wb') as f:
+        np.savez(f, version=np.array(version), format=np.array(INDEX_FORMAT), **arrays)
+    os.replace(f'{path}.tmp', path)
+
+def load_percentile_index(models_dir, version):
+    import numpy as np
+    path = f'{models_dir}/{PERCENTILE_INDEX_FILE}'
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        # An index scored by another bundle or dataset would rank against stale costs.
+        if str(data['version']) != version or 'format' not in data.files or int(data['format']) != INDEX_FORMAT:
+            return None
+        return {name[len('segment:'):]: data[name] for name in data.files if name.startswith('segment:')}
+
+def percentile_rank(sorted_values, value):
+    import numpy as np
+    size = len(sorted_values)
+    if size == 0:
+        return None
+    below = np.searchsorted(sorted_values, value, side='left')
+    at_or_below = np.searchsorted(sorted_values, value, side='right')
+    return float((below + at_or_below) / 2 / size * 100)
+
+def rank_prediction(index, profile, prediction):
+    key = segment_key(profile['age'], profile['smoker'], profile['city_type'])
+    segment = index.get(key)
+    segment_size = 0 if segment is None else len(segment)
+    return {
+        'overall': percentile_rank(index[OVERALL], prediction),
+        'segment': percentile_rank(segment, prediction) if segment_size >= MIN_SEGMENT_SIZE else None,
+        'segment_key': key,
+        'segment_size': segment_size
+    }
+
+def build_for_bundle(models_dir, dataset_path):
+    import numpy as np
+    import pandas as pd
+
+    bundle = load_bundle(models_dir)
+    dataset = pd.read_csv(dataset_path)
+
+    predictions = np.concatenate([
+        score_matrix(
+            encode_frame(dataset.iloc[start:start + SCORE_CHUNK_ROWS], bundle['schema']),
+            bundle['feature_names'], bundle['scaler'], bundle['models'], bundle['weights']
+        )[0]
+        for start in range(0, len(dataset), SCORE_CHUNK_ROWS)
+    ])
+
+    index = build_percentile_index(predictions, dataset['age'], dataset['smoker'], dataset['city_type'])
+    save_percentile_index(models_dir, index, f"{compute_digest([dataset_path])}:{bundle['version']}")
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description='Score the dataset and save sorted cost arrays for percentile ranks')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--dataset', default='../dataset/costdata.csv')
+    args = parser.parse_args()
+
+    index = build_for_bundle(args.models_dir, args.dataset)
+    print(f'indexed {len(index[OVERALL])} predictions across {len(index) - 1} segments '
+          f'into {args.models_dir}/{PERCENTILE_INDEX_FILE}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import math
+import struct
+
+from http_cache import compute_digest
+
+SCHEMA_VERSION = 2
+
+MODEL_BUNDLE_FILES = [
+    'ensemble_model.pkl',
+    'scaler.pkl',
+    'label_encoders.pkl',
+    'feature_names.json',
+    'feature_importance.json'
+]
+
+MODEL_NAMES = ['Random Forest', 'Gradient Boosting', 'XGBoost', 'AdaBoost', 'Extra Trees']
+
+INTEGER_FEATURES = {
+    'diabetes', 'hypertension', 'heart_disease', 'asthma',
+    'doctor_visits_per_year', 'hospital_admissions', 'medication_count'
+}
+
+LEGACY_VERSION_PREFIX = 'legacy-'
+# Stored for a category the schema does not know, and decoded as missing,
+# instead of being packed as the index of whatever category comes first.
+UNKNOWN_CATEGORY = -1.0
+
+def legacy_model_version(schema):
+    # Migrated documents were produced by an unknown bundle; the marker only
+    # identifies the schema their features were packed with.
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f'{LEGACY_VERSION_PREFIX}{digest}'
+
+def model_bundle_version(models_dir):
+    return compute_digest([f'{models_dir}/{filename}' for filename in MODEL_BUNDLE_FILES])
+
+def pack_floats(values):
+    return struct.pack(f'<{len(values)}d', *values)
+
+def unpack_floats(blob):
+    return list(struct.unpack(f'<{len(blob) // 8}d', blob))
+
+def build_model_schema(feature_names, label_encoders):
+    return {
+        'feature_names': list(feature_names),
+        'categories': {col: [str(c) for c in encoder.classes_] for col, encoder in label_encoders.items()},
+        'model_names': list(MODEL_NAMES)
+    }
+
+def encode_input(input_data, schema):
+    categories = schema['categories']
+    vector = []
+    for name in schema['feature_names']:
+        value = input_data.get(name)
+        if value is None:
+            vector.append(math.nan)
+        elif name in categories:
+            try:
+                vector.append(float(categories[name].index(str(value))))
+            except ValueError:
+                vector.append(UNKNOWN_CATEGORY)
+        else:
+            vector.append(float(value))
+    return pack_floats(vector)
+
+def decode_input(blob, schema):
+    categories = schema['categories']
+    input_data = {}
+    for name, value in zip(schema['feature_names'], unpack_floats(blob)):
+        if math.isnan(value) or (name in categories and value == UNKNOWN_CATEGORY):
+            input_data[name] = None
+        elif name in categories:
+            input_data[name] = categories[name][int(value)]
+        elif name in INTEGER_FEATURES:
+            input_data[name] = int(value)
+        else:
+            input_data[name] = value
+    return input_data
+
+def encode_members(individual_predictions, schema):
+    return pack_floats([
+        float(individual_predictions.get(name, math.nan))
+        for name in schema['model_names']
+    ])
+
+def decode_members(blob, schema):
+    return {
+        name: value
+        for name, value in zip(schema['model_names'], unpack_floats(blob))
+        if not math.isnan(value)
+    }
+
+def is_compact(doc):
+    return doc.get('schema') == SCHEMA_VERSION
+
+def compact_prediction(prediction, input_data, individual_predictions, model_version, schema, segment=None, segment_version=None):
+    doc = {
+        'schema': SCHEMA_VERSION,
+        'model_version': model_version,
+        'prediction': float(prediction),
+        'features': encode_input(input_data, schema),
+        'members': encode_members(individual_predictions or {}, schema)
+    }
+    # Features and members are always encoded against the global schema;
+    # the segment records which bundle actually produced the prediction.
+    if segment is not None:
+        doc['segment'] = segment
+        doc['segment_version'] = segment_version
+    return doc
+
+def expand_document(doc, schema):
+    if not is_compact(doc):
+        return doc
+
+    expanded = {k: v for k, v in doc.items() if k not in ('features', 'members', 'schema')}
+    expanded['prediction_inr'] = doc.get('prediction')
+    if schema is None:
+        return expanded
+    if 'features' in doc:
+        expanded['input_data'] = decode_input(doc['features'], schema)
+    if 'members' in doc:
+        expanded['individual_predictions'] = decode_members(doc['members'], schema)
+    return expanded
@@ -0,0 +1,74 @@
+from database import aggregate_user_predictions, get_cached_prediction_summary, cache_prediction_summary, get_latest_prediction_id, get_model_schema
+from prediction_codec import expand_document
+
+def _input_sensitivity(recent):
+    import numpy as np
+    changes = {}
+    for previous, current in zip(recent, recent[1:]):
+        before = previous.get('input_data') or {}
+        after = current.get('input_data') or {}
+        prediction_delta = (current.get('prediction') or 0.0) - (previous.get('prediction') or 0.0)
+        for name, value in after.items():
+            old_value = before.get(name)
+            if old_value is None or value is None or old_value == value:
+                continue
+            entry = changes.setdefault(name, {'input_deltas': [], 'prediction_deltas': []})
+            if isinstance(value, (int, float)) and isinstance(old_value, (int, float)):
+                entry['input_deltas'].append(float(value) - float(old_value))
+            entry['prediction_deltas'].append(prediction_delta)
+
+    sensitivity = {}
+    for name, entry in changes.items():
+        prediction_deltas = np.asarray(entry['prediction_deltas'])
+        result = {
+            'changes': len(prediction_deltas),
+            'mean_prediction_change': float(prediction_deltas.mean())
+        }
+        input_deltas = np.asarray(entry['input_deltas'])
+        if len(input_deltas) == len(prediction_deltas):
+            result['cost_per_unit'] = float(np.sum(input_deltas * prediction_deltas) / np.sum(input_deltas ** 2))
+            if len(input_deltas) > 1 and input_deltas.std() > 0 and prediction_deltas.std() > 0:
+                result['correlation'] = float(np.corrcoef(input_deltas, prediction_deltas)[0, 1])
+        sensitivity[name] = result
+    return dict(sorted(sensitivity.items(), key=lambda item: abs(item[1]['mean_prediction_change']), reverse=True))
+
+def build_prediction_summary(user_email):
+    aggregated = aggregate_user_predictions(user_email)
+    totals = aggregated['totals']
+    # mongomock groups an empty match into a zero-count row where MongoDB returns none.
+    if not totals or not totals['count']:
+        return {'count': 0, 'monthly': [], 'latest_by_model': {}, 'input_sensitivity': {}}
+
+    recent = [expand_document(doc, get_model_schema(doc.get('model_version'))) for doc in aggregated['recent']]
+    latest = recent[-1]
+
+    return {
+        'count': totals['count'],
+        'first_prediction_at': totals['first'],
+        'last_prediction_at': totals['last'],
+        'overall': {
+            'min': totals['min'],
+            'mean': totals['mean'],
+            'max': totals['max']
+        },
+        'monthly': [
+            {'month': row['_id'], 'count': row['count'], 'min': row['min'], 'mean': row['mean'], 'max': row['max']}
+            for row in aggregated['monthly']
+        ],
+        'latest': {
+            'timestamp': latest.get('timestamp'),
+            'prediction': latest.get('prediction'),
+            'model_version': latest.get('model_version')
+        },
+        'latest_by_model': latest.get('individual_predictions') or {},
+        'input_sensitivity': _input_sensitivity(recent),
+        'sensitivity_window': len(recent)
+    }
+
+def get_prediction_summary(user_email):
+    latest_id = get_latest_prediction_id(user_email)
+    summary = get_cached_prediction_summary(user_email, latest_id)
+    if summary is None:
+        summary = build_prediction_summary(user_email)
+        cache_prediction_summary(user_email, latest_id, summary)
+    return summary
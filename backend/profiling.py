@@ -0,0 +1,194 @@
+import glob
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+
+from flask import g, request
+
+from metrics import ARCHIVE_FILE, _directory_lock, _read_json, _write_json
+
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', '0') == '1'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+PROFILE_HEADER = 'X-Profile-Key'
+MAX_STACKS_PER_ROUTE = 5000
+MAX_DEPTH = 128
+PROFILE_FLUSH_SECONDS = float(os.getenv('PROFILE_FLUSH_SECONDS', 1))
+
+# Set in pre-forked workers: each adds its new samples to its own file here and
+# /api/admin/profiles merges every worker's file, as /metrics does.
+_worker_dir = None
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def fold_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.active = {}
+        self.stacks = {}
+        self.requests = {}
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, route):
+        with self.lock:
+            self.active[threading.get_ident()] = route
+            self.requests[route] = self.requests.get(route, 0) + 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self.thread.start()
+            self.wakeup.set()
+
+    def stop(self):
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+
+    def _record(self, route, folded):
+        _add_stack(self.stacks.setdefault(route, {}), folded, 1)
+        self.samples[route] = self.samples.get(route, 0) + 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                if not self.active:
+                    self.wakeup.clear()
+                    continue
+                active = dict(self.active)
+
+            frames = sys._current_frames()
+            folded = {
+                ident: fold_stack(frames[ident])
+                for ident in active
+                if ident != own_ident and ident in frames
+            }
+            with self.lock:
+                for ident, stack in folded.items():
+                    self._record(active[ident], stack)
+            time.sleep(self.interval)
+
+    def take(self):
+        with self.lock:
+            taken = {'stacks': self.stacks, 'requests': self.requests, 'samples': self.samples}
+            self.stacks, self.requests, self.samples = {}, {}, {}
+        return taken
+
+    def collect(self):
+        if _worker_dir is None:
+            with self.lock:
+                return merge_profiles([{'stacks': self.stacks, 'requests': self.requests, 'samples': self.samples}])
+        flush()
+        with _directory_lock(_worker_dir, exclusive=False):
+            return merge_profiles(_read_json(path) for path in sorted(glob.glob(f'{_worker_dir}/*.json')))
+
+    def summary(self):
+        profile = self.collect()
+        return {
+            route: {
+                'profiled_requests': count,
+                'samples': profile['samples'].get(route, 0),
+                'distinct_stacks': len(profile['stacks'].get(route, {}))
+            }
+            for route, count in profile['requests'].items()
+        }
+
+    def folded(self, route):
+        stacks = self.collect()['stacks'].get(route, {})
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
+
+    def reset(self):
+        self.take()
+        if _worker_dir is not None:
+            # Other workers' samples from the last flush interval may still land afterwards.
+            with _directory_lock(_worker_dir, exclusive=True):
+                for path in glob.glob(f'{_worker_dir}/*.json'):
+                    os.remove(path)
+
+def _add_stack(stacks, folded, count):
+    if folded not in stacks and len(stacks) >= MAX_STACKS_PER_ROUTE:
+        folded = '[truncated]'
+    stacks[folded] = stacks.get(folded, 0) + count
+
+def merge_profiles(profiles):
+    merged = {'stacks': {}, 'requests': {}, 'samples': {}}
+    for profile in profiles:
+        for key in ('requests', 'samples'):
+            for route, count in profile.get(key, {}).items():
+                merged[key][route] = merged[key].get(route, 0) + count
+        for route, stacks in profile.get('stacks', {}).items():
+            target = merged['stacks'].setdefault(route, {})
+            for folded, count in stacks.items():
+                _add_stack(target, folded, count)
+    return merged
+
+profiler = SamplingProfiler()
+
+def flush():
+    if _worker_dir is None:
+        return
+    taken = profiler.take()
+    if not taken['requests'] and not taken['samples']:
+        return
+    path = f'{_worker_dir}/{os.getpid()}.json'
+    with _directory_lock(_worker_dir, exclusive=True):
+        _write_json(path, merge_profiles([_read_json(path), taken]))
+
+def _flush_loop():
+    while True:
+        time.sleep(PROFILE_FLUSH_SECONDS)
+        flush()
+
+def start_worker(directory):
+    global _worker_dir
+    profiler.take()
+    _worker_dir = directory
+    if PROFILE_ENABLED:
+        threading.Thread(target=_flush_loop, daemon=True, name='profile-flush').start()
+
+def mark_process_dead(directory, pid):
+    path = f'{directory}/{pid}.json'
+    if not os.path.exists(path):
+        return
+    with _directory_lock(directory, exclusive=True):
+        _write_json(f'{directory}/{ARCHIVE_FILE}', merge_profiles([_read_json(f'{directory}/{ARCHIVE_FILE}'), _read_json(path)]))
+        os.remove(path)
+
+def _should_profile(admin_key):
+    provided = request.headers.get(PROFILE_HEADER)
+    if provided:
+        return bool(admin_key) and hmac.compare_digest(provided, admin_key)
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+def init_profiling(app, admin_key):
+    # Hooks are only installed when enabled, so a disabled profiler costs nothing per request.
+    if not PROFILE_ENABLED:
+        return False
+
+    @app.before_request
+    def start_profiling():
+        if request.url_rule is not None and _should_profile(admin_key):
+            g.profiling = True
+            profiler.start(request.url_rule.rule)
+
+    @app.teardown_request
+    def stop_profiling(exc):
+        if g.pop('profiling', False):
+            profiler.stop()
+
+    return True
@@ -0,0 +1,125 @@
+import os
+import time
+
+from scoring import category_index, encode_rows, score_matrix
+
+BEAM_WIDTH = int(os.getenv('RECOMMENDATION_BEAM_WIDTH', 24))
+MAX_ROUNDS = int(os.getenv('RECOMMENDATION_MAX_ROUNDS', 8))
+BUDGET_SECONDS = float(os.getenv('RECOMMENDATION_BUDGET_MS', 400)) / 1000
+MAX_RECOMMENDATIONS = 5
+
+ACTIVITY_LEVELS = ['Low', 'Medium', 'High']
+HEALTHY_BMI = 22.0
+HEALTHY_SLEEP = 7.5
+
+# Relative effort of one step on each feature; quitting smoking is the hardest change.
+EFFORT = {
+    'smoker': 3,
+    'physical_activity_level': 2,
+    'bmi': 1,
+    'daily_steps': 1,
+    'sleep_hours': 1,
+    'stress_level': 1
+}
+
+def _towards(current, target, step, max_change):
+    ladder = []
+    value = current
+    while abs(target - value) >= step / 2 and abs(value - current) < max_change:
+        value = round(value + (step if target > value else -step), 2)
+        ladder.append(value)
+    return ladder
+
+def build_ladders(profile):
+    # Each ladder lists the plausible values a feature can move to, one step at a time.
+    ladders = {
+        'smoker': ['No'] if profile['smoker'] == 'Yes' else [],
+        'bmi': _towards(profile['bmi'], HEALTHY_BMI, 1.0, 6) if not 18.5 <= profile['bmi'] <= 25 else [],
+        'daily_steps': _towards(profile['daily_steps'], 12000, 1000, 6000) if profile['daily_steps'] < 12000 else [],
+        'sleep_hours': _towards(profile['sleep_hours'], HEALTHY_SLEEP, 0.5, 2) if not 7 <= profile['sleep_hours'] <= 9 else [],
+        'stress_level': _towards(profile['stress_level'], 1, 1, 4) if profile['stress_level'] > 1 else []
+    }
+    level = profile['physical_activity_level']
+    ladders['physical_activity_level'] = ACTIVITY_LEVELS[ACTIVITY_LEVELS.index(level) + 1:] if level in ACTIVITY_LEVELS else []
+    return {feature: ladder for feature, ladder in ladders.items() if ladder}
+
+def _expand(beam, limits, seen):
+    candidates = []
+    for state in beam:
+        for position, limit in enumerate(limits):
+            if state[position] < limit:
+                candidate = state[:position] + (state[position] + 1,) + state[position + 1:]
+                if candidate not in seen:
+                    seen.add(candidate)
+                    candidates.append(candidate)
+    return candidates
+
+def recommend(profile, schema, feature_names, scaler, models, weights=None):
+    import numpy as np
+
+    started = time.monotonic()
+    ladders = build_ladders(profile)
+    features = list(ladders)
+    limits = [len(ladders[feature]) for feature in features]
+    efforts = np.array([EFFORT[feature] for feature in features])
+
+    base = encode_rows([profile], schema)[0]
+    base_prediction = float(score_matrix(base[None, :], feature_names, scaler, models, weights)[0][0])
+
+    categories = category_index(schema)
+    columns = [schema['feature_names'].index(feature) for feature in features]
+    # Position 0 is the current value, so a state row indexes straight into these arrays.
+    encoded = [
+        np.array([base[column]] + [categories[feature][value] if feature in categories else value for value in ladders[feature]], dtype=float)
+        for feature, column in zip(features, columns)
+    ]
+
+    beam = [tuple([0] * len(features))]
+    seen = set(beam)
+    scored = {}
+    rounds = 0
+    while rounds < MAX_ROUNDS and time.monotonic() - started < BUDGET_SECONDS:
+        candidates = _expand(beam, limits, seen)
+        if not candidates:
+            break
+        positions = np.array(candidates)
+        matrix = np.tile(base, (len(candidates), 1))
+        for index, column in enumerate(columns):
+            matrix[:, column] = encoded[index][positions[:, index]]
+
+        # One ensemble call scores the whole round.
+        predictions = score_matrix(matrix, feature_names, scaler, models, weights)[0]
+        scored.update(zip(candidates, predictions.tolist()))
+        beam = [candidates[i] for i in np.argsort(predictions, kind='stable')[:BEAM_WIDTH]]
+        rounds += 1
+
+    recommendations = []
+    best_savings = 0.0
+    for state, prediction in sorted(scored.items(), key=lambda item: (int(np.dot(item[0], efforts)), item[1])):
+        savings = base_prediction - prediction
+        # Keep a plan only if it saves more than every cheaper plan already kept.
+        if savings <= best_savings:
+            continue
+        best_savings = savings
+        recommendations.append({
+            'changes': {
+                feature: {'from': profile[feature], 'to': ladders[feature][position - 1]}
+                for feature, position in zip(features, state) if position
+            },
+            'effort': int(np.dot(state, efforts)),
+            'prediction': prediction,
+            'prediction_inr': prediction,
+            'savings': savings,
+            'savings_inr': savings,
+            'savings_pct': savings / base_prediction * 100 if base_prediction else 0.0
+        })
+
+    recommendations.sort(key=lambda item: item['savings'] / max(item['effort'], 1), reverse=True)
+    return {
+        'base_prediction': base_prediction,
+        'base_prediction_inr': base_prediction,
+        'recommendations': recommendations[:MAX_RECOMMENDATIONS],
+        'rounds': rounds,
+        'candidates_scored': len(scored),
+        'elapsed_ms': (time.monotonic() - started) * 1000
+    }
@@ -0,0 +1,188 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from explanations import generate_cost_explanation
+from scoring import PROFILE_FIELDS, encode_frame, fill_profile_defaults, load_bundle, prediction_intervals, score_matrix
+from serialization import dumps
+
+DEFAULT_CHUNK_ROWS = 50000
+CHECKPOINT_FORMAT = 'score_batch/1'
+
+# Set in each worker by init_worker. The bundle is loaded once in the parent
+# and handed over at fork, so workers share its pages copy-on-write.
+bundle = None
+explain = None
+id_column = None
+
+def init_worker(worker_bundle, worker_explain, worker_id_column):
+    global bundle, explain, id_column
+    bundle, explain, id_column = worker_bundle, worker_explain, worker_id_column
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('format') != CHECKPOINT_FORMAT:
+        raise ValueError(f'{path} is not a score_batch checkpoint')
+    return checkpoint
+
+def write_checkpoint(path, checkpoint):
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(dict(checkpoint, format=CHECKPOINT_FORMAT, updated_at=datetime.utcnow().isoformat()), f)
+    os.replace(f'{path}.tmp', path)
+
+def input_format(path):
+    return 'parquet' if path.endswith(('.parquet', '.pq')) else 'csv'
+
+def read_chunks(path, chunk_rows, skip_chunks):
+    import pandas as pd
+    if input_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        batches = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    else:
+        batches = pd.read_csv(path, chunksize=chunk_rows)
+    for chunk_index, frame in enumerate(batches):
+        if chunk_index >= skip_chunks:
+            yield chunk_index, frame
+
+def score_chunk(chunk_index, frame):
+    import pandas as pd
+
+    frame = fill_profile_defaults(frame)
+    predictions, members, deviations = score_matrix(
+        encode_frame(frame, bundle['schema']),
+        bundle['feature_names'], bundle['scaler'], bundle['models'], bundle['weights']
+    )
+    intervals = prediction_intervals(predictions, members, deviations)
+
+    output = pd.DataFrame({
+        'prediction': predictions,
+        'prediction_lower': intervals['lower'],
+        'prediction_upper': intervals['upper']
+    })
+    if id_column:
+        output.insert(0, id_column, frame[id_column].to_numpy())
+    for row, name in enumerate(bundle['models']):
+        output[f'model:{name}'] = members[row]
+    if explain:
+        profiles = frame[list(PROFILE_FIELDS)].to_dict('records')
+        output['explanation'] = [
+            dumps(explain(profile, prediction))
+            for profile, prediction in zip(profiles, predictions)
+        ]
+    return chunk_index, output
+
+class CsvSink:
+    def __init__(self, path, offset):
+        resuming = offset is not None and os.path.exists(path)
+        self.file = open(path, 'r+b' if resuming else 'wb')
+        if resuming:
+            # Drop anything written after the last checkpoint so a chunk is never duplicated.
+            self.file.truncate(offset)
+            self.file.seek(offset)
+        self.header = not resuming
+
+    def write(self, chunk_index, frame):
+        self.file.write(frame.to_csv(index=False, header=self.header).encode('utf-8'))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.header = False
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    def __init__(self, path, offset):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, chunk_index, frame):
+        part = f'{self.path}/part-{chunk_index:06d}.parquet'
+        frame.to_parquet(f'{part}.tmp', index=False)
+        os.replace(f'{part}.tmp', part)
+        return None
+
+    def close(self):
+        pass
+
+def report_progress(rows, chunks, started):
+    elapsed = time.monotonic() - started
+    print(f'\rscored {rows:,} rows in {chunks} chunks ({rows / max(elapsed, 1e-9):,.0f} rows/s)', end='', file=sys.stderr, flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Score member rows from CSV or Parquet with the model bundle')
+    parser.add_argument('input')
+    parser.add_argument('output', help='CSV file, or a directory of Parquet parts when --format parquet')
+    parser.add_argument('--format', choices=['csv', 'parquet'])
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--id-column', help='Input column copied to the output to join results back')
+    parser.add_argument('--explain', action='store_true', help='Add the JSON cost explanation per row')
+    parser.add_argument('--checkpoint', help='File recording the last written chunk; resumes from it if present')
+    args = parser.parse_args()
+
+    bundle = load_bundle(args.models_dir)
+    explain = generate_cost_explanation if args.explain else None
+
+    try:
+        checkpoint = read_checkpoint(args.checkpoint)
+    except ValueError as e:
+        parser.error(str(e))
+    # Chunk numbers only mean the same rows for the same input, chunk size and bundle.
+    run = {'input': os.path.abspath(args.input), 'chunk_rows': args.chunk_rows, 'model_version': bundle['version']}
+    if checkpoint and any(checkpoint.get(key) != value for key, value in run.items()):
+        parser.error('checkpoint was written for a different input, chunk size or model bundle')
+    next_chunk = checkpoint['chunk'] + 1 if checkpoint else 0
+
+    output_format = args.format or ('parquet' if args.output.endswith(('.parquet', '.pq')) else 'csv')
+    sink = (ParquetSink if output_format == 'parquet' else CsvSink)(args.output, checkpoint and checkpoint.get('offset'))
+
+    gc.collect()
+    gc.freeze()
+
+    started = time.monotonic()
+    rows = chunks = 0
+    # At most two chunks per worker are in flight, which bounds memory no matter the input size.
+    window = max(1, args.workers * 2)
+    pending = deque()
+
+    def drain_one():
+        nonlocal rows, chunks
+        chunk_index, frame = pending.popleft().result()
+        offset = sink.write(chunk_index, frame)
+        if args.checkpoint:
+            write_checkpoint(args.checkpoint, dict(run, chunk=chunk_index, offset=offset))
+        rows += len(frame)
+        chunks += 1
+        report_progress(rows, chunks, started)
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context('fork'),
+        initializer=init_worker, initargs=(bundle, explain, args.id_column)
+    )
+    with pool:
+        try:
+            for chunk_index, frame in read_chunks(args.input, args.chunk_rows, next_chunk):
+                pending.append(pool.submit(score_chunk, chunk_index, frame))
+                if len(pending) >= window:
+                    drain_one()
+            while pending:
+                drain_one()
+        finally:
+            sink.close()
+
+    print(file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
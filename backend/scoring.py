@@ -0,0 +1,226 @@
+import itertools
+import json
+import os
+
+MAX_SENSITIVITY_ROWS = int(os.getenv('MAX_SENSITIVITY_ROWS', 2500))
+MAX_BATCH_ROWS = int(os.getenv('MAX_BATCH_ROWS', 500))
+INTERVAL_LEVEL = float(os.getenv('PREDICTION_INTERVAL_LEVEL', 0.9))
+MAX_GRID_STEPS = 200
+
+PROFILE_FIELDS = {
+    'age': (float, 30),
+    'gender': (str, 'Male'),
+    'bmi': (float, 25),
+    'smoker': (str, 'No'),
+    'diabetes': (int, 0),
+    'hypertension': (int, 0),
+    'heart_disease': (int, 0),
+    'asthma': (int, 0),
+    'physical_activity_level': (str, 'Medium'),
+    'daily_steps': (float, 5000),
+    'sleep_hours': (float, 7),
+    'stress_level': (float, 5),
+    'doctor_visits_per_year': (int, 2),
+    'hospital_admissions': (int, 0),
+    'medication_count': (int, 0),
+    'insurance_type': (str, 'Government'),
+    'insurance_coverage_pct': (float, 50),
+    'city_type': (str, 'Urban'),
+    'previous_year_cost': (float, 5000)
+}
+
+def load_bundle(models_dir):
+    import joblib
+    from prediction_codec import build_model_schema, model_bundle_version
+
+    ensemble_model = joblib.load(f'{models_dir}/ensemble_model.pkl')
+    label_encoders = joblib.load(f'{models_dir}/label_encoders.pkl')
+    with open(f'{models_dir}/feature_names.json', 'r') as f:
+        feature_names = json.load(f)
+    return {
+        'ensemble_model': ensemble_model,
+        'models': dict(ensemble_model.named_estimators_),
+        'weights': ensemble_model.weights,
+        'scaler': joblib.load(f'{models_dir}/scaler.pkl'),
+        'feature_names': feature_names,
+        'schema': build_model_schema(feature_names, label_encoders),
+        'version': model_bundle_version(models_dir)
+    }
+
+def parse_profile(data):
+    return {col: cast(data.get(col, default)) for col, (cast, default) in PROFILE_FIELDS.items()}
+
+def category_index(schema):
+    return {col: {value: i for i, value in enumerate(values)} for col, values in schema['categories'].items()}
+
+def encode_value(col, value, categories):
+    if col in categories:
+        # Unknown categories fall back to code 0, as /api/predict always has.
+        return categories[col].get(str(value), 0)
+    return value
+
+def encode_rows(rows, schema):
+    import numpy as np
+    categories = category_index(schema)
+    return np.array(
+        [[encode_value(col, row[col], categories) for col in schema['feature_names']] for row in rows],
+        dtype=float
+    )
+
+def fill_profile_defaults(frame):
+    frame = frame.copy()
+    for col, (cast, default) in PROFILE_FIELDS.items():
+        frame[col] = frame[col].fillna(default) if col in frame else default
+    return frame
+
+def encode_frame(frame, schema):
+    categories = category_index(schema)
+    encoded = frame[schema['feature_names']].copy()
+    for col, codes in categories.items():
+        encoded[col] = encoded[col].astype(str).map(codes).fillna(0)
+    return encoded.to_numpy(dtype=float)
+
+def is_forest(model):
+    from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+    return isinstance(model, (RandomForestRegressor, ExtraTreesRegressor))
+
+def member_predict(model, scaled):
+    import numpy as np
+    if not is_forest(model):
+        return model.predict(scaled), None
+    # A forest's prediction is the mean of its trees, so keeping the per-tree
+    # rows gives the point estimate and its spread from the same traversal.
+    X = np.asarray(scaled, dtype=np.float32, order='C')
+    per_tree = np.vstack([tree.predict(X, check_input=False) for tree in model.estimators_])
+    return per_tree.mean(axis=0), per_tree
+
+def score_matrix(matrix, feature_names, scaler, models, weights=None):
+    import numpy as np
+    import pandas as pd
+    scaled = scaler.transform(pd.DataFrame(matrix, columns=feature_names))
+    members, deviations = [], []
+    for model in models.values():
+        point, per_tree = member_predict(model, scaled)
+        members.append(point)
+        if per_tree is not None:
+            deviations.append(per_tree - point)
+    members = np.vstack(members)
+    deviations = np.vstack(deviations) if deviations else None
+    return np.average(members, axis=0, weights=weights), members, deviations
+
+def prediction_intervals(predictions, members, deviations, level=INTERVAL_LEVEL):
+    import numpy as np
+    intervals = {
+        'level': level,
+        'member_min': members.min(axis=0),
+        'member_max': members.max(axis=0),
+        'member_std': members.std(axis=0)
+    }
+    if deviations is None:
+        intervals['lower'], intervals['upper'] = intervals['member_min'], intervals['member_max']
+    else:
+        tail = (1 - level) / 2 * 100
+        lower, upper = np.percentile(deviations, [tail, 100 - tail], axis=0)
+        intervals['lower'] = predictions + lower
+        intervals['upper'] = predictions + upper
+    return intervals
+
+def interval_at(intervals, row):
+    return {key: value if key == 'level' else float(value[row]) for key, value in intervals.items()}
+
+def sweep_values(feature, spec, schema):
+    if feature not in PROFILE_FIELDS:
+        raise ValueError(f'Unknown feature: {feature}')
+    cast = PROFILE_FIELDS[feature][0]
+    categories = schema['categories'].get(feature)
+
+    if spec is None and categories is not None:
+        values = list(categories)
+    elif isinstance(spec, dict):
+        import numpy as np
+        steps = int(spec.get('steps', 10))
+        if categories is not None or not 2 <= steps <= MAX_GRID_STEPS:
+            raise ValueError(f'Invalid range for {feature}')
+        values = np.linspace(float(spec['start']), float(spec['stop']), steps).tolist()
+    elif isinstance(spec, list) and spec:
+        if len(spec) > MAX_GRID_STEPS:
+            raise ValueError(f'At most {MAX_GRID_STEPS} values per feature')
+        values = spec
+    else:
+        raise ValueError(f'Grid for {feature} must be a list of values or a start/stop/steps range')
+
+    values = list(dict.fromkeys(cast(value) for value in values))
+    if categories is not None:
+        unknown = [value for value in values if value not in categories]
+        if unknown:
+            raise ValueError(f'Unknown values for {feature}: {unknown}')
+    return values
+
+def check_sensitivity_size(features, pairs):
+    total = 1 + sum(len(values) for values in features.values()) + sum(len(features[a]) * len(features[b]) for a, b in pairs)
+    if total > MAX_SENSITIVITY_ROWS:
+        raise ValueError(f'Sensitivity request needs {total} rows; the limit is {MAX_SENSITIVITY_ROWS}')
+
+def build_sensitivity_matrix(profile, features, pairs, schema):
+    import numpy as np
+    # Sized from the request before anything is allocated.
+    check_sensitivity_size(features, pairs)
+    categories = category_index(schema)
+    columns = {col: i for i, col in enumerate(schema['feature_names'])}
+    base = encode_rows([profile], schema)[0]
+
+    blocks = [base[None, :]]
+    curves = []
+    for feature, values in features.items():
+        block = np.tile(base, (len(values), 1))
+        block[:, columns[feature]] = [encode_value(feature, value, categories) for value in values]
+        curves.append((feature, values, block.shape[0]))
+        blocks.append(block)
+
+    grids = []
+    for first, second in pairs:
+        first_values, second_values = features[first], features[second]
+        combos = list(itertools.product(first_values, second_values))
+        block = np.tile(base, (len(combos), 1))
+        block[:, columns[first]] = [encode_value(first, a, categories) for a, _ in combos]
+        block[:, columns[second]] = [encode_value(second, b, categories) for _, b in combos]
+        grids.append(((first, second), (first_values, second_values), block.shape[0]))
+        blocks.append(block)
+
+    return np.vstack(blocks), curves, grids
+
+def sensitivity_rows(profile, curves, grids, columns):
+    # The raw values of `columns` for every row of the sensitivity matrix, in
+    # the same order, so swept segment columns route each variant on its own.
+    base = {col: profile[col] for col in columns}
+    rows = [base]
+    for feature, values, _ in curves:
+        rows.extend(dict(base, **{feature: value}) if feature in base else base for value in values)
+    for (first, second), (first_values, second_values), _ in grids:
+        for a, b in itertools.product(first_values, second_values):
+            row = dict(base)
+            for feature, value in ((first, a), (second, b)):
+                if feature in row:
+                    row[feature] = value
+            rows.append(row)
+    return rows
+
+def split_sensitivity(predictions, curves, grids):
+    base_prediction = float(predictions[0])
+    offset = 1
+    curve_results = {}
+    for feature, values, size in curves:
+        scored = predictions[offset:offset + size]
+        curve_results[feature] = {'values': values, 'predictions': scored, 'delta': scored - base_prediction}
+        offset += size
+
+    grid_results = []
+    for (first, second), (first_values, second_values), size in grids:
+        scored = predictions[offset:offset + size].reshape(len(first_values), len(second_values))
+        grid_results.append({
+            'features': [first, second],
+            'values': [first_values, second_values],
+            'predictions': scored
+        })
+        offset += size
+    return base_prediction, curve_results, grid_results
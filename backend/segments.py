@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import Counter, Gauge
+from scoring import load_bundle, prediction_intervals, score_matrix
+
+SEGMENTS_DIR = 'segments'
+SEGMENT_MANIFEST = 'manifest.json'
+SEGMENT_COLUMNS = ['city_type', 'insurance_type']
+SEGMENT_MIN_ROWS = 400
+SEGMENTS_ENABLED = os.getenv('SEGMENTS_ENABLED', '1') != '0'
+SEGMENT_CACHE_MB = float(os.getenv('SEGMENT_CACHE_MB', 1024))
+
+SEGMENT_LOADS = Counter('segment_model_loads', 'Segment bundles loaded into and evicted from the registry', ('event',))
+SEGMENT_CACHE_BYTES = Gauge('segment_cache_bytes', 'Estimated size of the segment bundles currently loaded')
+SEGMENT_ROWS = Counter('segment_rows', 'Rows scored by segment bundle', ('segment',))
+
+FALLBACK = 'global'
+
+def segment_key(row, columns=SEGMENT_COLUMNS):
+    return '|'.join(str(row[col]) for col in columns)
+
+def segment_dirname(key):
+    return key.lower().replace('|', '__').replace(' ', '_').replace('-', '_')
+
+def save_manifest(models_dir, manifest):
+    path = f'{models_dir}/{SEGMENTS_DIR}/{SEGMENT_MANIFEST}'
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def load_manifest(models_dir):
+    path = f'{models_dir}/{SEGMENTS_DIR}/{SEGMENT_MANIFEST}'
+    if not SEGMENTS_ENABLED or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def bundle_size(path):
+    # On-disk pickle size is a cheap, stable proxy for a bundle's resident trees.
+    return sum(os.path.getsize(f'{path}/{name}') for name in os.listdir(path) if name.endswith('.pkl'))
+
+class SegmentRegistry:
+    def __init__(self, models_dir, fallback, cache_bytes=SEGMENT_CACHE_MB * 1024 * 1024):
+        self.models_dir = models_dir
+        self.fallback = fallback
+        self.cache_bytes = cache_bytes
+        manifest = load_manifest(models_dir) or {}
+        self.columns = manifest.get('columns', SEGMENT_COLUMNS)
+        self.segments = manifest.get('segments', {})
+        self.bundles = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.Lock()
+        self.loading = {}
+
+    def route(self, row):
+        key = segment_key(row, self.columns)
+        if key not in self.segments:
+            return FALLBACK, self.fallback
+        return key, self.get(key)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.bundles:
+                self.bundles.move_to_end(key)
+                return self.bundles[key]
+            load_lock = self.loading.setdefault(key, threading.Lock())
+
+        # Concurrent requests for a cold segment wait on one load instead of each reading it.
+        with load_lock:
+            with self.lock:
+                if key in self.bundles:
+                    self.bundles.move_to_end(key)
+                    return self.bundles[key]
+            path = f'{self.models_dir}/{SEGMENTS_DIR}/{self.segments[key]}'
+            bundle = load_bundle(path)
+            size = bundle_size(path)
+            SEGMENT_LOADS.inc('load')
+            with self.lock:
+                self.bundles[key] = bundle
+                self.sizes[key] = size
+                # The bundle just loaded always stays, even if it alone exceeds the cap.
+                while len(self.bundles) > 1 and sum(self.sizes.values()) > self.cache_bytes:
+                    evicted, _ = self.bundles.popitem(last=False)
+                    del self.sizes[evicted]
+                    SEGMENT_LOADS.inc('evict')
+                SEGMENT_CACHE_BYTES.set(sum(self.sizes.values()))
+            return bundle
+
+    def group(self, rows):
+        groups = {}
+        for index, row in enumerate(rows):
+            key = segment_key(row, self.columns)
+            groups.setdefault(key if key in self.segments else FALLBACK, []).append(index)
+        return [(key, self.fallback if key == FALLBACK else self.get(key), indices) for key, indices in groups.items()]
+
+    def status(self):
+        with self.lock:
+            return {
+                'columns': self.columns,
+                'segments': sorted(self.segments),
+                'loaded': list(self.bundles),
+                'loaded_bytes': sum(self.sizes.values()),
+                'cache_bytes': self.cache_bytes
+            }
+
+def score_segmented(registry, rows, matrix, feature_names):
+    import numpy as np
+
+    predictions = np.empty(len(rows))
+    members = {}
+    intervals = {}
+    keys = [None] * len(rows)
+    # One scoring call per segment present in the batch.
+    for key, bundle, indices in registry.group(rows):
+        SEGMENT_ROWS.inc(key, amount=len(indices))
+        group_predictions, group_members, deviations = score_matrix(
+            matrix[indices], feature_names, bundle['scaler'], bundle['models'], bundle['weights']
+        )
+        predictions[indices] = group_predictions
+        for row, name in enumerate(bundle['models']):
+            members.setdefault(name, np.full(len(rows), np.nan))[indices] = group_members[row]
+        for name, value in prediction_intervals(group_predictions, group_members, deviations).items():
+            if name == 'level':
+                intervals[name] = value
+            else:
+                intervals.setdefault(name, np.empty(len(rows)))[indices] = value
+        for index in indices:
+            keys[index] = key
+    return predictions, members, intervals, keys
@@ -0,0 +1,65 @@
+import json
+import os
+from datetime import date
+
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SERIALIZER = os.getenv('JSON_SERIALIZER', 'orjson' if orjson is not None else 'json')
+
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Datetimes are passed through to _default so they keep Flask's HTTP-date format.
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+def _default(value):
+    # Whole arrays are converted in one call; never element by element.
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, date):
+        return http_date(value)
+    if type(value).__name__ == 'ObjectId':
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    except TypeError:
+        # e.g. object-dtype or non-contiguous arrays that orjson refuses natively
+        return _stdlib_dumps(obj)
+
+SERIALIZERS = {'json': _stdlib_dumps}
+if orjson is not None:
+    SERIALIZERS['orjson'] = _orjson_dumps
+
+dumps_bytes = SERIALIZERS.get(SERIALIZER, _stdlib_dumps)
+
+def dumps(obj):
+    return dumps_bytes(obj).decode('utf-8')
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJSONProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
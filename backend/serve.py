@@ -0,0 +1,223 @@
+import argparse
+import gc
+import os
+import signal
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import metrics
+import profiling
+
+SERVE_HOST = os.getenv('SERVE_HOST', '0.0.0.0')
+SERVE_PORT = int(os.getenv('SERVE_PORT', 5000))
+SERVE_WORKERS = int(os.getenv('SERVE_WORKERS', os.cpu_count() or 1))
+SERVE_THREADS = int(os.getenv('SERVE_THREADS', 8))
+SERVE_BACKLOG = int(os.getenv('SERVE_BACKLOG', 2048))
+SERVE_QUEUE = int(os.getenv('SERVE_QUEUE', SERVE_THREADS))
+GRACEFUL_TIMEOUT = float(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))
+METRICS_DIR = os.getenv('METRICS_DIR')
+PROFILES_DIR = 'profiles'
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, code='-', size='-'):
+        pass
+
+class PooledWSGIServer(BaseWSGIServer):
+    multithread = True
+
+    def __init__(self, host, port, app, fd, threads, queue=SERVE_QUEUE):
+        super().__init__(host, port, app, handler=QuietRequestHandler, fd=fd)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        self.slots = threading.BoundedSemaphore(threads + queue)
+
+    def process_request(self, request, client_address):
+        # A saturated worker stops accepting, so further connections wait in the
+        # shared listen backlog where an idle worker can pick them up.
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._handle, request, client_address)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+def create_listener(host, port, backlog):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    listener.set_inheritable(True)
+    return listener
+
+def preload():
+    import app as application
+    from database import ensure_indexes, close_database
+
+    if not application.initialize():
+        raise RuntimeError('Failed to load models')
+
+    try:
+        ensure_indexes()
+    except Exception as e:
+        pass
+    # MongoClient is not fork-safe; each worker opens its own on first use.
+    close_database()
+
+    # Move everything loaded so far into the permanent generation so the
+    # collector never touches (and therefore never copies) those pages.
+    gc.collect()
+    gc.freeze()
+    return application.app
+
+def run_worker(wsgi_app, listener, host, port, threads, metrics_dir):
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    metrics.start_worker(metrics_dir)
+    profiling.start_worker(f'{metrics_dir}/{PROFILES_DIR}')
+
+    server = PooledWSGIServer(host, port, wsgi_app, listener.fileno(), threads)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+
+    server.serve_forever()
+    server.executor.shutdown(wait=True)
+    metrics.flush()
+    profiling.flush()
+    os._exit(0)
+
+class Master:
+    def __init__(self, host, port, workers, threads):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads
+        self.listener = create_listener(host, port, SERVE_BACKLOG)
+        self.children = set()
+        self.retiring = set()
+        self.reload_requested = False
+        self.stopping = False
+        self.metrics_dir = METRICS_DIR or tempfile.mkdtemp(prefix='serve-metrics-')
+
+    def spawn(self, wsgi_app):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(wsgi_app, self.listener, self.host, self.port, self.threads, self.metrics_dir)
+            finally:
+                os._exit(1)
+        self.children.add(pid)
+        return pid
+
+    def spawn_generation(self, wsgi_app):
+        return {self.spawn(wsgi_app) for _ in range(self.workers)}
+
+    def terminate(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.discard(pid)
+
+    def reap(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.children:
+            # Only workers are waited on; the shadow candidate is reaped by multiprocessing.
+            exited = []
+            for pid in list(self.children):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    exited.append(pid)
+            for pid in exited:
+                self.children.discard(pid)
+                metrics.mark_process_dead(self.metrics_dir, pid)
+                profiling.mark_process_dead(f'{self.metrics_dir}/{PROFILES_DIR}', pid)
+                yield pid
+            if exited:
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            time.sleep(0.1)
+
+    def run(self):
+        import app as application
+        metrics.reset_directory(self.metrics_dir)
+        metrics.reset_directory(f'{self.metrics_dir}/{PROFILES_DIR}')
+        self.wsgi_app = wsgi_app = preload()
+        # One shadow candidate for the whole server, started before the fork so
+        # every worker inherits its queue; it outlives reloads but not the master.
+        if application.shadow:
+            application.shadow.start(self.metrics_dir)
+        self.spawn_generation(wsgi_app)
+
+        signal.signal(signal.SIGHUP, lambda signum, frame: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda signum, frame: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda signum, frame: setattr(self, 'stopping', True))
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                wsgi_app = self.reload()
+            for pid in list(self.reap(timeout=0.5)):
+                if pid in self.retiring:
+                    self.retiring.discard(pid)
+                elif not self.stopping:
+                    self.spawn(wsgi_app)
+
+        self.terminate(list(self.children))
+        for _ in self.reap(timeout=GRACEFUL_TIMEOUT):
+            pass
+        for pid in list(self.children):
+            os.kill(pid, signal.SIGKILL)
+        if application.shadow:
+            application.shadow.stop()
+        if not METRICS_DIR:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def reload(self):
+        old_generation = set(self.children)
+        gc.unfreeze()
+        try:
+            wsgi_app = preload()
+        except Exception as e:
+            print(f'Reload failed, keeping current workers: {e}')
+            gc.freeze()
+            return self.wsgi_app
+        self.wsgi_app = wsgi_app
+        self.retiring |= old_generation
+        self.spawn_generation(wsgi_app)
+        # New workers are already accepting; old ones drain in-flight requests.
+        self.terminate(old_generation)
+        return wsgi_app
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-forking production server for the prediction API')
+    parser.add_argument('--host', default=SERVE_HOST)
+    parser.add_argument('--port', type=int, default=SERVE_PORT)
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS)
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS)
+    args = parser.parse_args()
+
+    Master(args.host, args.port, args.workers, args.threads).run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import json
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+
+from metrics import Counter, Histogram
+
+SHADOW_MODELS_DIR = os.getenv('SHADOW_MODELS_DIR')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', 256))
+SHADOW_WINDOW = int(os.getenv('SHADOW_WINDOW', 5000))
+SHADOW_MAX_DELTA_PCT = float(os.getenv('SHADOW_MAX_DELTA_PCT', 5))
+SHADOW_MAX_LATENCY_RATIO = float(os.getenv('SHADOW_MAX_LATENCY_RATIO', 1.2))
+SHADOW_REPORT_SECONDS = float(os.getenv('SHADOW_REPORT_SECONDS', 1))
+SHADOW_STOP_TIMEOUT = float(os.getenv('SHADOW_STOP_TIMEOUT', 5))
+RESET = 'reset'
+
+SHADOW_REQUESTS = Counter('shadow_requests', 'Predictions offered to the shadow candidate by outcome', ('result',))
+SHADOW_LATENCY = Histogram('shadow_scoring_duration_seconds', 'Single-row scoring latency of the serving and candidate bundles', ('bundle',))
+
+def _quantiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': ordered[-1]}
+
+class ShadowWindow:
+    def __init__(self, candidate_version=None):
+        self.candidate_version = candidate_version
+        self.reset()
+
+    def reset(self):
+        self.scored = 0
+        self.errors = 0
+        self.deltas = deque(maxlen=SHADOW_WINDOW)
+        self.relative_deltas = deque(maxlen=SHADOW_WINDOW)
+        self.member_deltas = {}
+        self.latencies = {'current': deque(maxlen=SHADOW_WINDOW), 'candidate': deque(maxlen=SHADOW_WINDOW)}
+
+    def record(self, current, candidate):
+        delta = candidate['prediction'] - current['prediction']
+        self.scored += 1
+        self.deltas.append(delta)
+        if current['prediction']:
+            self.relative_deltas.append(abs(delta) / abs(current['prediction']) * 100)
+        for name, value in candidate['members'].items():
+            if name in current['members']:
+                if name not in self.member_deltas:
+                    self.member_deltas[name] = deque(maxlen=SHADOW_WINDOW)
+                self.member_deltas[name].append(value - current['members'][name])
+        self.latencies['current'].append(current['latency'])
+        self.latencies['candidate'].append(candidate['latency'])
+
+    def record_error(self):
+        self.errors += 1
+
+    def report(self):
+        deltas, relative = list(self.deltas), list(self.relative_deltas)
+        report = {
+            'candidate_version': self.candidate_version,
+            'scored': self.scored,
+            'errors': self.errors,
+            'window': len(deltas),
+            'prediction_delta': {
+                'mean': sum(deltas) / len(deltas),
+                'mean_abs': sum(abs(delta) for delta in deltas) / len(deltas),
+                'rmse': (sum(delta * delta for delta in deltas) / len(deltas)) ** 0.5,
+                'abs_pct': _quantiles(relative)
+            } if deltas else None,
+            'member_disagreement': {
+                name: {'mean': sum(values) / len(values), 'mean_abs': sum(abs(value) for value in values) / len(values)}
+                for name, values in self.member_deltas.items() if values
+            },
+            'latency_seconds': {bundle: _quantiles(list(values)) for bundle, values in self.latencies.items()}
+        }
+
+        current_latency, candidate_latency = report['latency_seconds']['current'], report['latency_seconds']['candidate']
+        report['promotable'] = bool(
+            deltas and relative and not self.errors
+            and report['prediction_delta']['abs_pct']['p90'] <= SHADOW_MAX_DELTA_PCT
+            and candidate_latency['p90'] <= current_latency['p90'] * SHADOW_MAX_LATENCY_RATIO
+        )
+        return report
+
+def _apply_metrics(item):
+    if item[0] == 'scored':
+        SHADOW_LATENCY.observe(item[1], 'current')
+        SHADOW_LATENCY.observe(item[2], 'candidate')
+    SHADOW_REQUESTS.inc(item[0])
+
+def _drain_metrics(outbox):
+    # Without a shared metrics directory the candidate sends its observations
+    # back, and they are recorded in the registry of the process that serves /metrics.
+    for item in iter(outbox.get, None):
+        _apply_metrics(item)
+
+def _write_report(path, report):
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(report, f)
+    os.replace(f'{path}.tmp', path)
+
+def _shadow_worker(models_dir, inbox, report_path, parent_pid, metrics_dir, outbox):
+    import metrics
+    from scoring import encode_rows, load_bundle, score_matrix
+
+    # Lower priority so the candidate never competes with serving workers for CPU.
+    os.nice(10)
+    if metrics_dir:
+        metrics.start_worker(metrics_dir)
+        publish = _apply_metrics
+    else:
+        publish = outbox.put
+    bundle = load_bundle(models_dir)
+    window = ShadowWindow(bundle['version'])
+    _write_report(report_path, window.report())
+    written = time.monotonic()
+
+    # Polling the parent means a killed master never leaves the candidate behind.
+    while os.getppid() == parent_pid:
+        try:
+            item = inbox.get(timeout=SHADOW_REPORT_SECONDS)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+        if item == RESET:
+            window.reset()
+        elif item:
+            profile, current = item
+            try:
+                started = time.perf_counter()
+                matrix = encode_rows([profile], bundle['schema'])
+                prediction, members, _ = score_matrix(
+                    matrix, bundle['feature_names'], bundle['scaler'], bundle['models'], bundle['weights']
+                )
+                latency = time.perf_counter() - started
+                window.record(current, {
+                    'prediction': float(prediction[0]),
+                    'members': {name: float(members[row, 0]) for row, name in enumerate(bundle['models'])},
+                    'latency': latency
+                })
+                publish(('scored', current['latency'], latency))
+            except Exception:
+                window.record_error()
+                publish(('error',))
+        if item == RESET or time.monotonic() - written >= SHADOW_REPORT_SECONDS:
+            _write_report(report_path, window.report())
+            written = time.monotonic()
+    _write_report(report_path, window.report())
+    metrics.flush()
+
+class ShadowEvaluator:
+    def __init__(self, models_dir, sample_rate=SHADOW_SAMPLE_RATE):
+        self.models_dir = models_dir
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        self.process = None
+        self.inbox = None
+        self.report_path = None
+        self.metrics_dir = None
+        self.outbox = None
+        self.drain = None
+
+    def start(self, metrics_dir=None):
+        # One candidate per server, started by the process that forks the workers;
+        # they inherit its queue. Single-process servers start it themselves.
+        import metrics
+        with self.lock:
+            if self.process is not None:
+                return
+            self.metrics_dir = metrics_dir or metrics._worker_dir
+            context = multiprocessing.get_context('spawn')
+            if self.metrics_dir is None:
+                self.outbox = context.Queue()
+                self.drain = threading.Thread(target=_drain_metrics, args=(self.outbox,), name='shadow-metrics', daemon=True)
+                self.drain.start()
+            handle, self.report_path = tempfile.mkstemp(prefix='shadow-report-', suffix='.json')
+            os.close(handle)
+            os.remove(self.report_path)
+            self.inbox = context.Queue(maxsize=SHADOW_QUEUE_SIZE)
+            self.process = context.Process(
+                target=_shadow_worker, args=(self.models_dir, self.inbox, self.report_path, os.getpid(), self.metrics_dir, self.outbox),
+                name='shadow-candidate', daemon=True
+            )
+            self.process.start()
+
+    def stop(self, timeout=SHADOW_STOP_TIMEOUT):
+        import metrics
+        with self.lock:
+            process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            self.inbox.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        if self.metrics_dir:
+            metrics.mark_process_dead(self.metrics_dir, process.pid)
+        else:
+            self.outbox.put(None)
+            self.drain.join(timeout)
+        for path in (self.report_path, f'{self.report_path}.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def submit(self, profile, prediction, members, latency):
+        if self.inbox is None or random.random() >= self.sample_rate:
+            return
+        try:
+            self.inbox.put_nowait((profile, {'prediction': prediction, 'members': members, 'latency': latency}))
+            SHADOW_REQUESTS.inc('queued')
+        except queue.Full:
+            SHADOW_REQUESTS.inc('dropped')
+
+    def reset(self):
+        if self.inbox is not None:
+            self.inbox.put(RESET, timeout=SHADOW_STOP_TIMEOUT)
+
+    def report(self, current_version=None):
+        report = None
+        if self.report_path and os.path.exists(self.report_path):
+            with open(self.report_path, 'r') as f:
+                report = json.load(f)
+        if report is None:
+            # The candidate is still loading its bundle.
+            report = ShadowWindow().report()
+        report.update({'candidate_dir': self.models_dir, 'current_version': current_version, 'sample_rate': self.sample_rate})
+        return report
+
+def init_shadow():
+    if not SHADOW_MODELS_DIR or SHADOW_SAMPLE_RATE <= 0:
+        return None
+    return ShadowEvaluator(SHADOW_MODELS_DIR)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Backend modules import each other as top-level modules.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture
+def mongo(monkeypatch):
+    import database
+    import mongomock
+    db = mongomock.MongoClient()['test']
+    monkeypatch.setattr(database, '_db', db)
+    return db
+
+@pytest.fixture
+def write_bundle():
+    # A two-feature bundle whose target is (age + bmi) * scale.
+    def write(models_dir, scale=100):
+        import json
+
+        import joblib
+        import numpy as np
+        import pandas as pd
+        from sklearn.ensemble import RandomForestRegressor, VotingRegressor
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import StandardScaler
+
+        models_dir.mkdir(parents=True, exist_ok=True)
+        X = pd.DataFrame(np.random.default_rng(0).uniform(20, 60, (100, 2)), columns=['age', 'bmi'])
+        scaler = StandardScaler().fit(X)
+        ensemble = VotingRegressor([('Random Forest', RandomForestRegressor(n_estimators=3, random_state=0)), ('Linear', LinearRegression())])
+        ensemble.fit(scaler.transform(X), X.sum(axis=1) * scale)
+        joblib.dump(ensemble, models_dir / 'ensemble_model.pkl')
+        joblib.dump(scaler, models_dir / 'scaler.pkl')
+        joblib.dump({}, models_dir / 'label_encoders.pkl')
+        (models_dir / 'feature_names.json').write_text(json.dumps(['age', 'bmi']))
+        (models_dir / 'feature_importance.json').write_text('{}')
+        return models_dir
+    return write
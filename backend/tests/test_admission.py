@@ -0,0 +1,61 @@
+import time
+
+from admission import RoutePolicy, TokenBucket
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=1, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.take()
+    assert 0 < wait <= 1
+
+def test_bucket_refills_at_rate(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.take() == 0.0 and bucket.take() == 0.0
+    assert bucket.take() == 0.5
+    clock[0] += 0.5
+    assert bucket.take() == 0.0
+    # Refill never exceeds the burst size.
+    clock[0] += 60
+    assert [bucket.take() for _ in range(3)][-1] > 0
+
+def test_client_buckets_are_independent():
+    policy = RoutePolicy('/api/test', route_rate=100, route_burst=100, client_rate=0.001, client_burst=1, concurrency=2)
+    assert policy.client_bucket('ip:a').take() == 0.0
+    assert policy.client_bucket('ip:a').take() > 0
+    assert policy.client_bucket('ip:b').take() == 0.0
+
+def test_client_buckets_are_bounded(monkeypatch):
+    import admission
+    monkeypatch.setattr(admission, 'MAX_TRACKED_CLIENTS', 2)
+    policy = RoutePolicy('/api/test', 1, 1, 1, 1, 1)
+    for client in ('a', 'b', 'a', 'c'):
+        policy.client_bucket(client)
+    # 'b' was least recently used when 'c' arrived.
+    assert list(policy.client_buckets) == ['a', 'c']
+
+def test_client_over_limit_does_not_drain_route_bucket():
+    policy = RoutePolicy('/api/test', route_rate=0.001, route_burst=2, client_rate=0.001, client_burst=1, concurrency=4)
+    assert policy.admit('ip:a') is None
+    policy.slots.release()
+    for _ in range(5):
+        assert policy.admit('ip:a')[0] == 'client_rate'
+    assert policy.admit('ip:b') is None
+
+def test_rejection_refunds_earlier_tokens():
+    policy = RoutePolicy('/api/test', route_rate=0.001, route_burst=5, client_rate=0.001, client_burst=1, concurrency=1)
+    assert policy.admit('ip:a') is None
+    # The slot is taken, so ip:b is turned away without spending its token.
+    assert policy.admit('ip:b') == ('concurrency', 1)
+    policy.slots.release()
+    assert policy.admit('ip:b') is None
+    policy.slots.release()
+
+    exhausted = RoutePolicy('/api/test', route_rate=0.001, route_burst=1, client_rate=0.001, client_burst=1, concurrency=1)
+    assert exhausted.admit('ip:a') is None
+    exhausted.slots.release()
+    assert exhausted.admit('ip:b')[0] == 'route_rate'
+    # ip:b got its client token and the slot back.
+    assert exhausted.client_bucket('ip:b').take() == 0.0
+    assert exhausted.slots.acquire(blocking=False)
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import joblib
+
+import app
+
+def test_failed_reload_keeps_the_current_bundle(monkeypatch):
+    current = {name: object() for name in ('ensemble_model', 'scaler', 'label_encoders', 'feature_names', 'model_version', 'segment_registry')}
+    for name, value in current.items():
+        monkeypatch.setattr(app, name, value)
+    monitor = SimpleNamespace(stopped=False)
+    monitor.stop = lambda: setattr(monitor, 'stopped', True)
+    monkeypatch.setattr(app, 'drift_monitor', monitor)
+
+    # The new ensemble loads, then the scaler is missing part-way through.
+    ensemble = SimpleNamespace(named_estimators_={}, weights=None)
+    def load(path):
+        if path.endswith('ensemble_model.pkl'):
+            return ensemble
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(joblib, 'load', load)
+
+    assert app.load_models() is False
+    for name, value in current.items():
+        assert getattr(app, name) is value
+    assert app.drift_monitor is monitor and not monitor.stopped
+
+def test_segment_routed_predictions_are_ranked_and_shadowed_on_the_global_score(tmp_path, monkeypatch, write_bundle):
+    import threading
+
+    import numpy as np
+
+    from percentiles import build_percentile_index
+    from scoring import load_bundle
+    from segments import FALLBACK, SEGMENTS_DIR, SegmentRegistry, save_manifest
+
+    # The segment bundle predicts three times the global cost, so ranking its
+    # own prediction would put every Urban profile at the top of the index.
+    write_bundle(tmp_path / SEGMENTS_DIR / 'urban', scale=300)
+    save_manifest(str(tmp_path), {'columns': ['city_type'], 'segments': {'Urban': 'urban'}, 'fallback': {}})
+    registry = SegmentRegistry(str(tmp_path), load_bundle(str(write_bundle(tmp_path / 'global'))))
+    costs = np.linspace(0, 14000, 101)
+    submitted = []
+    ready = threading.Event()
+    ready.set()
+    monkeypatch.setattr(app, 'models_ready', ready)
+    monkeypatch.setattr(app, 'label_encoders', {})
+    monkeypatch.setattr(app, 'feature_names', ['age', 'bmi'])
+    monkeypatch.setattr(app, 'segment_registry', registry)
+    monkeypatch.setattr(app, 'percentile_index', build_percentile_index(costs, [40] * 101, ['No'] * 101, ['Urban'] * 101))
+    monkeypatch.setattr(app, 'shadow', SimpleNamespace(submit=lambda *args: submitted.append(args)))
+    monkeypatch.setattr(app, 'drift_monitor', None)
+
+    client = app.app.test_client()
+    urban = client.post('/api/predict', json={'age': 40, 'bmi': 30, 'city_type': 'Urban'}).get_json()
+    rural = client.post('/api/predict', json={'age': 40, 'bmi': 30, 'city_type': 'Rural'}).get_json()
+
+    assert urban['segment'] == 'Urban' and rural['segment'] == FALLBACK
+    assert urban['prediction'] > 2 * rural['prediction']
+    assert urban['percentile']['overall'] == rural['percentile']['overall']
+    assert 30 < urban['percentile']['overall'] < 70
+    assert [args[1] for args in submitted] == [rural['prediction'], rural['prediction']]
+    assert submitted[0][2] == rural['individual_predictions']
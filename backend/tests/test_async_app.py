@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('quart')
+
+import app as application
+import async_app
+from admission import ADMISSION_REJECTIONS, RoutePolicy
+
+pytestmark = pytest.mark.skipif(application.admission_policies is None, reason='admission control is disabled')
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('GROQ_API_KEY', 'stub')
+    monkeypatch.setattr(async_app, '_groq_client', None)
+    return async_app.quart_app.test_client()
+
+def limit(monkeypatch, route, client_burst=100, concurrency=4):
+    policy = RoutePolicy(route, route_rate=100, route_burst=100, client_rate=0.001, client_burst=client_burst, concurrency=concurrency)
+    monkeypatch.setitem(application.admission_policies, route, policy)
+    return policy
+
+def test_chat_is_rate_limited_per_client(client, monkeypatch):
+    policy = limit(monkeypatch, '/api/chat', client_burst=2)
+    rejected = ADMISSION_REJECTIONS.snapshot().get(('/api/chat', 'client_rate'), 0)
+
+    async def scenario():
+        return [await client.post('/api/chat', json={'message': 'costs', 'type': 'option'}) for _ in range(3)]
+
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert int(responses[-1].headers['Retry-After']) >= 1
+    assert ADMISSION_REJECTIONS.snapshot().get(('/api/chat', 'client_rate'), 0) == rejected + 1
+    # Admitted requests hand their concurrency slot back when they finish.
+    assert policy.slots._value == 4
+
+def test_profile_disease_is_rejected_when_the_route_is_full(client, monkeypatch):
+    policy = limit(monkeypatch, '/api/profile-disease', concurrency=1)
+    policy.slots.acquire()
+
+    async def scenario():
+        return await client.post('/api/profile-disease', json={'disease_description': 'asthma'})
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert 'busy' in asyncio.run(response.get_json())['error']
+    # The rejected request refunded its client token.
+    assert [bucket.tokens for bucket in policy.client_buckets.values()] == [100]
@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohort import (
+    AGE_BINS, AGE_LABELS, CohortIndex, age_group_codes, cohort_statistics, cohort_visualizations, fill_missing_categories,
+    parse_filters
+)
+from percentiles import age_band
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'costdata.csv')
+
+@pytest.fixture(scope='module')
+def frame():
+    return pd.read_csv(DATASET, nrows=3000)
+
+@pytest.fixture(scope='module')
+def index(frame):
+    return CohortIndex(frame)
+
+def pandas_select(frame, filters):
+    selected = pd.Series(True, index=frame.index)
+    for col, values in filters['equals'].items():
+        selected &= frame[col].astype(str).isin(values)
+    for col, (low, high) in filters['ranges'].items():
+        if low is not None:
+            selected &= frame[col] >= low
+        if high is not None:
+            selected &= frame[col] <= high
+    return frame[selected]
+
+@pytest.mark.parametrize('args', [
+    {'gender': 'Male'},
+    {'smoker': 'Yes', 'city_type': 'Urban,Rural'},
+    {'age_min': '35', 'age_max': '52'},
+    {'bmi_min': '28.4'},
+    {'diabetes': '1', 'previous_year_cost_max': '9000'},
+    {'insurance_type': 'Private', 'age_min': '60', 'daily_steps_max': '4000'},
+    {'age_min': '200'}
+])
+def test_selection_matches_pandas(frame, index, args):
+    filters = parse_filters(args)
+    expected = pandas_select(frame, filters)
+    bitmap = index.select(filters)
+    assert index.count(bitmap) == len(expected)
+    assert index.rows(bitmap).tolist() == expected.index.tolist()
+
+def test_statistics_match_pandas(frame, index):
+    filters = parse_filters({'smoker': 'No', 'age_min': '30', 'age_max': '60'})
+    expected = pandas_select(frame, filters)['annual_medical_cost']
+    stats = cohort_statistics(index, filters)
+    assert stats['total_records'] == len(expected)
+    assert stats['cost_statistics']['mean'] == pytest.approx(expected.mean())
+    assert stats['cost_statistics']['median'] == pytest.approx(expected.median())
+    assert stats['cost_statistics']['std'] == pytest.approx(expected.std())
+    assert stats['cost_statistics']['min'] == expected.min()
+    assert stats['cost_statistics']['max'] == expected.max()
+
+def test_visualizations_match_pandas(frame, index):
+    filters = parse_filters({'city_type': 'Urban'})
+    selected = pandas_select(frame, filters)
+    viz = cohort_visualizations(index, filters)
+    by_insurance = selected.fillna({'insurance_type': 'None'}).groupby('insurance_type')['annual_medical_cost'].mean()
+    assert viz['bar_chart']['labels'] == by_insurance.index.tolist()
+    assert np.allclose(viz['bar_chart']['data'], by_insurance.to_numpy())
+    assert sum(viz['pie_chart']['data']) == len(selected)
+    by_age = selected.groupby(pd.cut(selected['age'], bins=AGE_BINS, labels=AGE_LABELS), observed=False)['annual_medical_cost'].mean()
+    assert np.allclose(viz['line_chart']['data'], by_age.fillna(0.0).to_numpy())
+    male_smokers = selected[(selected['gender'] == 'Male') & (selected['smoker'] == 'Yes')]['annual_medical_cost']
+    assert viz['polar_chart']['data'][0] == pytest.approx(male_smokers.mean())
+
+def test_empty_cohort(index):
+    stats = cohort_statistics(index, parse_filters({'age_min': '500'}))
+    assert stats['total_records'] == 0
+    assert stats['cost_statistics'] is None
+
+def test_unknown_parameters_are_ignored():
+    assert parse_filters({}) is None
+    assert parse_filters({'_': '1700000000'}) is None
+    assert parse_filters({'smoker': 'Yes', 'cache_bust': 'x'}) == {'equals': {'smoker': ['Yes']}, 'ranges': {}}
+
+def test_age_bands_match_pandas_cut():
+    ages = [1, 20, 20.5, 30, 79, 80, 80.5, 100]
+    expected = pd.cut(pd.Series(ages), bins=AGE_BINS, labels=AGE_LABELS).astype(str).tolist()
+    assert [AGE_LABELS[code] for code in age_group_codes(ages)] == expected
+    assert [age_band(age) for age in ages] == expected
+
+def test_missing_insurance_is_the_none_category(frame, index):
+    # The unfiltered dashboard counts the same categories the index does.
+    unfiltered = fill_missing_categories(frame)['insurance_type'].value_counts()
+    assert 'None' in unfiltered and unfiltered.sum() == len(frame)
+    assert sorted(index.bitmaps['insurance_type']) == sorted(unfiltered.index)
+
+    stats = cohort_statistics(index, parse_filters({'insurance_type': 'None'}))
+    assert stats['total_records'] == unfiltered['None'] == frame['insurance_type'].isna().sum()
+    assert 'nan' not in cohort_visualizations(index, parse_filters({'city_type': 'Urban'}))['bar_chart']['labels']
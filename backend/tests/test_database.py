@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+from database import decode_prediction_cursor, encode_prediction_cursor, get_user_predictions
+
+def test_cursor_round_trip():
+    from bson import ObjectId
+    doc = {'timestamp': datetime(2026, 3, 1, 12, 30, 5, 123000), '_id': ObjectId()}
+    assert decode_prediction_cursor(encode_prediction_cursor(doc)) == (doc['timestamp'], doc['_id'])
+
+def test_keyset_pages_have_no_duplicates_or_gaps(mongo):
+    started = datetime(2026, 3, 1)
+    # Pairs of predictions share a timestamp, so the _id tie-break decides page edges.
+    mongo.predictions.insert_many([
+        {'user_email': 'a@example.com', 'timestamp': started + timedelta(seconds=i // 2), 'prediction': float(i)}
+        for i in range(11)
+    ] + [{'user_email': 'b@example.com', 'timestamp': started, 'prediction': -1.0}])
+
+    seen, before = [], None
+    while True:
+        page = get_user_predictions('a@example.com', limit=3, before=before, summary=False)
+        if not page:
+            break
+        seen.extend(doc['prediction'] for doc in page)
+        before = encode_prediction_cursor(page[-1])
+
+    assert sorted(seen) == [float(i) for i in range(11)]
+    assert len(seen) == len(set(seen))
+    timestamps = [started + timedelta(seconds=int(value) // 2) for value in seen]
+    assert timestamps == sorted(timestamps, reverse=True)
@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+import drift
+from drift import DriftMonitor, build_reference
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'costdata.csv')
+
+def monitor_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'drift-monitor' and thread.is_alive()]
+
+def test_evaluator_starts_on_first_input_and_stops(monkeypatch):
+    monkeypatch.setattr(drift, 'DRIFT_INTERVAL', 0.01)
+    frame = pd.read_csv(DATASET, nrows=500)
+    monitor = DriftMonitor(build_reference(frame))
+    before = len(monitor_threads())
+
+    # Creating a monitor (as the pre-fork master does) starts nothing.
+    assert len(monitor_threads()) == before
+    monitor.update(frame.iloc[0].to_dict())
+    assert len(monitor_threads()) == before + 1
+
+    monitor.stop()
+    deadline = time.monotonic() + 2
+    while len(monitor_threads()) > before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(monitor_threads()) == before
+
+    # A stopped monitor, replaced on reload, never restarts.
+    monitor.thread_pid = None
+    monitor.update(frame.iloc[1].to_dict())
+    assert len(monitor_threads()) == before
+
+def test_preview_leaves_the_live_counts_alone(monkeypatch):
+    monkeypatch.setattr(drift, 'DRIFT_INTERVAL', 3600)
+    monkeypatch.setattr(drift, 'DRIFT_MIN_SAMPLES', 10)
+    frame = pd.read_csv(DATASET, nrows=500)
+    monitor = DriftMonitor(build_reference(frame))
+    try:
+        for row in frame.head(40).to_dict('records'):
+            monitor.update(row)
+
+        report = monitor.preview()
+        assert report['samples'] == 40 and report['features']
+        assert monitor.samples == 40 and monitor.report is None
+        assert monitor.preview()['features'] == report['features']
+
+        assert monitor.evaluate()['samples'] == 40
+        assert monitor.samples == 40 * drift.DRIFT_DECAY
+    finally:
+        monitor.stop()
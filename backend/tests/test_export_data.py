@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import pytest
+
+from export_data import parse_export_args
+
+def test_valid_arguments():
+    params = parse_export_args({'since': '2024-01-01', 'until': '2024-02-01', 'after_id': '65a1b2c3d4e5f60718293a4b'})
+    assert params == {'since': datetime(2024, 1, 1), 'until': datetime(2024, 2, 1), 'after_id': '65a1b2c3d4e5f60718293a4b'}
+    assert parse_export_args({}) == {'since': None, 'until': None, 'after_id': None}
+
+@pytest.mark.parametrize('args', [
+    {'after_id': 'not-an-object-id'},
+    {'since': 'yesterday'},
+    {'since': '2024-02-01', 'until': '2024-01-01'}
+])
+def test_invalid_arguments_raise_before_streaming(args):
+    with pytest.raises(ValueError):
+        parse_export_args(args)
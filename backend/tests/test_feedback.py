@@ -0,0 +1,108 @@
+from feedback import TARGET, feature_hash, validate_row
+
+SCHEMA = {
+    'feature_names': ['age', 'gender', 'bmi', 'diabetes', 'doctor_visits_per_year'],
+    'categories': {'gender': {'Female', 'Male'}}
+}
+
+ROW = {'age': 40, 'gender': 'Male', 'bmi': 27.5, 'diabetes': 1, 'doctor_visits_per_year': 3, TARGET: 12000}
+
+def test_valid_row_is_normalised():
+    clean, reason = validate_row(ROW, SCHEMA)
+    assert reason is None
+    assert clean == {'age': 40.0, 'gender': 'Male', 'bmi': 27.5, 'diabetes': 1, 'doctor_visits_per_year': 3, TARGET: 12000.0}
+    assert isinstance(clean['diabetes'], int)
+
+def test_invalid_rows_report_a_reason():
+    assert validate_row(dict(ROW, bmi=None), SCHEMA) == (None, 'missing:bmi')
+    assert validate_row(dict(ROW, gender='Other'), SCHEMA) == (None, 'category:gender')
+    assert validate_row(dict(ROW, age='forty'), SCHEMA) == (None, 'type:age')
+    assert validate_row(dict(ROW, age=200), SCHEMA) == (None, 'range:age')
+    assert validate_row(dict(ROW, diabetes=2), SCHEMA) == (None, 'range:diabetes')
+    assert validate_row(dict(ROW, **{TARGET: float('nan')}), SCHEMA) == (None, f'range:{TARGET}')
+
+def test_feature_hash_ignores_numeric_representation():
+    clean, _ = validate_row(ROW, SCHEMA)
+    as_csv = dict(ROW, age=40, bmi=27.5000000001, diabetes=1.0)
+    assert feature_hash(clean, SCHEMA['feature_names']) == feature_hash(as_csv, SCHEMA['feature_names'])
+
+def test_feature_hash_ignores_target_but_not_features():
+    names = SCHEMA['feature_names']
+    assert feature_hash(ROW, names) == feature_hash(dict(ROW, **{TARGET: 1}), names)
+    assert feature_hash(ROW, names) != feature_hash(dict(ROW, bmi=27.6), names)
+    assert feature_hash(ROW, names) != feature_hash(dict(ROW, gender='Female'), names)
+
+def test_later_report_replaces_earlier_row(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+
+    import database
+    import feedback
+    import pandas as pd
+
+    pd.DataFrame([dict(ROW, age=70)]).to_csv(tmp_path / 'seed.csv', index=False)
+    monkeypatch.setattr(feedback, 'load_training_schema', lambda models_dir: SCHEMA)
+    reported = datetime(2026, 1, 1)
+
+    def reports(docs):
+        return lambda after, batch_size: iter([
+            {'_id': f'{i:024x}', 'input_data': row, 'actual_cost': cost, 'actual_reported_at': reported + timedelta(minutes=i)}
+            for i, (row, cost) in enumerate(docs)
+        ])
+
+    # The second report of ROW arrives in the same batch; the seed duplicate is dropped.
+    monkeypatch.setattr(database, 'iter_reconciled_predictions', reports([
+        (ROW, 100), (dict(ROW, bmi=30), 200), (ROW, 150), (dict(ROW, age=70), 300)
+    ]))
+    stats = feedback.ingest(str(tmp_path / 'store'), dataset_path=str(tmp_path / 'seed.csv'), batch_size=10)
+    assert (stats['written'], stats['replaced'], stats['duplicates']) == (2, 1, 1)
+    assert len(feedback.load_feedback(str(tmp_path / 'store'))) == 2
+
+    # A correction in a later run replaces the row written by the first one.
+    monkeypatch.setattr(database, 'iter_reconciled_predictions', reports([(ROW, 175)]))
+    feedback.ingest(str(tmp_path / 'store'), dataset_path=str(tmp_path / 'seed.csv'), batch_size=10)
+
+    frame = feedback.load_feedback(str(tmp_path / 'store'))
+    assert sorted(zip(frame['bmi'], frame[TARGET])) == [(27.5, 175.0), (30.0, 200.0)]
+
+def test_training_cache_appends_and_rewrites_only_replaced_chunks(tmp_path, monkeypatch):
+    import json
+    from datetime import datetime, timedelta
+
+    import database
+    import feedback
+    import pandas as pd
+
+    pd.DataFrame([dict(ROW, age=70)]).to_csv(tmp_path / 'seed.csv', index=False)
+    monkeypatch.setattr(feedback, 'load_training_schema', lambda models_dir: SCHEMA)
+    store = str(tmp_path / 'store')
+    cache_dir = tmp_path / 'store' / feedback.CACHE_DIR
+
+    def run(*docs):
+        monkeypatch.setattr(database, 'iter_reconciled_predictions', lambda after, batch_size: iter([
+            {'_id': f'{i:024x}', 'input_data': row, 'actual_cost': cost, 'actual_reported_at': datetime(2026, 1, 1) + timedelta(minutes=i)}
+            for i, (row, cost) in enumerate(docs)
+        ]))
+        feedback.ingest(store, dataset_path=str(tmp_path / 'seed.csv'), batch_size=10)
+        frame = feedback.load_feedback(store)
+        chunks = json.loads((cache_dir / feedback.CACHE_INDEX).read_text())['chunks']
+        assert sorted(path.name for path in cache_dir.glob('chunk-*')) == sorted(chunks)
+        return sorted(zip(frame['bmi'], frame[TARGET])), {path: (cache_dir / path).stat().st_mtime_ns for path in chunks}
+
+    rows, first = run((ROW, 100), (dict(ROW, bmi=30), 200))
+    assert rows == [(27.5, 100.0), (30.0, 200.0)]
+
+    # New rows are appended without touching the cached chunk.
+    rows, second = run((dict(ROW, bmi=35), 300))
+    assert rows == [(27.5, 100.0), (30.0, 200.0), (35.0, 300.0)]
+    assert len(second) == 2 and all(second[path] == mtime for path, mtime in first.items())
+
+    # A correction rewrites only the chunk holding the replaced row.
+    rows, third = run((ROW, 150))
+    assert rows == [(27.5, 150.0), (30.0, 200.0), (35.0, 300.0)]
+    untouched = list(second)[1]
+    assert len(third) == 3 and set(third) & set(second) == {untouched}
+    assert third[untouched] == second[untouched]
+
+    # Reading without new parts rewrites nothing.
+    assert feedback.load_feedback(store)[TARGET].sum() == 650.0
+    assert {path: (cache_dir / path).stat().st_mtime_ns for path in third} == third
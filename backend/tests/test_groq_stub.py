@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from groq import Groq, InternalServerError, RateLimitError
+
+from app import DISEASE_SYSTEM_PROMPT
+from groq_stub import CHAT_REPLY, DISEASE_PROFILE, StubConfig, start_stub
+from loadtest import compare, summarize
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**options):
+        server = start_stub(config=StubConfig(latency_ms=0, **options))
+        servers.append(server)
+        return Groq(api_key='stub', base_url=f'http://127.0.0.1:{server.server_address[1]}', max_retries=0)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def chat(client, system):
+    return client.chat.completions.create(
+        model='llama-3.3-70b-versatile',
+        messages=[{'role': 'system', 'content': system}, {'role': 'user', 'content': 'Type 2 diabetes'}]
+    )
+
+def test_stub_answers_chat_and_disease_prompts(stub):
+    client = stub()
+    reply = chat(client, 'You are a helpful assistant.')
+    assert reply.choices[0].message.content == CHAT_REPLY
+    assert reply.model == 'llama-3.3-70b-versatile'
+
+    profile = chat(client, DISEASE_SYSTEM_PROMPT)
+    assert json.loads(profile.choices[0].message.content) == DISEASE_PROFILE
+
+def test_stub_injects_rate_limits_and_failures(stub):
+    with pytest.raises(RateLimitError):
+        chat(stub(rate_limit_rate=1.0), 'system')
+    with pytest.raises(InternalServerError):
+        chat(stub(failure_rate=1.0), 'system')
+
+def test_stub_delay_is_zero_without_latency():
+    assert StubConfig(latency_ms=0).delay() == 0
+    assert StubConfig(latency_ms=100, jitter=0).delay() == pytest.approx(0.1)
+
+def test_summary_separates_rejections_from_errors():
+    results = [('predict', 200, 0.01)] * 6 + [('predict', 429, 0.02), ('predict', 503, 0.02), ('predict', 500, 0.5), ('chat', 0, 1.0)]
+    summary = summarize(results, elapsed=2.0)
+
+    assert summary['predict']['count'] == 9
+    assert summary['predict']['rejected_rate'] == pytest.approx(2 / 9)
+    assert summary['predict']['error_rate'] == pytest.approx(1 / 9)
+    assert summary['chat']['error_rate'] == 1.0
+    assert summary['all']['throughput'] == 5.0
+
+    baseline = {'predict': dict(summary['predict'], p95_ms=summary['predict']['p95_ms'] / 2), 'chat': summary['chat']}
+    regressions = compare(summary, baseline, tolerance=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('predict: p95')
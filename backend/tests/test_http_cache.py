@@ -0,0 +1,53 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+import http_cache
+
+@pytest.fixture
+def client():
+    http_cache.clear()
+    builds = []
+    app = Flask(__name__)
+
+    @app.route('/stats/<version>')
+    def stats(version):
+        return http_cache.cached_json('stats', version, lambda: builds.append(version) or {'rows': list(range(500))})
+
+    app.builds = builds
+    yield app.test_client()
+    http_cache.clear()
+
+def test_matching_etag_returns_304_without_building(client):
+    first = client.get('/stats/v1', headers={'Accept-Encoding': 'identity'})
+    assert first.status_code == 200
+    assert first.headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(first.data)['rows'][-1] == 499
+
+    etag = first.headers['ETag']
+    again = client.get('/stats/v1', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+    assert client.application.builds == ['v1']
+
+def test_new_version_invalidates_etag(client):
+    etag = client.get('/stats/v1').headers['ETag']
+    response = client.get('/stats/v2', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert client.application.builds == ['v1', 'v2']
+
+def test_encoded_variants_get_their_own_etag(client):
+    plain = client.get('/stats/v1', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/stats/v1', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert gzip.decompress(zipped.data) == plain.data
+
+    # A client revalidating its gzip copy gets that same variant tag back.
+    revalidated = client.get('/stats/v1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == zipped.headers['ETag']
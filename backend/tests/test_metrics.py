@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import metrics
+
+REQUESTS = metrics.Counter('test_requests', 'test', ('route',))
+IN_FLIGHT = metrics.Gauge('test_in_flight', 'test')
+PEAK = metrics.Gauge('test_peak', 'test', mode='max')
+LATENCY = metrics.Histogram('test_latency_seconds', 'test', buckets=(0.1, 1.0))
+
+def line(text, prefix):
+    return next(row for row in text.splitlines() if row.startswith(prefix))
+
+def record(requests, in_flight, peak, latency):
+    for metric in (REQUESTS, IN_FLIGHT, PEAK, LATENCY):
+        metric._values.clear()
+    REQUESTS.inc('/api/predict', amount=requests)
+    IN_FLIGHT.set(in_flight)
+    PEAK.set(peak)
+    LATENCY.observe(latency)
+
+def test_local_render():
+    record(3, 1, 0.5, 0.05)
+    text = metrics.render()
+    assert line(text, 'test_requests_total{') == 'test_requests_total{route="/api/predict"} 3.0'
+    assert line(text, 'test_latency_seconds_count') == 'test_latency_seconds_count 1'
+
+def test_workers_are_aggregated(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    metrics.reset_directory(directory)
+    monkeypatch.setattr(metrics, '_worker_dir', directory)
+
+    # Another worker's last flush.
+    record(5, 2, 0.9, 0.5)
+    metrics.flush()
+    shutil.move(f'{directory}/{os.getpid()}.json', f'{directory}/111.json')
+
+    record(3, 1, 0.4, 0.05)
+    text = metrics.render()
+    assert line(text, 'test_requests_total{') == 'test_requests_total{route="/api/predict"} 8.0'
+    assert line(text, 'test_in_flight ') == 'test_in_flight 3.0'
+    assert line(text, 'test_peak ') == 'test_peak 0.9'
+    assert line(text, 'test_latency_seconds_bucket{le="0.1"}') == 'test_latency_seconds_bucket{le="0.1"} 1'
+    assert line(text, 'test_latency_seconds_count') == 'test_latency_seconds_count 2'
+
+    # An exited worker's counters stay in the totals; its gauges do not.
+    metrics.mark_process_dead(directory, 111)
+    assert not os.path.exists(f'{directory}/111.json')
+    text = metrics.render()
+    assert line(text, 'test_requests_total{') == 'test_requests_total{route="/api/predict"} 8.0'
+    assert line(text, 'test_in_flight ') == 'test_in_flight 1.0'
+    assert line(text, 'test_latency_seconds_count') == 'test_latency_seconds_count 2'
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+
+import pytest
+
+import password_hashing
+from password_hashing import hash_rounds, needs_rehash
+
+def test_hash_rounds():
+    assert hash_rounds(b'$2b$12$' + b'a' * 53) == 12
+    assert hash_rounds(b'not-a-hash') is None
+
+def test_rehash_only_upgrades(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 12)
+    assert needs_rehash(b'$2b$10$' + b'a' * 53)
+    assert not needs_rehash(b'$2b$12$' + b'a' * 53)
+    assert not needs_rehash(b'$2b$14$' + b'a' * 53)
+    assert not needs_rehash(b'not-a-hash')
+
+def test_async_hashing_waits_on_its_loop_then_gives_up(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'HASH_QUEUE_LIMIT', 1)
+    monkeypatch.setattr(password_hashing, 'HASH_WAIT_SECONDS', 0.2)
+    release = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(password_hashing._run_async(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(password_hashing.HashingBusy):
+            await password_hashing._run_async(lambda: 'unreachable')
+        release.set()
+        assert await first
+        assert await password_hashing._run_async(lambda: 'done') == 'done'
+
+    asyncio.run(scenario())
+    # A second event loop gets its own semaphore.
+    assert asyncio.run(password_hashing._run_async(lambda: 'again')) == 'again'
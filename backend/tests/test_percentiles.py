@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import percentiles
+from percentiles import OVERALL, age_band, build_percentile_index, percentile_rank, rank_prediction
+
+def test_percentile_rank_uses_midpoint_for_ties():
+    values = np.array([1.0, 2.0, 2.0, 3.0])
+    assert percentile_rank(values, 2.0) == 50.0
+    assert percentile_rank(values, 0.0) == 0.0
+    assert percentile_rank(values, 10.0) == 100.0
+    assert percentile_rank(np.array([]), 1.0) is None
+
+def test_age_bands():
+    assert age_band(5) == '<20'
+    assert age_band(20) == '<20'
+    assert age_band(20.5) == '20-30'
+    assert age_band(80) == '70-80'
+    assert age_band(150) == '80+'
+
+def test_rank_prediction_by_segment(monkeypatch):
+    monkeypatch.setattr(percentiles, 'MIN_SEGMENT_SIZE', 3)
+    predictions = np.arange(10, dtype=float)
+    ages = [25] * 5 + [45] * 5
+    smokers = ['Yes'] * 10
+    cities = ['Urban'] * 9 + ['Rural']
+    index = build_percentile_index(predictions, ages, smokers, cities)
+    assert index[OVERALL].tolist() == predictions.tolist()
+
+    ranked = rank_prediction(index, {'age': 27, 'smoker': 'Yes', 'city_type': 'Urban'}, 4.0)
+    assert ranked['segment_key'] == '20-30|Yes|Urban'
+    assert ranked['segment_size'] == 5
+    assert ranked['segment'] == pytest.approx(90.0)
+    assert ranked['overall'] == pytest.approx(45.0)
+
+    # Segments smaller than the minimum report only the overall rank.
+    small = rank_prediction(index, {'age': 45, 'smoker': 'Yes', 'city_type': 'Rural'}, 9.0)
+    assert small['segment'] is None and small['segment_size'] == 1
+
+    missing = rank_prediction(index, {'age': 90, 'smoker': 'No', 'city_type': 'Urban'}, 1.0)
+    assert missing['segment'] is None and missing['segment_size'] == 0
+
+def test_index_files_are_versioned(tmp_path):
+    index = {OVERALL: np.array([1.0, 2.0]), '<20|No|Urban': np.array([1.0])}
+    percentiles.save_percentile_index(str(tmp_path), index, 'v1')
+    loaded = percentiles.load_percentile_index(str(tmp_path), 'v1')
+    assert loaded[OVERALL].tolist() == [1.0, 2.0]
+    assert percentiles.load_percentile_index(str(tmp_path), 'v2') is None
+
+    # Files written before the age bands were unified carry no format and are ignored.
+    np.savez(tmp_path / percentiles.PERCENTILE_INDEX_FILE, version=np.array('v1'), **{f'segment:{OVERALL}': index[OVERALL]})
+    assert percentiles.load_percentile_index(str(tmp_path), 'v1') is None
@@ -0,0 +1,62 @@
+from prediction_codec import (
+    compact_prediction, decode_input, encode_input, expand_document, is_compact, legacy_model_version,
+    LEGACY_VERSION_PREFIX
+)
+
+SCHEMA = {
+    'feature_names': ['age', 'gender', 'bmi', 'smoker', 'diabetes', 'doctor_visits_per_year', 'city_type'],
+    'categories': {'gender': ['Female', 'Male'], 'smoker': ['No', 'Yes'], 'city_type': ['Rural', 'Semi-Urban', 'Urban']},
+    'model_names': ['Random Forest', 'Gradient Boosting', 'XGBoost']
+}
+
+INPUT = {'age': 42.0, 'gender': 'Male', 'bmi': 27.3, 'smoker': 'Yes', 'diabetes': 1, 'doctor_visits_per_year': 4, 'city_type': 'Semi-Urban'}
+
+def test_input_round_trip():
+    assert decode_input(encode_input(INPUT, SCHEMA), SCHEMA) == INPUT
+
+def test_missing_values_decode_as_none():
+    decoded = decode_input(encode_input(dict(INPUT, bmi=None), SCHEMA), SCHEMA)
+    assert decoded['bmi'] is None
+    assert decoded['age'] == 42.0
+
+def test_compact_document_expands_to_legacy_shape():
+    members = {'Random Forest': 1200.5, 'XGBoost': 1300.25}
+    doc = compact_prediction(1250.0, INPUT, members, 'v1', SCHEMA)
+    assert is_compact(doc)
+
+    expanded = expand_document(dict(doc, user_email='a@example.com'), SCHEMA)
+    assert expanded['prediction_inr'] == 1250.0
+    assert expanded['input_data'] == INPUT
+    # Members absent at write time stay absent rather than decoding as NaN.
+    assert expanded['individual_predictions'] == members
+    assert 'features' not in expanded and 'members' not in expanded
+    assert expanded['user_email'] == 'a@example.com'
+
+def test_expand_without_schema_keeps_prediction():
+    doc = compact_prediction(99.0, INPUT, {}, 'unknown', SCHEMA)
+    expanded = expand_document(doc, None)
+    assert expanded['prediction_inr'] == 99.0
+    assert 'input_data' not in expanded
+
+def test_legacy_documents_pass_through():
+    doc = {'prediction_inr': 10.0, 'input_data': INPUT}
+    assert expand_document(doc, SCHEMA) is doc
+
+def test_legacy_version_marker():
+    version = legacy_model_version(SCHEMA)
+    assert version.startswith(LEGACY_VERSION_PREFIX)
+    assert version == legacy_model_version(dict(SCHEMA))
+    assert version != legacy_model_version(dict(SCHEMA, model_names=['XGBoost']))
+
+def test_unknown_category_decodes_as_missing():
+    decoded = decode_input(encode_input(dict(INPUT, city_type='Metro'), SCHEMA), SCHEMA)
+    assert decoded['city_type'] is None
+    assert decoded['gender'] == 'Male'
+
+def test_compact_document_records_segment():
+    doc = compact_prediction(1250.0, INPUT, {}, 'v1', SCHEMA, segment='Urban|Private', segment_version='seg-v2')
+    expanded = expand_document(doc, SCHEMA)
+    assert expanded['segment'] == 'Urban|Private'
+    assert expanded['segment_version'] == 'seg-v2'
+    assert expanded['model_version'] == 'v1'
+    assert 'segment' not in compact_prediction(1250.0, INPUT, {}, 'v1', SCHEMA)
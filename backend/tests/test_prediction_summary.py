@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from database import save_prediction
+from prediction_summary import get_prediction_summary
+
+def insert(mongo, timestamp, prediction, age, user_email='a@example.com'):
+    mongo.predictions.insert_one({
+        'user_email': user_email, 'timestamp': timestamp, 'prediction': prediction,
+        'input_data': {'age': age, 'smoker': 'No'}, 'individual_predictions': {'XGBoost': prediction + 1}
+    })
+
+def test_summary_aggregates_totals_months_and_sensitivity(mongo):
+    insert(mongo, datetime(2026, 1, 5), 1000.0, 40)
+    insert(mongo, datetime(2026, 1, 20), 1200.0, 42)
+    insert(mongo, datetime(2026, 2, 3), 1500.0, 45)
+    insert(mongo, datetime(2026, 2, 4), 9999.0, 99, user_email='b@example.com')
+
+    summary = get_prediction_summary('a@example.com')
+    assert summary['count'] == 3
+    assert summary['first_prediction_at'] == datetime(2026, 1, 5)
+    assert summary['last_prediction_at'] == datetime(2026, 2, 3)
+    assert summary['overall'] == {'min': 1000.0, 'mean': pytest.approx(1233.333, abs=1e-3), 'max': 1500.0}
+    assert [(row['month'], row['count'], row['mean']) for row in summary['monthly']] == [('2026-01', 2, 1100.0), ('2026-02', 1, 1500.0)]
+    assert summary['latest']['prediction'] == 1500.0
+    assert summary['latest_by_model'] == {'XGBoost': 1501.0}
+
+    # Two age changes of +2 and +3 years moved the prediction by 200 and 300.
+    age = summary['input_sensitivity']['age']
+    assert age['changes'] == 2
+    assert age['mean_prediction_change'] == 250.0
+    assert age['cost_per_unit'] == pytest.approx(100.0)
+    assert 'smoker' not in summary['input_sensitivity']
+
+def test_summary_is_rebuilt_after_a_new_prediction(mongo):
+    assert get_prediction_summary('c@example.com')['count'] == 0
+    save_prediction('c@example.com', {'prediction': 700.0})
+    assert get_prediction_summary('c@example.com')['count'] == 1
@@ -0,0 +1,36 @@
+import os
+
+import profiling
+from profiling import merge_profiles
+
+def test_merge_sums_routes_and_caps_stacks(monkeypatch):
+    monkeypatch.setattr(profiling, 'MAX_STACKS_PER_ROUTE', 2)
+    merged = merge_profiles([
+        {'stacks': {'/a': {'x;y': 3, 'x;z': 1}}, 'requests': {'/a': 2}, 'samples': {'/a': 4}},
+        {'stacks': {'/a': {'x;y': 2, 'x;w': 5}, '/b': {'q': 1}}, 'requests': {'/a': 1, '/b': 1}, 'samples': {'/a': 7, '/b': 1}}
+    ])
+    assert merged['requests'] == {'/a': 3, '/b': 1}
+    assert merged['samples'] == {'/a': 11, '/b': 1}
+    assert merged['stacks']['/a'] == {'x;y': 5, 'x;z': 1, '[truncated]': 5}
+
+def test_workers_are_merged_and_reset_together(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    profiler = profiling.profiler
+    monkeypatch.setattr(profiling, '_worker_dir', directory)
+    profiler.take()
+
+    # Another worker's flushed file and one that has since exited.
+    profiling._write_json(f'{directory}/1.json', {'stacks': {'/a': {'x;y': 2}}, 'requests': {'/a': 1}, 'samples': {'/a': 2}})
+    profiling._write_json(f'{directory}/2.json', {'stacks': {'/a': {'x;z': 1}}, 'requests': {'/a': 1}, 'samples': {'/a': 1}})
+    profiling.mark_process_dead(directory, 2)
+    assert not os.path.exists(f'{directory}/2.json')
+
+    with profiler.lock:
+        profiler.requests['/a'] = 1
+        profiler._record('/a', 'x;y')
+
+    assert profiler.summary() == {'/a': {'profiled_requests': 3, 'samples': 4, 'distinct_stacks': 2}}
+    assert profiler.folded('/a') == 'x;y 3\nx;z 1\n'
+
+    profiler.reset()
+    assert profiler.summary() == {}
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import recommendations
+from recommendations import build_ladders, recommend
+from scoring import PROFILE_FIELDS, parse_profile
+
+FEATURES = list(PROFILE_FIELDS)
+SCHEMA = {
+    'feature_names': FEATURES,
+    'categories': {
+        'gender': ['Female', 'Male'],
+        'smoker': ['No', 'Yes'],
+        'physical_activity_level': ['High', 'Low', 'Medium'],
+        'insurance_type': ['Government', 'Private'],
+        'city_type': ['Rural', 'Semi-Urban', 'Urban']
+    }
+}
+
+class IdentityScaler:
+    def transform(self, frame):
+        return frame.to_numpy()
+
+class LinearModel:
+    def __init__(self, coefficients):
+        self.coef = np.array([coefficients.get(feature, 0.0) for feature in FEATURES])
+
+    def predict(self, X):
+        return 10000 + np.asarray(X) @ self.coef
+
+MODELS = {'linear': LinearModel({'smoker': 3000, 'bmi': 100, 'stress_level': 50, 'daily_steps': -0.01})}
+
+@pytest.fixture(autouse=True)
+def unbounded_budget(monkeypatch):
+    # The wall-clock budget would make the search depend on machine speed.
+    monkeypatch.setattr(recommendations, 'BUDGET_SECONDS', 60)
+
+def profile(**overrides):
+    return parse_profile(dict({'smoker': 'Yes', 'bmi': 31, 'stress_level': 6, 'daily_steps': 4000}, **overrides))
+
+def test_ladders_only_cover_improvable_features():
+    ladders = build_ladders(profile(physical_activity_level='High', sleep_hours=8))
+    assert ladders['smoker'] == ['No']
+    assert ladders['bmi'] == [30.0, 29.0, 28.0, 27.0, 26.0, 25.0]
+    assert 'physical_activity_level' not in ladders and 'sleep_hours' not in ladders
+
+def test_recommendations_are_pareto_optimal():
+    result = recommend(profile(), SCHEMA, FEATURES, IdentityScaler(), MODELS)
+    assert result['candidates_scored'] > 0
+    plans = result['recommendations']
+    assert plans
+    assert all(plan['savings'] > 0 for plan in plans)
+    # No kept plan is dominated by another: lower effort must mean lower savings.
+    for plan in plans:
+        for other in plans:
+            if other is not plan and other['effort'] <= plan['effort']:
+                assert other['savings'] < plan['savings'] or other['effort'] == plan['effort']
+    for plan in plans:
+        assert plan['prediction'] == result['base_prediction'] - plan['savings']
+
+def test_quitting_smoking_is_recommended():
+    result = recommend(profile(), SCHEMA, FEATURES, IdentityScaler(), MODELS)
+    assert any('smoker' in plan['changes'] for plan in result['recommendations'])
+
+def test_beam_respects_round_limit(monkeypatch):
+    monkeypatch.setattr(recommendations, 'MAX_ROUNDS', 1)
+    result = recommend(profile(), SCHEMA, FEATURES, IdentityScaler(), MODELS)
+    assert result['rounds'] == 1
+    assert all(len(plan['changes']) == 1 for plan in result['recommendations'])
+
+def test_nothing_to_improve():
+    healthy = profile(smoker='No', bmi=22, stress_level=1, daily_steps=12000, sleep_hours=8, physical_activity_level='High')
+    result = recommend(healthy, SCHEMA, FEATURES, IdentityScaler(), MODELS)
+    assert result['recommendations'] == [] and result['rounds'] == 0
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import score_batch
+from scoring import PROFILE_FIELDS
+
+CATEGORIES = {
+    'gender': ['Female', 'Male'], 'smoker': ['No', 'Yes'], 'physical_activity_level': ['High', 'Low', 'Medium'],
+    'insurance_type': ['Government', 'None', 'Private'], 'city_type': ['Rural', 'Semi-Urban', 'Urban']
+}
+
+@pytest.fixture(scope='module')
+def bundle():
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import StandardScaler
+
+    feature_names = list(PROFILE_FIELDS)
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 3, (200, len(feature_names))), columns=feature_names)
+    y = X.sum(axis=1) * 1000
+    scaler = StandardScaler().fit(X)
+    scaled = scaler.transform(X)
+    return {
+        'models': {'Linear': LinearRegression().fit(scaled, y), 'Forest': RandomForestRegressor(n_estimators=3, random_state=0).fit(scaled, y)},
+        'weights': None,
+        'scaler': scaler,
+        'feature_names': feature_names,
+        'schema': {'feature_names': feature_names, 'categories': CATEGORIES},
+        'version': 'test-bundle'
+    }
+
+def run(monkeypatch, bundle, *args):
+    monkeypatch.setattr(score_batch, 'load_bundle', lambda models_dir: bundle)
+    monkeypatch.setattr('sys.argv', ['score_batch.py', *args, '--chunk-rows', '3', '--workers', '2', '--id-column', 'member_id'])
+    score_batch.main()
+
+def test_resume_after_a_torn_chunk_matches_a_clean_run(tmp_path, monkeypatch, bundle):
+    source = tmp_path / 'members.csv'
+    pd.DataFrame({'member_id': range(10), 'age': np.linspace(20, 70, 10), 'smoker': ['Yes', 'No'] * 5}).to_csv(source, index=False)
+    run(monkeypatch, bundle, str(source), str(tmp_path / 'clean.csv'))
+
+    # The run dies while writing chunk 2, after part of it reached the file.
+    write = score_batch.CsvSink.write
+    def crash(self, chunk_index, frame):
+        if chunk_index == 2:
+            self.file.write(b'torn,row\n')
+            self.file.flush()
+            raise RuntimeError('killed')
+        return write(self, chunk_index, frame)
+    monkeypatch.setattr(score_batch.CsvSink, 'write', crash)
+    checkpoint = str(tmp_path / 'scored.ckpt')
+    with pytest.raises(RuntimeError):
+        run(monkeypatch, bundle, str(source), str(tmp_path / 'resumed.csv'), '--checkpoint', checkpoint)
+    assert score_batch.read_checkpoint(checkpoint)['chunk'] == 1
+
+    monkeypatch.setattr(score_batch.CsvSink, 'write', write)
+    run(monkeypatch, bundle, str(source), str(tmp_path / 'resumed.csv'), '--checkpoint', checkpoint)
+
+    resumed = pd.read_csv(tmp_path / 'resumed.csv')
+    assert resumed['member_id'].tolist() == list(range(10))
+    pd.testing.assert_frame_equal(resumed, pd.read_csv(tmp_path / 'clean.csv'))
+    assert score_batch.read_checkpoint(checkpoint)['chunk'] == 3
+
+def test_resume_refuses_a_different_run(tmp_path, monkeypatch, bundle):
+    source = tmp_path / 'members.csv'
+    pd.DataFrame({'member_id': range(4)}).to_csv(source, index=False)
+    checkpoint = str(tmp_path / 'scored.ckpt')
+    run(monkeypatch, bundle, str(source), str(tmp_path / 'out.csv'), '--checkpoint', checkpoint)
+
+    with pytest.raises(SystemExit):
+        run(monkeypatch, dict(bundle, version='other-bundle'), str(source), str(tmp_path / 'out.csv'), '--checkpoint', checkpoint)
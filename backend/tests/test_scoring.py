@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from scoring import build_sensitivity_matrix, parse_profile, sensitivity_rows, split_sensitivity, sweep_values
+
+SCHEMA = {
+    'feature_names': ['age', 'bmi', 'smoker', 'city_type'],
+    'categories': {'smoker': ['No', 'Yes'], 'city_type': ['Rural', 'Semi-Urban', 'Urban']}
+}
+
+def test_sweep_values():
+    assert sweep_values('smoker', None, SCHEMA) == ['No', 'Yes']
+    assert sweep_values('bmi', {'start': 20, 'stop': 30, 'steps': 3}, SCHEMA) == [20.0, 25.0, 30.0]
+    assert sweep_values('age', [30, 30, 40], SCHEMA) == [30.0, 40.0]
+    with pytest.raises(ValueError):
+        sweep_values('city_type', ['Metro'], SCHEMA)
+    with pytest.raises(ValueError):
+        sweep_values('height', [1], SCHEMA)
+
+def test_split_sensitivity_round_trip():
+    profile = parse_profile({'age': 40, 'bmi': 25, 'smoker': 'No', 'city_type': 'Urban'})
+    features = {'age': [30.0, 50.0], 'smoker': ['No', 'Yes'], 'bmi': [20.0, 30.0, 35.0]}
+    pairs = [('age', 'bmi')]
+    matrix, curves, grids = build_sensitivity_matrix(profile, features, pairs, SCHEMA)
+    assert matrix.shape == (1 + 2 + 2 + 3 + 6, 4)
+
+    # A linear stand-in model makes every expected value easy to write down.
+    predictions = matrix @ np.array([10.0, 100.0, 1000.0, 1.0])
+    base, curve_results, grid_results = split_sensitivity(predictions, curves, grids)
+
+    assert base == 40 * 10 + 25 * 100 + 2
+    assert curve_results['age']['predictions'].tolist() == [base - 100, base + 100]
+    assert curve_results['smoker']['delta'].tolist() == [0.0, 1000.0]
+    assert curve_results['bmi']['values'] == [20.0, 30.0, 35.0]
+
+    grid = grid_results[0]
+    assert grid['features'] == ['age', 'bmi']
+    assert grid['predictions'].shape == (2, 3)
+    assert grid['predictions'][1, 2] == 50 * 10 + 35 * 100 + 2
+
+def test_sensitivity_rows_follow_swept_segment_columns():
+    profile = parse_profile({'age': 40, 'bmi': 25, 'smoker': 'No', 'city_type': 'Urban'})
+    features = {'city_type': ['Rural', 'Urban'], 'age': [30.0, 50.0]}
+    pairs = [('age', 'city_type')]
+    matrix, curves, grids = build_sensitivity_matrix(profile, features, pairs, SCHEMA)
+    rows = sensitivity_rows(profile, curves, grids, ['city_type'])
+
+    assert len(rows) == matrix.shape[0]
+    assert [row['city_type'] for row in rows] == ['Urban', 'Rural', 'Urban', 'Urban', 'Urban', 'Rural', 'Urban', 'Rural', 'Urban']
+    assert matrix[1, 3] == 0 and matrix[5, 3] == 0 and matrix[6, 3] == 2
+
+def test_oversized_sensitivity_is_rejected_before_building(monkeypatch):
+    import scoring
+    monkeypatch.setattr(scoring, 'MAX_SENSITIVITY_ROWS', 100)
+    monkeypatch.setattr(scoring, 'encode_rows', lambda rows, schema: pytest.fail('built an oversized request'))
+    profile = parse_profile({'age': 40, 'bmi': 25, 'smoker': 'No', 'city_type': 'Urban'})
+    features = {'age': [float(age) for age in range(20, 30)], 'bmi': [float(bmi) for bmi in range(15, 25)]}
+    with pytest.raises(ValueError, match='needs 121 rows'):
+        build_sensitivity_matrix(profile, features, [('age', 'bmi')], SCHEMA)
+
+def test_explicit_sweeps_are_capped():
+    with pytest.raises(ValueError):
+        sweep_values('age', list(range(1000)), SCHEMA)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+import segments
+from segments import FALLBACK, SEGMENTS_DIR, SegmentRegistry, save_manifest, score_segmented
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    (tmp_path / SEGMENTS_DIR).mkdir()
+    save_manifest(str(tmp_path), {
+        'columns': ['city_type', 'insurance_type'],
+        'segments': {'Urban|Private': 'urban__private', 'Rural|Private': 'rural__private', 'Urban|Government': 'urban__government'},
+        'fallback': {}
+    })
+    loads = []
+    def load_bundle(path):
+        loads.append(path.rsplit('/', 1)[-1])
+        time.sleep(0.05)
+        return {'path': path}
+    monkeypatch.setattr(segments, 'load_bundle', load_bundle)
+    monkeypatch.setattr(segments, 'bundle_size', lambda path: 100)
+
+    def build(cache_bytes=1000):
+        registry = SegmentRegistry(str(tmp_path), {'path': 'global'}, cache_bytes)
+        registry.loads = loads
+        return registry
+    return build
+
+def test_unknown_segments_route_to_the_fallback(registry):
+    registry = registry()
+    assert registry.route({'city_type': 'Rural', 'insurance_type': 'Government'}) == (FALLBACK, registry.fallback)
+    key, bundle = registry.route({'city_type': 'Urban', 'insurance_type': 'Private'})
+    assert key == 'Urban|Private' and bundle['path'].endswith('urban__private')
+
+    rows = [{'city_type': city, 'insurance_type': 'Private'} for city in ('Urban', 'Suburban', 'Urban')]
+    assert {key: indices for key, _, indices in registry.group(rows)} == {'Urban|Private': [0, 2], FALLBACK: [1]}
+    assert registry.loads == ['urban__private']
+
+def test_least_recently_used_bundle_is_evicted_by_size(registry):
+    registry = registry(cache_bytes=250)
+    registry.get('Urban|Private')
+    registry.get('Rural|Private')
+    registry.get('Urban|Private')
+    registry.get('Urban|Government')
+
+    status = registry.status()
+    assert status['loaded'] == ['Urban|Private', 'Urban|Government']
+    assert status['loaded_bytes'] == 200
+    registry.get('Rural|Private')
+    assert registry.loads == ['urban__private', 'rural__private', 'urban__government', 'rural__private']
+
+def test_last_loaded_bundle_stays_even_over_the_cap(registry):
+    registry = registry(cache_bytes=50)
+    registry.get('Urban|Private')
+    registry.get('Rural|Private')
+    assert registry.status()['loaded'] == ['Rural|Private']
+
+def test_concurrent_requests_load_a_cold_segment_once(registry):
+    registry = registry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('Urban|Private'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.loads == ['urban__private']
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+def test_score_segmented_scores_each_segment_with_its_bundle(tmp_path, write_bundle):
+    import numpy as np
+
+    from scoring import load_bundle
+
+    write_bundle(tmp_path / SEGMENTS_DIR / 'urban__private', scale=300)
+    save_manifest(str(tmp_path), {'columns': ['city_type'], 'segments': {'Urban': 'urban__private'}, 'fallback': {}})
+    registry = SegmentRegistry(str(tmp_path), load_bundle(str(write_bundle(tmp_path / 'global'))))
+
+    rows = [{'city_type': 'Urban'}, {'city_type': 'Rural'}]
+    predictions, members, intervals, keys = score_segmented(registry, rows, np.array([[40.0, 30.0], [40.0, 30.0]]), ['age', 'bmi'])
+
+    assert keys == ['Urban', FALLBACK]
+    assert predictions[0] == pytest.approx(3 * predictions[1], rel=0.1)
+    assert intervals['lower'][0] <= predictions[0] <= intervals['upper'][0]
@@ -0,0 +1,51 @@
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import serialization
+from serialization import FastJSONProvider
+
+PAYLOAD = {
+    'created_at': datetime(2026, 3, 1, 12, 30, 5),
+    'aware': datetime(2026, 3, 1, 12, 30, 5, tzinfo=timezone.utc),
+    'day': date(2026, 3, 1),
+    'name': 'Zoë',
+    'values': [1, 2.5, None, True]
+}
+
+@pytest.fixture(params=sorted(serialization.SERIALIZERS))
+def serializer(request, monkeypatch):
+    monkeypatch.setattr(serialization, 'dumps_bytes', serialization.SERIALIZERS[request.param])
+    return request.param
+
+def test_matches_flask_default_output(serializer):
+    # Same values and the same HTTP-date datetimes as the provider it replaces.
+    expected = DefaultJSONProvider(Flask(__name__)).dumps(PAYLOAD)
+    assert serialization.loads(serialization.dumps(PAYLOAD)) == serialization.loads(expected)
+    assert serialization.loads(serialization.dumps(PAYLOAD))['created_at'] == 'Sun, 01 Mar 2026 12:30:05 GMT'
+
+def test_numpy_object_ids_and_int_keys(serializer):
+    from bson import ObjectId
+    object_id = ObjectId()
+    body = serialization.loads(serialization.dumps({
+        'matrix': np.arange(6, dtype=float).reshape(2, 3),
+        'count': np.int64(3),
+        'id': object_id,
+        1: 'one'
+    }))
+    assert body == {'matrix': [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]], 'count': 3, 'id': str(object_id), '1': 'one'}
+
+def test_provider_builds_json_responses(serializer):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    @app.route('/')
+    def index():
+        return {'when': datetime(2026, 3, 1), 'scores': np.array([1.5, 2.5])}
+
+    response = app.test_client().get('/')
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'when': 'Sun, 01 Mar 2026 00:00:00 GMT', 'scores': [1.5, 2.5]}
@@ -0,0 +1,54 @@
+from shadow import ShadowWindow
+
+def test_window_report():
+    window = ShadowWindow('candidate-v1')
+    assert window.report()['prediction_delta'] is None and not window.report()['promotable']
+
+    for prediction in (100.0, 200.0):
+        window.record(
+            {'prediction': prediction, 'members': {'RF': prediction, 'GB': prediction}, 'latency': 0.010},
+            {'prediction': prediction * 1.02, 'members': {'RF': prediction * 1.04}, 'latency': 0.011}
+        )
+    report = window.report()
+    assert report['scored'] == 2 and report['window'] == 2
+    assert report['prediction_delta']['mean'] == 3.0
+    assert report['member_disagreement'] == {'RF': {'mean': 6.0, 'mean_abs': 6.0}}
+    assert report['promotable']
+
+    window.record_error()
+    assert not window.report()['promotable']
+    window.reset()
+    assert window.report()['scored'] == 0 and window.report()['candidate_version'] == 'candidate-v1'
+
+def test_single_process_candidate_reports_metrics_through_the_queue(tmp_path, monkeypatch, write_bundle):
+    import glob
+    import tempfile
+    import time
+
+    import metrics
+    from scoring import parse_profile
+    from shadow import SHADOW_REQUESTS, ShadowEvaluator
+
+    write_bundle(tmp_path)
+    monkeypatch.setattr(metrics, '_worker_dir', None)
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    scratch = set(glob.glob(f'{tempfile.gettempdir()}/shadow-metrics-*'))
+    scored = SHADOW_REQUESTS.snapshot().get(('scored',), 0)
+
+    evaluator = ShadowEvaluator(str(tmp_path), sample_rate=1)
+    evaluator.start()
+    try:
+        for age in (30, 40, 50):
+            evaluator.submit(parse_profile({'age': age}), 1000.0, {'Random Forest': 1000.0}, 0.001)
+        deadline = time.monotonic() + 60
+        while SHADOW_REQUESTS.snapshot().get(('scored',), 0) < scored + 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        evaluator.stop()
+
+    assert SHADOW_REQUESTS.snapshot().get(('scored',), 0) == scored + 3
+    # The serving process's own registry and temp directory are left alone.
+    assert metrics.REQUESTS_IN_FLIGHT.snapshot().get((), 0) >= 1
+    assert metrics._worker_dir is None
+    assert set(glob.glob(f'{tempfile.gettempdir()}/shadow-metrics-*')) == scratch
+    metrics.REQUESTS_IN_FLIGHT.dec()
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import train_test_split
+
+import train_ensemble
+from percentiles import PERCENTILE_INDEX_FILE
+from train_ensemble import VALIDATION_SIZE, CostPredictionEnsemble
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', '..', 'dataset', 'costdata.csv')
+
+def small_ensemble(frame):
+    ensemble = CostPredictionEnsemble()
+    X_train, X_test, y_train, y_test, _, _ = ensemble.preprocess(frame)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42)
+    ensemble.build_models()
+    for model in ensemble.models.values():
+        model.set_params(n_estimators=8)
+    ensemble.train_individual_models(X_fit, y_fit, X_test, y_test)
+    ensemble.create_voting_ensemble(X_fit, y_fit, X_test, y_test)
+    return ensemble, (X_val, y_val, X_test, y_test)
+
+@pytest.fixture(scope='module')
+def frame():
+    return pd.read_csv(DATASET).head(600)
+
+def test_vote_weights_are_fit_on_validation_rows_only(frame, tmp_path, monkeypatch):
+    ensemble, (X_val, y_val, X_test, y_test) = small_ensemble(frame)
+    fitted_rows = set()
+    fit_vote_weights = train_ensemble.fit_vote_weights
+    monkeypatch.setattr(train_ensemble, 'fit_vote_weights', lambda matrix, y: fitted_rows.add(len(y)) or fit_vote_weights(matrix, y))
+
+    report = ensemble.prune_ensemble(X_val, y_val, X_test, y_test, max_trees=20, tolerance=0.05, output_dir=str(tmp_path))
+
+    assert fitted_rows == {len(y_val)}
+    chosen, baseline = report['chosen'], report['baseline']
+    assert chosen['rmse'] <= baseline['rmse'] * 1.05
+    assert chosen['trees'] <= baseline['trees']
+    assert 'test_rmse' in chosen and 'test_rmse' in baseline
+    assert sum(chosen['weights'].values()) == pytest.approx(1)
+    assert json.loads((tmp_path / 'pruning_report.json').read_text())['chosen'] == chosen
+
+    pruned = joblib.load(tmp_path / 'ensemble_model.pkl')
+    assert set(pruned.named_estimators_) == set(chosen['members'])
+
+def test_prune_only_keeps_the_saved_scaler(frame, tmp_path, monkeypatch):
+    (tmp_path / 'dataset').mkdir()
+    frame.to_csv(tmp_path / 'dataset' / 'costdata.csv', index=False)
+    backend = tmp_path / 'backend'
+    backend.mkdir()
+
+    ensemble, _ = small_ensemble(frame)
+    # A scaler that refitting on the training rows would never reproduce.
+    ensemble.scaler.mean_ = ensemble.scaler.mean_ + 1.0
+    ensemble.save_models(str(backend / 'models'))
+
+    monkeypatch.chdir(backend)
+    monkeypatch.setattr(sys, 'argv', ['train_ensemble.py', '--prune-only', '--max-trees', '20', '--tolerance', '0.05'])
+    train_ensemble.main()
+
+    saved = joblib.load(backend / 'models' / 'scaler.pkl')
+    pruned = joblib.load(backend / 'models_pruned' / 'scaler.pkl')
+    np.testing.assert_array_equal(pruned.mean_, saved.mean_)
+    assert (backend / 'models_pruned' / PERCENTILE_INDEX_FILE).exists()
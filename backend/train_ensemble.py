@@ -7,6 +7,9 @@ from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import joblib
 import json
+import argparse
+import copy
+from segments import SEGMENTS_DIR, SEGMENT_COLUMNS, SEGMENT_MIN_ROWS, save_manifest, segment_dirname, segment_key
 
 class CostPredictionEnsemble:
     def __init__(self):
@@ -17,9 +20,19 @@ class CostPredictionEnsemble:
         self.feature_names = []
         self.feature_importance = {}
         
-    def load_and_preprocess_data(self, csv_path):
+    def load_and_preprocess_data(self, csv_path, feedback_dir=None):
+        return self.preprocess(self.load_training_frame(csv_path, feedback_dir))
+    
+    def load_training_frame(self, csv_path, feedback_dir=None):
         df = pd.read_csv(csv_path)
-        
+        if feedback_dir:
+            from feedback import load_feedback
+            feedback = load_feedback(feedback_dir)
+            if feedback is not None:
+                df = pd.concat([df, feedback[df.columns]], ignore_index=True)
+        return df
+    
+    def preprocess(self, df):
         X = df.drop('annual_medical_cost', axis=1)
         y = df['annual_medical_cost']
         
@@ -27,14 +40,17 @@ class CostPredictionEnsemble:
         
         for col in categorical_cols:
             if col in X.columns:
-                self.label_encoders[col] = LabelEncoder()
-                X[col] = self.label_encoders[col].fit_transform(X[col])
+                # Encoders handed in from the global model are reused, so every segment shares its schema.
+                if col not in self.label_encoders:
+                    self.label_encoders[col] = LabelEncoder().fit(X[col])
+                X[col] = self.label_encoders[col].transform(X[col])
         
         self.feature_names = X.columns.tolist()
         
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        # A scaler loaded with a saved bundle is reused, like the label encoders.
+        X_train_scaled = self.scaler.transform(X_train) if hasattr(self.scaler, 'mean_') else self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
         return X_train_scaled, X_test_scaled, y_train, y_test, X_train, X_test
@@ -151,23 +167,238 @@ class CostPredictionEnsemble:
     def cross_validate_ensemble(self, X, y, cv=5):
         scores = cross_val_score(self.ensemble, X, y, cv=cv, scoring='r2', n_jobs=-1)
         return scores
+    
+    def prune_ensemble(self, X_val, y_val, X_test, y_test, target_latency_ms=None, max_trees=None, tolerance=0.01, output_dir='models_pruned'):
+        members = dict(self.ensemble.named_estimators_)
+        y_val, y_test = np.asarray(y_val), np.asarray(y_test)
+        
+        levels = {name: prune_levels(model) for name, model in members.items()}
+        truncated = {name: {size: truncate_member(model, size) for size in levels[name]} for name, model in members.items()}
+        predictions = {name: {size: m.predict(X_val) for size, m in sizes.items()} for name, sizes in truncated.items()}
+        test_predictions = {name: {size: m.predict(X_test) for size, m in sizes.items()} for name, sizes in truncated.items()}
+        latency = {name: {size: row_latency_ms(m, X_val[:1]) for size, m in sizes.items()} for name, sizes in truncated.items()}
+        
+        def evaluate(state):
+            active = [name for name, position in state.items() if position is not None]
+            sizes = [levels[name][state[name]] for name in active]
+            # Weights and the pruning decisions only see the validation rows; the test split is reported, never fitted.
+            matrix = np.column_stack([predictions[name][size] for name, size in zip(active, sizes)])
+            weights = fit_vote_weights(matrix, y_val)
+            test_matrix = np.column_stack([test_predictions[name][size] for name, size in zip(active, sizes)])
+            return {
+                'members': dict(zip(active, sizes)),
+                'weights': dict(zip(active, weights.tolist())),
+                'trees': int(sum(sizes)),
+                'latency_ms': float(sum(latency[name][size] for name, size in zip(active, sizes))),
+                'rmse': float(np.sqrt(mean_squared_error(y_val, matrix @ weights))),
+                'test_rmse': float(np.sqrt(mean_squared_error(y_test, test_matrix @ weights)))
+            }
+        
+        state = {name: 0 for name in members}
+        current = evaluate(state)
+        baseline = current
+        allowed_rmse = baseline['rmse'] * (1 + tolerance)
+        path = [current]
+        evaluated = [current]
+        
+        while True:
+            moves = []
+            active = [name for name, position in state.items() if position is not None]
+            for name in active:
+                position = state[name]
+                if position + 1 < len(levels[name]):
+                    moves.append(dict(state, **{name: position + 1}))
+                if len(active) > 1:
+                    moves.append(dict(state, **{name: None}))
+            
+            scored = [(move, evaluate(move)) for move in moves]
+            evaluated.extend(result for _, result in scored)
+            scored = [(move, result) for move, result in scored if result['rmse'] <= allowed_rmse]
+            if not scored:
+                break
+            # Take the move that buys the most latency per unit of added error.
+            state, current = min(scored, key=lambda item: (
+                max(item[1]['rmse'] - current['rmse'], 0) / max(current['latency_ms'] - item[1]['latency_ms'], 1e-6),
+                item[1]['latency_ms']
+            ))
+            path.append(current)
+        
+        def within_budget(result):
+            return ((target_latency_ms is None or result['latency_ms'] <= target_latency_ms)
+                    and (max_trees is None or result['trees'] <= max_trees))
+        
+        chosen = next((result for result in path if within_budget(result)), path[-1])
+        report = {
+            'baseline': baseline,
+            'chosen': chosen,
+            'budget_met': within_budget(chosen),
+            'target_latency_ms': target_latency_ms,
+            'max_trees': max_trees,
+            'tolerance': tolerance,
+            'greedy_path': path,
+            'pareto_front': pareto_front(evaluated)
+        }
+        
+        pruned = copy.copy(self)
+        pruned.models = {name: truncated[name][size] for name, size in chosen['members'].items()}
+        pruned.ensemble = build_voting(self.ensemble, pruned.models, list(chosen['weights'].values()))
+        pruned.feature_importance = {name: values for name, values in self.feature_importance.items() if name in pruned.models}
+        pruned.save_models(output_dir)
+        
+        with open(f'{output_dir}/pruning_report.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        
+        return report
+
+def train_segments(df, label_encoders, output_dir='models', columns=SEGMENT_COLUMNS, min_rows=SEGMENT_MIN_ROWS):
+    segments = {}
+    skipped = {}
+    for values, frame in df.groupby(columns):
+        values = values if isinstance(values, tuple) else (values,)
+        key = segment_key(dict(zip(columns, values)), columns)
+        # Small segments are left to the global model rather than an overfit one.
+        if len(frame) < min_rows:
+            skipped[key] = len(frame)
+            continue
+        
+        segment = CostPredictionEnsemble()
+        segment.label_encoders = label_encoders
+        X_train, X_test, y_train, y_test, _, _ = segment.preprocess(frame)
+        segment.build_models()
+        segment.train_individual_models(X_train, y_train, X_test, y_test)
+        results = segment.create_voting_ensemble(X_train, y_train, X_test, y_test)
+        segment.save_models(f'{output_dir}/{SEGMENTS_DIR}/{segment_dirname(key)}')
+        segments[key] = segment_dirname(key)
+        print(f"segment {key}: {len(frame)} rows, RMSE {results['RMSE']:.1f}, R2 {results['R2']:.3f}")
+    
+    save_manifest(output_dir, {'columns': columns, 'min_rows': min_rows, 'segments': segments, 'fallback': skipped})
+    return segments, skipped
+
+VALIDATION_SIZE = 0.15
+PRUNE_FRACTIONS = [1.0, 0.75, 0.5, 0.35, 0.25, 0.15, 0.1]
+
+def prune_levels(model):
+    total = model.get_booster().num_boosted_rounds() if isinstance(model, XGBRegressor) else len(model.estimators_)
+    return sorted({max(1, int(round(total * fraction))) for fraction in PRUNE_FRACTIONS}, reverse=True)
+
+def truncate_member(model, size):
+    truncated = copy.copy(model)
+    if isinstance(model, XGBRegressor):
+        truncated._Booster = model.get_booster()[:size]
+    elif isinstance(model, AdaBoostRegressor):
+        truncated.estimators_ = model.estimators_[:size]
+        truncated.estimator_weights_ = model.estimator_weights_[:size]
+        truncated.estimator_errors_ = model.estimator_errors_[:size]
+    elif isinstance(model, GradientBoostingRegressor):
+        truncated.estimators_ = model.estimators_[:size]
+        truncated.train_score_ = model.train_score_[:size]
+        truncated.n_estimators_ = size
+    else:
+        truncated.estimators_ = model.estimators_[:size]
+    truncated.n_estimators = size
+    return truncated
+
+def row_latency_ms(model, row, repeats=50):
+    import time
+    model.predict(row)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+def fit_vote_weights(matrix, y):
+    from scipy.optimize import nnls
+    weights, _ = nnls(matrix, y)
+    if weights.sum() <= 0:
+        weights = np.ones(matrix.shape[1])
+    return weights / weights.sum()
+
+def pareto_front(results):
+    front = []
+    for result in sorted(results, key=lambda item: (item['latency_ms'], item['rmse'])):
+        if not front or result['rmse'] < front[-1]['rmse']:
+            front.append(result)
+    return front
+
+def build_voting(ensemble, models, weights):
+    from sklearn.utils import Bunch
+    voting = copy.copy(ensemble)
+    voting.estimators = list(models.items())
+    voting.estimators_ = list(models.values())
+    voting.named_estimators_ = Bunch(**models)
+    voting.weights = weights
+    return voting
 
 def main():
+    parser = argparse.ArgumentParser(description='Train the voting ensemble and optionally prune it to a latency budget')
+    parser.add_argument('--prune', action='store_true', help='Write a pruned bundle after training')
+    parser.add_argument('--prune-only', action='store_true', help='Prune the saved bundle in models/ without retraining')
+    parser.add_argument('--target-latency-ms', type=float, help='Per-row latency budget for the pruned ensemble')
+    parser.add_argument('--max-trees', type=int, help='Tree budget for the pruned ensemble')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Allowed relative RMSE increase on the validation split')
+    parser.add_argument('--pruned-dir', default='models_pruned')
+    parser.add_argument('--feedback-dir', help='Also train on reconciled rows from this feedback store (see feedback.py)')
+    parser.add_argument('--segments', action='store_true', help='Also train per-segment bundles under models/segments')
+    parser.add_argument('--segment-columns', default=','.join(SEGMENT_COLUMNS))
+    parser.add_argument('--min-segment-rows', type=int, default=SEGMENT_MIN_ROWS,
+                        help='Segments with fewer rows are served by the global model')
+    args = parser.parse_args()
+    
     ensemble = CostPredictionEnsemble()
+    if args.prune_only:
+        # The saved bundle is pruned as it is served, with its own encoders and scaler.
+        ensemble.label_encoders = joblib.load('models/label_encoders.pkl')
+        ensemble.scaler = joblib.load('models/scaler.pkl')
     
     X_train, X_test, y_train, y_test, X_train_orig, X_test_orig = ensemble.load_and_preprocess_data(
-        '../dataset/costdata.csv'
+        '../dataset/costdata.csv', args.feedback_dir
     )
+    # Members never train on the validation rows, so pruning can refit vote weights on them without touching the test split.
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_SIZE, random_state=42)
     
-    ensemble.build_models()
-    
-    individual_results = ensemble.train_individual_models(X_train, y_train, X_test, y_test)
-    
-    ensemble_results = ensemble.create_voting_ensemble(X_train, y_train, X_test, y_test)
-    
-    ensemble.cross_validate_ensemble(X_train, y_train)
+    if args.prune_only:
+        ensemble.ensemble = joblib.load('models/ensemble_model.pkl')
+        ensemble.models = dict(ensemble.ensemble.named_estimators_)
+        with open('models/feature_importance.json', 'r') as f:
+            ensemble.feature_importance = json.load(f)
+    else:
+        ensemble.build_models()
+        
+        individual_results = ensemble.train_individual_models(X_fit, y_fit, X_test, y_test)
+        
+        ensemble_results = ensemble.create_voting_ensemble(X_fit, y_fit, X_test, y_test)
+        
+        ensemble.cross_validate_ensemble(X_fit, y_fit)
+        
+        ensemble.save_models()
+        
+        from percentiles import build_for_bundle
+        build_for_bundle('models', '../dataset/costdata.csv')
+        
+        from drift import build_reference, save_reference
+        from http_cache import compute_digest
+        save_reference('models', build_reference(pd.read_csv('../dataset/costdata.csv'), compute_digest(['../dataset/costdata.csv'])))
+        
+        if args.segments:
+            segments, skipped = train_segments(
+                ensemble.load_training_frame('../dataset/costdata.csv', args.feedback_dir), ensemble.label_encoders, 'models',
+                args.segment_columns.split(','), args.min_segment_rows
+            )
+            print(f'trained {len(segments)} segment bundles; {len(skipped)} segments fall back to the global model')
     
-    ensemble.save_models()
+    if args.prune or args.prune_only:
+        report = ensemble.prune_ensemble(
+            X_val, y_val, X_test, y_test, args.target_latency_ms, args.max_trees, args.tolerance, args.pruned_dir
+        )
+        from percentiles import build_for_bundle
+        build_for_bundle(args.pruned_dir, '../dataset/costdata.csv')
+        chosen, baseline = report['chosen'], report['baseline']
+        print(f"pruned {baseline['trees']} -> {chosen['trees']} trees, "
+              f"{baseline['latency_ms']:.2f} -> {chosen['latency_ms']:.2f} ms/row, "
+              f"test RMSE {baseline['test_rmse']:.1f} -> {chosen['test_rmse']:.1f} "
+              f"({'within' if report['budget_met'] else 'over'} budget), written to {args.pruned_dir}")
 
 if __name__ == "__main__":
     main()